@@ -15,14 +15,13 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-import gzip
-import os
-import shutil
-import subprocess
-from pathlib import Path
+import sys
 
 import morfeusz2
 
+from pystempel import flat
+from pystempel.compile import compile_file
+
 
 def save_dict(dict, fpath):
     with open(fpath, "w", encoding="utf-8") as f:
@@ -37,40 +36,18 @@ def extract_rules(dict_fpath, rule_fpath):
     save_dict(dict, rule_fpath)
 
 
-def compile_stemmer_table(jar_fpath, algorithm, rules_fpath):
-    os.environ["CLASSPATH"] = jar_fpath
-
-    subprocess.run(
-        [
-            "java",
-            "-cp",
-            jar_fpath,
-            # To avoid JavaHeapSpace when loading rules into memory.
-            "-Xms16m",
-            "-Xmx6144m",
-            # To avoid StackOverflowException because of excessive
-            # recursion.
-            "-Xss8m",
-            "org.egothor.stemmer.Compile",
-            algorithm,
-            rules_fpath,
-        ]
-    )
-
-
 def extract_compile(dict_fpath, stemmer_tbl_fpath):
     extract_rules(dict_fpath, "rules.txt")
-    compile_stemmer_table(
-        "stempel-8.1.1.jar", algorithm="-0ME2", rules_fpath="rules.txt"
-    )
-    assert Path("rules.txt.out").exists()
-    os.replace("rules.txt.out", stemmer_tbl_fpath)
+    compile_file("rules.txt", stemmer_tbl_fpath, algorithm="-0ME2", log=sys.stderr)
 
 
 if __name__ == "__main__":
-    extract_compile("dicts/polimorf-20190818.tab.gz", "stempel/stemmer_polimorf.tbl")
-    with open("pystempel/stemmer_polimorf.tbl", "rb") as f_in:
-        with gzip.open(
-            "pystempel/stemmer_polimorf.tbl.gz", mode="wb", compresslevel=9
-        ) as f_out:
-            shutil.copyfileobj(f_in, f_out)
+    extract_compile(
+        "dicts/polimorf-20190818.tab.gz",
+        "src/pystempel/data/polimorf/stemmer_polimorf.tbl.gz",
+    )
+    # Stemmer.polimorf() loads the precompiled table
+    flat.convert(
+        "src/pystempel/data/polimorf/stemmer_polimorf.tbl.gz",
+        "src/pystempel/data/polimorf/stemmer_polimorf.mtbl",
+    )
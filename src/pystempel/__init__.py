@@ -1 +1,2 @@
 from .stemmer import Stemmer
+from .registry import get_stemmer
@@ -0,0 +1,198 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+from collections import namedtuple
+from typing import Iterable, List, Optional
+
+from pystempel.stemmer import Stemmer
+
+DEFAULT_MAX_BATCH_SIZE = 512
+
+# Seconds a word may wait for its batch to fill up
+DEFAULT_MAX_LATENCY = 0.002
+
+QueueInfo = namedtuple(
+    "QueueInfo",
+    [
+        "requests",
+        "batches",
+        "stemmed",
+        "size_flushes",
+        "deadline_flushes",
+        "pending",
+        "max_wait",
+        "total_wait",
+    ],
+)
+
+
+class AsyncStemmer:
+    """
+    Stems words for coroutines without blocking the event loop. Requested
+    words are queued and stemmed in micro-batches in an executor: a batch is
+    flushed when it holds max_batch_size distinct words, or max_latency
+    seconds after its first word was requested, whichever comes first. Words
+    requested many times while a batch fills up are stemmed once.
+
+    The stemmer is called from executor threads, possibly for many batches
+    at once, so it should be safe to use from many threads, e.g. a frozen or
+    a cached stemmer.
+    """
+
+    def __init__(
+        self,
+        stemmer: Stemmer,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        executor=None,
+    ):
+        """
+        :param stemmer: stemmer stemming the batches
+        :param max_batch_size: number of distinct words flushing a batch
+        :param max_latency: seconds after which a batch is flushed even if
+                            it is not full
+        :param executor: executor stemming the batches, the default executor
+                         of the event loop if not given
+        """
+        if max_batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        if max_latency < 0:
+            raise ValueError("Latency must not be negative")
+        self.stemmer = stemmer
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.executor = executor
+        # Futures waiting for the stem of every word of the filling batch
+        self.__batch = {}
+        self.__enqueued = []
+        self.__timer = None
+        self.__running = set()
+        self.__requests = 0
+        self.__batches = 0
+        self.__stemmed = 0
+        self.__size_flushes = 0
+        self.__deadline_flushes = 0
+        self.__max_wait = 0.0
+        self.__total_wait = 0.0
+
+    async def stem(self, word: str) -> Optional[str]:
+        """
+        Stem a word.
+        :param word: inp word to be stemmed
+        :return: stemmed word, or None if the stem could not be generated.
+        """
+        return await self.__request(word)
+
+    async def stem_many(self, words: Iterable[str]) -> List[Optional[str]]:
+        """
+        Stem words, batched together with words requested by other coroutines.
+        :param words: iterable of words
+        :return: list of stems, None for words which could not be stemmed
+        """
+        return list(await asyncio.gather(*map(self.__request, words)))
+
+    def __request(self, word):
+        loop = asyncio.get_running_loop()
+        self.__requests += 1
+        self.__enqueued.append(loop.time())
+        waiters = self.__batch.get(word)
+        if waiters is None:
+            waiters = self.__batch[word] = []
+        future = loop.create_future()
+        waiters.append(future)
+        if len(self.__batch) >= self.max_batch_size:
+            self.__size_flushes += 1
+            self.__flush(loop)
+        elif self.__timer is None:
+            self.__timer = loop.call_later(self.max_latency, self.__on_deadline, loop)
+        return future
+
+    def __on_deadline(self, loop):
+        self.__timer = None
+        self.__deadline_flushes += 1
+        self.__flush(loop)
+
+    def __flush(self, loop):
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        batch = self.__batch
+        if not batch:
+            return
+        now = loop.time()
+        waits = [now - enqueued for enqueued in self.__enqueued]
+        self.__max_wait = max(self.__max_wait, max(waits))
+        self.__total_wait += sum(waits)
+        self.__batch = {}
+        self.__enqueued = []
+        self.__batches += 1
+        self.__stemmed += len(batch)
+        task = loop.create_task(self.__stem_batch(loop, batch))
+        self.__running.add(task)
+        task.add_done_callback(self.__running.discard)
+
+    async def __stem_batch(self, loop, batch):
+        words = list(batch)
+        try:
+            stems = await loop.run_in_executor(
+                self.executor, self.stemmer.stem_many, words
+            )
+        except Exception as e:
+            for waiters in batch.values():
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for stem, waiters in zip(stems, batch.values()):
+            for future in waiters:
+                if not future.done():
+                    future.set_result(stem)
+
+    async def flush(self):
+        """
+        Stem queued words now and wait until all batches are stemmed.
+        """
+        self.__flush(asyncio.get_running_loop())
+        while self.__running:
+            await asyncio.gather(*self.__running)
+
+    def queue_info(self):
+        """
+        Return statistics of the queue.
+        :return: QueueInfo with numbers of requested words, flushed batches,
+                 distinct words stemmed, batches flushed because they were
+                 full and because of their deadline, words waiting in the
+                 filling batch, and the longest and total time in seconds
+                 words waited for their batch to be flushed
+        """
+        return QueueInfo(
+            self.__requests,
+            self.__batches,
+            self.__stemmed,
+            self.__size_flushes,
+            self.__deadline_flushes,
+            len(self.__enqueued),
+            self.__max_wait,
+            self.__total_wait,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.flush()
@@ -0,0 +1,246 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Iterable, Mapping, Tuple, Union
+
+from pystempel.stemmer import Stemmer
+
+LRU = "lru"
+TINYLFU = "tinylfu"
+
+DEFAULT_MAX_SIZE = 65536
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "rejections", "maxsize", "currsize"]
+)
+
+_MISSING = object()
+
+_HALVE = bytes(c >> 1 for c in range(256))
+
+
+class FrequencySketch:
+    """
+    A count-min sketch estimating how often words were seen recently, with
+    4-bit counters which are halved periodically so that old popularity
+    fades away.
+    """
+
+    MAX_COUNT = 15
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: number of entries of the cache using the sketch
+        """
+        width = 16
+        while width < capacity:
+            width *= 2
+        self.mask = width - 1
+        self.width = width
+        self.table = bytearray(4 * width)
+        self.sample_size = 10 * max(capacity, 1)
+        self.additions = 0
+
+    def __indexes(self, word):
+        # Double hashing: one hash of the word gives a column in every row.
+        h = hash(word)
+        step = (h >> 17) | 1
+        mask = self.mask
+        width = self.width
+        return (
+            h & mask,
+            width + ((h + step) & mask),
+            2 * width + ((h + 2 * step) & mask),
+            3 * width + ((h + 3 * step) & mask),
+        )
+
+    def frequency(self, word):
+        """
+        Estimate the number of recent occurrences of a word.
+        """
+        table = self.table
+        a, b, c, d = self.__indexes(word)
+        return min(table[a], table[b], table[c], table[d])
+
+    def increment(self, word, count=1):
+        """
+        Record occurrences of a word.
+        """
+        table = self.table
+        for i in self.__indexes(word):
+            if table[i] < self.MAX_COUNT:
+                table[i] = min(table[i] + count, self.MAX_COUNT)
+        self.additions += count
+        if self.additions >= self.sample_size:
+            self.table = table.translate(_HALVE)
+            self.additions //= 2
+
+
+class CachedStemmer(Stemmer):
+    """
+    A stemmer remembering stems of recently stemmed words. It is safe to use
+    from many threads.
+
+    With the "lru" policy the least recently used word is evicted when the
+    cache is full. With the "tinylfu" policy a new word is only admitted if
+    it has recently been seen more often than the word it would evict, which
+    keeps frequent words cached when rare words stream through.
+    """
+
+    def __init__(
+        self, stemmer: Stemmer, maxsize: int = DEFAULT_MAX_SIZE, policy: str = LRU
+    ):
+        """
+        :param stemmer: stemmer computing stems of words missing in the cache
+        :param maxsize: maximum number of cached words
+        :param policy: eviction policy, "lru" or "tinylfu"
+        """
+        if policy not in (LRU, TINYLFU):
+            raise ValueError("Unknown cache policy {!r}".format(policy))
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+        super().__init__(stemmer.stemmer_trie)
+        self.stemmer = stemmer
+        self.maxsize = maxsize
+        self.policy = policy
+        self.__sketch = FrequencySketch(maxsize) if policy == TINYLFU else None
+        self.__lock = threading.Lock()
+        self.__cache = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__rejections = 0
+
+    def __call__(self, word):
+        """
+        Stem a word.
+        :param word: inp word to be stemmed
+        :return: stemmed word, or None if the stem could not be generated.
+        """
+        with self.__lock:
+            if self.__sketch is not None:
+                self.__sketch.increment(word)
+            stem = self.__cache.get(word, _MISSING)
+            if stem is not _MISSING:
+                self.__cache.move_to_end(word)
+                self.__hits += 1
+                return stem
+            self.__misses += 1
+
+        stem = self.stemmer(word)
+        with self.__lock:
+            self.__admit(word, stem)
+        return stem
+
+    def _stem_distinct(self, words):
+        stems = []
+        misses = []
+        with self.__lock:
+            cache = self.__cache
+            sketch = self.__sketch
+            for word in words:
+                if sketch is not None:
+                    sketch.increment(word)
+                stem = cache.get(word, _MISSING)
+                if stem is _MISSING:
+                    misses.append(word)
+                else:
+                    cache.move_to_end(word)
+                stems.append(stem)
+            self.__hits += len(words) - len(misses)
+            self.__misses += len(misses)
+        if not misses:
+            return stems
+
+        computed = self.stemmer.stem_many(misses)
+        with self.__lock:
+            for word, stem in zip(misses, computed):
+                self.__admit(word, stem)
+        computed = iter(computed)
+        return [next(computed) if stem is _MISSING else stem for stem in stems]
+
+    def __admit(self, word, stem):
+        cache = self.__cache
+        if word in cache or len(cache) < self.maxsize:
+            cache[word] = stem
+            return
+        victim = next(iter(cache))
+        sketch = self.__sketch
+        if sketch is not None and sketch.frequency(word) <= sketch.frequency(victim):
+            self.__rejections += 1
+            return
+        del cache[victim]
+        self.__evictions += 1
+        cache[word] = stem
+
+    def warm(self, words: Union[Iterable[Union[str, Tuple[str, int]]], Mapping]):
+        """
+        Pre-fill the cache from a frequency list. Words are cached in the
+        given order until the cache is full, so the most frequent words should
+        come first. Warming does not change the hit and miss counters.
+        :param words: words, (word, count) pairs, or a mapping from words to
+                      counts; mappings are ordered by decreasing count
+        """
+        if isinstance(words, Mapping):
+            words = sorted(words.items(), key=lambda item: -item[1])
+        for item in words:
+            if isinstance(item, str):
+                word, count = item, 1
+            else:
+                word, count = item
+            with self.__lock:
+                if self.__sketch is not None:
+                    self.__sketch.increment(word, count)
+                if word in self.__cache:
+                    continue
+                if len(self.__cache) >= self.maxsize:
+                    break
+            stem = self.stemmer(word)
+            with self.__lock:
+                if len(self.__cache) < self.maxsize:
+                    self.__cache[word] = stem
+                    # Keep the most frequent words furthest from eviction.
+                    self.__cache.move_to_end(word, last=False)
+
+    def cache_info(self):
+        """
+        Return statistics of the cache.
+        :return: CacheInfo with numbers of hits, misses, evicted words, words
+                 not admitted by the "tinylfu" policy, and sizes
+        """
+        with self.__lock:
+            return CacheInfo(
+                self.__hits,
+                self.__misses,
+                self.__evictions,
+                self.__rejections,
+                self.maxsize,
+                len(self.__cache),
+            )
+
+    def cache_clear(self):
+        """
+        Remove all cached words and reset statistics.
+        """
+        with self.__lock:
+            self.__cache.clear()
+            self.__hits = self.__misses = 0
+            self.__evictions = self.__rejections = 0
+            if self.__sketch is not None:
+                self.__sketch = FrequencySketch(self.maxsize)
@@ -0,0 +1,305 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import functools
+import gzip
+import json
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from pystempel.parallel import _chunks, _map_ordered
+from pystempel.stemmer import Stemmer
+from pystempel.text import TOKEN_PATTERN
+
+STEM = "stem"
+TSV = "tsv"
+JSONL = "jsonl"
+FORMATS = (STEM, TSV, JSONL)
+
+# Bytes of a file stemmed by a worker at once
+DEFAULT_CHUNK_BYTES = 1 << 22
+
+# Lines of a stream stemmed at once
+CHUNK_LINES = 50000
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Stemmer of a worker process, set up once by _init_worker
+_worker_stemmer = None
+
+
+def load_stemmer(table):
+    """
+    Load the stemmer with a table named by the command line.
+    :param table: "default", "polimorf" or path to a stemming table
+    :return: stemmer instance with a compiled table
+    """
+    if table in ("default", "polimorf"):
+        stemmer = getattr(Stemmer, table)()
+    else:
+        stemmer = Stemmer.from_file(table)
+    return stemmer.compile()
+
+
+def format_lines(stemmer, lines, text=False, fmt=STEM):
+    """
+    Stem lines of input and format the output.
+    :param stemmer: the stemmer
+    :param lines: lines, without line breaks
+    :param text: if True, lines are text to tokenize, otherwise every line
+                 is a word
+    :param fmt: output format: "stem" writes one stem per word, or the stems
+                of the tokens of every line; "tsv" writes word and stem per
+                line; "jsonl" writes a JSON object per word
+    :return: the output, ending with a line break unless empty; words which
+             could not be stemmed are written unchanged in the "stem" format,
+             with an empty stem in "tsv" and a null stem in "jsonl"
+    """
+    if text:
+        pattern = TOKEN_PATTERN
+        lines = [
+            [(m.group().lower(), m.start(), m.end()) for m in pattern.finditer(line)]
+            for line in lines
+        ]
+        stems = iter(stemmer.stem_many([w for tokens in lines for w, _, _ in tokens]))
+        if fmt == STEM:
+            out = [
+                " ".join(stem or word for (word, _, _), stem in zip(tokens, stems))
+                for tokens in lines
+            ]
+        elif fmt == TSV:
+            out = [
+                "{}\t{}".format(word, stem or "")
+                for tokens in lines
+                for (word, _, _), stem in zip(tokens, stems)
+            ]
+        else:
+            out = [
+                json.dumps(
+                    {"token": word, "stem": stem, "start": start, "end": end},
+                    ensure_ascii=False,
+                )
+                for tokens in lines
+                for (word, start, end), stem in zip(tokens, stems)
+            ]
+    else:
+        words = [line.strip() for line in lines]
+        stems = stemmer.stem_many(words)
+        if fmt == STEM:
+            out = [stem or word for word, stem in zip(words, stems)]
+        elif fmt == TSV:
+            out = [
+                "{}\t{}".format(word, stem or "") for word, stem in zip(words, stems)
+            ]
+        else:
+            out = [
+                json.dumps({"word": word, "stem": stem}, ensure_ascii=False)
+                for word, stem in zip(words, stems)
+            ]
+    return "".join(line + "\n" for line in out)
+
+
+def split_ranges(data, chunk_bytes):
+    """
+    Split a buffer into byte ranges ending at line boundaries.
+    :param data: the buffer
+    :param chunk_bytes: minimum size of a range, except the last one
+    :return: iterator over (start, end) pairs
+    """
+    size = len(data)
+    start = 0
+    while start < size:
+        end = start + chunk_bytes
+        if end >= size:
+            end = size
+        else:
+            newline = data.find(b"\n", end - 1)
+            end = size if newline < 0 else newline + 1
+        yield start, end
+        start = end
+
+
+def _init_worker(table):
+    global _worker_stemmer
+    _worker_stemmer = load_stemmer(table)
+
+
+def _stem_lines(lines, text, fmt):
+    return format_lines(_worker_stemmer, lines, text, fmt).encode("utf-8")
+
+
+def _stem_range(fpath, text, fmt, byte_range):
+    start, end = byte_range
+    with open(fpath, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        lines = data[start:end].decode("utf-8").split("\n")
+    if not lines[-1]:
+        lines.pop()
+    return _stem_lines([line.rstrip("\r") for line in lines], text, fmt)
+
+
+def _open(fpath):
+    if fpath == "-":
+        return sys.stdin.buffer
+    with open(fpath, "rb") as f:
+        compressed = f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    return gzip.open(fpath, "rb") if compressed else open(fpath, "rb")
+
+
+def _line_chunks(stream):
+    lines = (line.decode("utf-8").rstrip("\r\n") for line in stream)
+    return _chunks(lines, CHUNK_LINES)
+
+
+def _is_splittable(fpath):
+    if fpath == "-":
+        return False
+    with open(fpath, "rb") as f:
+        head = f.read(len(GZIP_MAGIC))
+    return bool(head) and head != GZIP_MAGIC
+
+
+def stem_files(
+    files,
+    out,
+    table="polimorf",
+    text=False,
+    fmt=STEM,
+    workers=1,
+    chunk_bytes=DEFAULT_CHUNK_BYTES,
+):
+    """
+    Stem files and write the output in order.
+    :param files: paths to files, plain or gzip-compressed, "-" for stdin
+    :param out: binary output stream
+    :param table: "default", "polimorf" or path to a stemming table
+    :param text: if True, lines are text to tokenize, otherwise every line
+                 is a word
+    :param fmt: output format, "stem", "tsv" or "jsonl"
+    :param workers: number of worker processes; with 1, files are stemmed
+                    in this process
+    :param chunk_bytes: bytes of an uncompressed file stemmed by a worker at
+                        once
+    """
+    if workers <= 1:
+        stemmer = load_stemmer(table)
+        for fpath in files:
+            stream = _open(fpath)
+            try:
+                for lines in _line_chunks(stream):
+                    out.write(format_lines(stemmer, lines, text, fmt).encode("utf-8"))
+            finally:
+                if stream is not sys.stdin.buffer:
+                    stream.close()
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(table,)
+    ) as executor:
+        for fpath in files:
+            if _is_splittable(fpath):
+                with open(fpath, "rb") as f, mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                ) as data:
+                    ranges = list(split_ranges(data, chunk_bytes))
+                task = functools.partial(_stem_range, fpath, text, fmt)
+                for result in _map_ordered(executor, task, ranges, 2 * workers):
+                    out.write(result)
+            else:
+                stream = _open(fpath)
+                try:
+                    task = functools.partial(_stem_lines, text=text, fmt=fmt)
+                    for result in _map_ordered(
+                        executor, task, _line_chunks(stream), 2 * workers
+                    ):
+                        out.write(result)
+                finally:
+                    if stream is not sys.stdin.buffer:
+                        stream.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="pystempel",
+        description="Stem Polish words or text, one word or line of text per line.",
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=["-"],
+        help="input files, plain or gzip-compressed; - or none for stdin",
+    )
+    parser.add_argument(
+        "-t",
+        "--table",
+        default="polimorf",
+        help='"default", "polimorf" or path to a stemming table (default: polimorf)',
+    )
+    parser.add_argument(
+        "--text",
+        action="store_true",
+        help="tokenize lines of text instead of reading a word per line",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        default=STEM,
+        help="one stem per word, word and stem separated by a tab, or JSON lines "
+        "(default: stem)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes, 0 for one per CPU (default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-bytes",
+        type=int,
+        default=DEFAULT_CHUNK_BYTES,
+        help="bytes of a file stemmed by a worker at once",
+    )
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        stem_files(
+            args.files,
+            out,
+            args.table,
+            args.text,
+            args.format,
+            workers,
+            args.chunk_bytes,
+        )
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Compiles stemming tables from rule files, as the Compile program of Egothor
+# does. Every line of a rule file holds a stem followed by its word forms,
+# separated by whitespace. Every form is added to a trie with the patch
+# command turning it into the stem, the trie is reduced, and the table is
+# written in the format Stemmer.from_file reads.
+#
+# The algorithm is given as in Egothor, e.g. "-0ME2":
+#   -       the trie reads words from the end
+#   0       stems are stored too, with a patch keeping them as they are
+#   M       a MultiTrie2 is built instead of a single Trie
+#   G L E   Gener, Lift with skips, Lift without skips,
+#   2 1     Optimizer2 and Optimizer reductions, applied in the given order
+# As in Egothor, the flags are read by position: "-" only as the first
+# character, then "0", then "M". Unknown letters among the reductions are
+# ignored, so e.g. "-M0E2" builds a MultiTrie2 without stems. Letters are
+# read case-insensitively, as Stemmer reads the algorithm of a table.
+
+import argparse
+import gzip
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pystempel.egothor import (
+    DASH_COMMAND,
+    DELETE_COMMAND,
+    INSERT_COMMAND,
+    REPLACE_COMMAND,
+    Gener,
+    Lift,
+    MultiTrie,
+    MultiTrie2,
+    Optimizer,
+    Optimizer2,
+    Reduce,
+    Row,
+    Trie,
+)
+from pystempel.stats import format_info
+from pystempel.streams import DataOutputStream
+
+DEFAULT_ALGORITHM = "-0ME2"
+
+# Patch stored for stems with the "0" option, which keeps a word as it is
+STEM_PATCH = DASH_COMMAND + "a"
+
+REDUCTIONS = {
+    "G": Gener,
+    "L": lambda: Lift(change_skip=True),
+    "E": lambda: Lift(change_skip=False),
+    "2": Optimizer2,
+    "1": Optimizer,
+}
+
+# Steps of the edit distance path, as numbered by Egothor's Diff
+_NOOP, _DELETE, _INSERT, _REPLACE = range(4)
+
+
+def diff(word: str, stem: str) -> str:
+    """
+    Return the patch command turning a word into its stem, as Egothor's Diff
+    computes it: of the cheapest ways to edit the word, with insertions,
+    deletions and replacements costing 1, the one Diff picks on ties.
+    The patch is the inverse of apply_patch.
+    :param word: the word form
+    :param stem: the stem of the word
+    :return: the patch command
+    """
+    # The cost of editing the first x characters of the word into the first
+    # y characters of the stem is |x - y| while x does not exceed the length
+    # of their common prefix, so only the following rows are computed. Only
+    # the steps are kept for every cell of them, the costs of the previous
+    # row suffice to compute the next one.
+    prefix = 0
+    for a, b in zip(word, stem):
+        if a != b:
+            break
+        prefix += 1
+    steps = []
+    prev = [abs(prefix - y) for y in range(len(stem) + 1)]
+    for x in range(prefix + 1, len(word) + 1):
+        a = word[x - 1]
+        left = x
+        now = [x]
+        row = [_DELETE]
+        for diag, up, b in zip(prev, prev[1:], stem):
+            # _step, inlined
+            if a == b and diag <= up:
+                cost, step = diag, _NOOP
+            else:
+                cost, step = up + 1, _DELETE
+            if cost > left + 1:
+                cost, step = left + 1, _INSERT
+            if cost > diag + 1:
+                cost, step = diag + 1, _REPLACE
+            now.append(cost)
+            row.append(step)
+            left = cost
+        steps.append(row)
+        prev = now
+
+    patch = []
+    deletes = equals = 0
+    x, y = len(word), len(stem)
+    while x + y:
+        if x > prefix:
+            step = steps[x - prefix - 1][y]
+        elif x == 0:
+            step = _INSERT
+        elif y == 0:
+            step = _DELETE
+        else:
+            same = word[x - 1] == stem[y - 1]
+            step = _step(same, abs(x - y), abs(x - 1 - y), abs(x - y + 1))[1]
+        if step == _DELETE:
+            if equals:
+                patch.append(DASH_COMMAND + chr(ord("a") - 1 + equals))
+                equals = 0
+            deletes += 1
+            x -= 1
+            continue
+        if deletes:
+            patch.append(DELETE_COMMAND + chr(ord("a") - 1 + deletes))
+            deletes = 0
+        if step == _NOOP:
+            equals += 1
+            x -= 1
+            y -= 1
+            continue
+        if equals:
+            patch.append(DASH_COMMAND + chr(ord("a") - 1 + equals))
+            equals = 0
+        y -= 1
+        if step == _INSERT:
+            patch.append(INSERT_COMMAND + stem[y])
+        else:
+            patch.append(REPLACE_COMMAND + stem[y])
+            x -= 1
+    if deletes:
+        patch.append(DELETE_COMMAND + chr(ord("a") - 1 + deletes))
+    return "".join(patch)
+
+
+def _step(same, diag, up, left):
+    """
+    Return the cost of editing a prefix of a word into a prefix of a stem
+    and the last step of the cheapest edit picked as by Egothor's Diff,
+    given the costs without the last character of the word (up), of the
+    stem (left) and of both (diag).
+    """
+    # Keeping a differing character never wins, and deleting wins ties with
+    # keeping an equal one.
+    if same and diag <= up:
+        cost, step = diag, _NOOP
+    else:
+        cost, step = up + 1, _DELETE
+    if cost > left + 1:
+        cost, step = left + 1, _INSERT
+    if cost > diag + 1:
+        cost, step = diag + 1, _REPLACE
+    return cost, step
+
+
+def parse_algorithm(algorithm: str) -> Tuple[bool, bool, bool, str]:
+    """
+    Parse an Egothor algorithm string, e.g. "-0ME2".
+    :param algorithm: the algorithm string
+    :return: tuple of whether words are read from the start, whether stems
+             are stored, whether a MultiTrie2 is built, and the reductions
+    """
+    forward, store_stems, multi, rest = _split_algorithm(algorithm)
+    return forward, store_stems, multi, "".join(ch for ch in rest if ch in REDUCTIONS)
+
+
+def _split_algorithm(algorithm):
+    flags = algorithm.upper()
+    backward = flags.startswith("-")
+    rest = flags[backward:]
+    store_stems = rest.startswith("0")
+    rest = rest[store_stems:]
+    multi = rest.startswith("M")
+    rest = rest[multi:]
+    if "M" in rest:
+        # Stemmer loads tables with an "M" anywhere in the algorithm as
+        # MultiTrie2, so a single Trie stored this way could not be read.
+        raise ValueError(
+            "M must precede the reductions in algorithm {!r}".format(algorithm)
+        )
+    return not backward, store_stems, multi, rest
+
+
+def read_rules(lines: Iterable[str]) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Read stemming rules, a stem followed by its word forms on every line.
+    Lines are lowercased, empty lines are skipped.
+    :param lines: lines of a rule file
+    :return: iterator over (stem, forms) pairs
+    """
+    for line in lines:
+        tokens = line.lower().split()
+        if tokens:
+            yield tokens[0], tokens[1:]
+
+
+def build_trie(
+    rules: Iterable[Tuple[str, Iterable[str]]], algorithm: str = DEFAULT_ALGORITHM
+) -> Trie:
+    """
+    Build an unreduced trie holding the patch turning every word form into
+    its stem, adding the words in turn as Egothor's Compile does.
+    :param rules: (stem, forms) pairs
+    :param algorithm: Egothor algorithm string
+    :return: Trie or MultiTrie2
+    """
+    forward, store_stems, multi, _ = parse_algorithm(algorithm)
+    trie = MultiTrie2(forward) if multi else Trie(forward)
+    for key, patch in _patches(rules, store_stems):
+        trie.add(key, patch)
+    return trie
+
+
+def reduce_trie(trie: Trie, algorithm: str = DEFAULT_ALGORITHM, log=None) -> Trie:
+    """
+    Apply the reductions of an algorithm to a trie. The sub-tries of a
+    MultiTrie are reduced and replaced one by one, so that only one of them
+    is held both unreduced and reduced at a time.
+    :param trie: Trie or MultiTrie
+    :param algorithm: Egothor algorithm string
+    :param log: text stream the structure of the trie is written to after
+                every reduction, as by Egothor's Compile
+    :return: the reduced trie
+    """
+    reductions = parse_algorithm(algorithm)[3]
+    if not isinstance(trie, MultiTrie):
+        return _reduce(trie, reductions, log)
+    for i, sub in enumerate(trie.tries):
+        trie.tries[i] = _reduce(sub, reductions, log, "[{}] ".format(i))
+    return trie
+
+
+def compile_rules(
+    rules: Iterable[Tuple[str, Iterable[str]]],
+    algorithm: str = DEFAULT_ALGORITHM,
+    log=None,
+) -> Trie:
+    """
+    Build and reduce a stemming trie. Stemmer(trie) stems with it directly.
+
+    If the first reduction is a Lift, as in "-0ME2", the keys of every trie
+    are added in sorted order instead, and every row is lifted as soon as
+    no more keys can reach it. Rows lifted into their parents are dropped
+    right away, so the unreduced trie, mostly made of chains of rows
+    spelling out single words, is never held. The result is the same.
+    :param rules: (stem, forms) pairs
+    :param algorithm: Egothor algorithm string
+    :param log: text stream progress is written to
+    :return: the reduced trie
+    """
+    forward, store_stems, multi, reductions = parse_algorithm(algorithm)
+    start = time.perf_counter()
+    if reductions[:1] not in ("E", "L"):
+        trie = build_trie(rules, algorithm)
+        if log is not None:
+            print("Built in {:.1f} s".format(time.perf_counter() - start), file=log)
+        return reduce_trie(trie, algorithm, log)
+
+    levels = _collect(_patches(rules, store_stems), forward, multi)
+    if log is not None:
+        print(
+            "Read {} keys in {:.1f} s".format(
+                sum(len(keys) for keys, _, _ in levels), time.perf_counter() - start
+            ),
+            file=log,
+        )
+    lift = REDUCTIONS[reductions[0]]()
+    tries = []
+    for i, level in enumerate(levels):
+        levels[i] = None
+        prefix = "[{}] ".format(i) if multi else ""
+        trie = _lifted_trie(*level, forward, lift)
+        if log is not None:
+            print(format_info(reductions[0] + ": " + prefix, trie.stats()), file=log)
+        tries.append(_reduce(trie, reductions[1:], log, prefix))
+    if not multi:
+        return tries[0]
+    trie = MultiTrie2(forward)
+    trie.tries = tries
+    return trie
+
+
+def _patches(rules, store_stems):
+    for stem, forms in rules:
+        if store_stems:
+            yield stem, STEM_PATCH
+        for form in forms:
+            if form != stem:
+                yield form, diff(form, stem)
+
+
+def _reduce(trie, reductions, log, prefix=""):
+    for name in reductions:
+        trie = trie.reduce(REDUCTIONS[name]())
+        if log is not None:
+            print(format_info(name + ": " + prefix, trie.stats()), file=log)
+    return trie
+
+
+def _collect(patches, forward, multi):
+    """
+    Collect the keys and commands added to every trie.
+    :return: list of (keys, command ids, commands) for every trie, keys in
+             the order the trie reads them
+    """
+    levels = []
+    ids = []
+    splitter = MultiTrie2(forward) if multi else None
+    for key, patch in patches:
+        pieces = splitter.split(key, patch) if multi else [(0, key, patch)]
+        last_key = None
+        for level, level_key, piece in pieces:
+            # Most pieces of a patch share the key, which is reversed once.
+            if level_key != last_key:
+                last_key = level_key
+                ordered_key = level_key if forward else level_key[::-1]
+            while level >= len(levels):
+                levels.append(([], array("i"), []))
+                ids.append({})
+            keys, cmd_ids, cmds = levels[level]
+            # Commands are numbered in the order they are added, as by
+            # Trie.add.
+            cmd_id = ids[level].get(piece)
+            if cmd_id is None:
+                cmd_id = ids[level][piece] = len(cmds)
+                cmds.append(piece)
+            keys.append(ordered_key)
+            cmd_ids.append(cmd_id)
+    return levels or [([], array("i"), [])]
+
+
+def _lifted_trie(keys, cmd_ids, cmds, forward, lift):
+    """
+    Build a trie from keys in sorted order, lifting every row as soon as no
+    more keys can reach it. Returns the trie Trie.add and Lift build.
+    :param keys: keys, in the order the trie reads them
+    :param cmd_ids: id of the command of every key
+    :param cmds: the commands
+    :param forward: whether the trie reads words from the start
+    :param lift: the Lift
+    """
+    # Rows on the path of the previous key are referenced by temporary ids.
+    # Complete rows wait in pending until their parent is lifted, and only
+    # those their parent still references are kept.
+    rows = []
+    pending = {}
+    path = [Row()]
+    path_ids = [0]
+    next_id = 1
+
+    def complete(row, row_id):
+        children = [cell.ref for cell in row.cells.values() if cell.ref >= 0]
+        lift._lift_up(row, pending)
+        for cell in row.cells.values():
+            if cell.ref >= 0:
+                child = pending.pop(cell.ref)
+                cell.ref = len(rows)
+                rows.append(child)
+        for child_id in children:
+            pending.pop(child_id, None)
+        pending[row_id] = row
+
+    # Sorting is stable, so the last of equal keys wins, as with Trie.add.
+    prev = ""
+    for i in sorted(range(len(keys)), key=keys.__getitem__):
+        key = keys[i]
+        depth = 0
+        for a, b in zip(key[:-1], prev[:-1]):
+            if a != b:
+                break
+            depth += 1
+        while len(path) > depth + 1:
+            complete(path.pop(), path_ids.pop())
+        row = path[-1]
+        for ch in key[depth:-1]:
+            child = Row()
+            row.set_ref(ch, next_id)
+            path.append(child)
+            path_ids.append(next_id)
+            next_id += 1
+            row = child
+        row.set_cmd(key[-1], cmd_ids[i])
+        prev = key
+    while path:
+        complete(path.pop(), path_ids.pop())
+    rows.append(pending.pop(0))
+
+    # Number rows as Lift does.
+    return Reduce().optimize(Trie(forward, len(rows) - 1, cmds, rows))
+
+
+def store_table(trie: Trie, algorithm: str, stream: IO[bytes]):
+    """
+    Write a stemming table in the format written by Egothor's Compile.
+    :param trie: the reduced trie
+    :param algorithm: algorithm string the trie was compiled with
+    :param stream: binary file-like object
+    """
+    out = DataOutputStream(stream)
+    out.write_utf(algorithm)
+    trie.store(out)
+
+
+def compile_file(
+    rules_fpath: Union[Path, str],
+    table_fpath: Optional[Union[Path, str]] = None,
+    algorithm: str = DEFAULT_ALGORITHM,
+    encoding: str = "utf-8",
+    log=None,
+) -> Path:
+    """
+    Compile a rule file into a stemming table.
+    :param rules_fpath: path to the rule file, gzip-compressed if it ends
+                        with .gz
+    :param table_fpath: path to the table, gzip-compressed if it ends with
+                        .gz; the rule file path followed by .out by default,
+                        as in Egothor
+    :param algorithm: Egothor algorithm string
+    :param encoding: encoding of the rule file
+    :param log: text stream progress is written to
+    :return: path to the table
+    """
+    rules_fpath = Path(rules_fpath)
+    table_fpath = Path(
+        table_fpath if table_fpath is not None else str(rules_fpath) + ".out"
+    )
+    with _open(rules_fpath, "rt", encoding=encoding) as f:
+        trie = compile_rules(read_rules(f), algorithm, log)
+    with _open(table_fpath, "wb") as f:
+        store_table(trie, algorithm, f)
+    return table_fpath
+
+
+def _open(fpath, mode, encoding=None):
+    if fpath.suffix == ".gz":
+        return gzip.open(fpath, mode, encoding=encoding)
+    return open(fpath, mode, encoding=encoding)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="pystempel-compile",
+        description="Compile a stemming table from a rule file with a stem "
+        "followed by its word forms on every line.",
+    )
+    parser.add_argument("rules", help="rule file, plain or gzip-compressed")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="stemming table, gzip-compressed if it ends with .gz "
+        "(default: the rule file followed by .out)",
+    )
+    parser.add_argument(
+        "-a",
+        "--algorithm",
+        default=DEFAULT_ALGORITHM,
+        help="Egothor algorithm, given as --algorithm={} (default: {})".format(
+            DEFAULT_ALGORITHM, DEFAULT_ALGORITHM
+        ),
+    )
+    parser.add_argument("--encoding", default="utf-8", help="encoding of the rule file")
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not report progress"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        rest = _split_algorithm(args.algorithm)[3]
+    except ValueError as e:
+        parser.error(str(e))
+    ignored = "".join(ch for ch in rest if ch not in REDUCTIONS)
+    if ignored:
+        print(
+            "{}: ignoring {!r} in algorithm {!r}".format(
+                parser.prog, ignored, args.algorithm
+            ),
+            file=sys.stderr,
+        )
+    compile_file(
+        args.rules,
+        args.output,
+        args.algorithm,
+        args.encoding,
+        None if args.quiet else sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
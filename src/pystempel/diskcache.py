@@ -0,0 +1,205 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+from pystempel import flat
+
+# 256 MB
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+SUFFIX = ".mtbl"
+
+
+def library_version():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return "unknown"
+    try:
+        return version("pystempel")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def user_cache_dir():
+    """
+    Return the directory where parsed stemming tables are cached. It can be
+    overridden with the PYSTEMPEL_CACHE_DIR environment variable.
+    """
+    path = os.environ.get("PYSTEMPEL_CACHE_DIR")
+    if path:
+        return Path(path)
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+        return Path(base) / "pystempel" / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "pystempel"
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "pystempel"
+
+
+class TableCache:
+    """
+    On-disk cache of parsed stemming tables. Every entry is a snapshot of
+    the parsed trie in the precompiled format, keyed by a hash of the
+    original table file, the library version and the snapshot format
+    version, so stale snapshots are never used.
+    """
+
+    def __init__(
+        self,
+        directory: Union[Path, str, None] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        """
+        :param directory: cache directory, by default the user cache directory
+        :param max_size: maximum total size of snapshots in bytes; least
+                         recently used snapshots are removed above it
+        """
+        self.directory = Path(directory) if directory else user_cache_dir()
+        self.max_size = max_size
+
+    @staticmethod
+    def key(data):
+        """
+        Compute the cache key of a stemming table.
+        :param data: raw content of the table file
+        :return: hexadecimal key
+        """
+        h = hashlib.sha256()
+        h.update(library_version().encode("utf-8"))
+        h.update(struct.pack("<I", flat.VERSION))
+        h.update(data)
+        return h.hexdigest()
+
+    def path(self, key):
+        return self.directory / (key + SUFFIX)
+
+    def load(self, key):
+        """
+        Load a cached snapshot.
+        :param key: cache key of the table
+        :return: the parsed trie, or None if not cached or invalid
+        """
+        fpath = self.path(key)
+        try:
+            trie = flat.load(fpath)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, struct.error):
+            self.__remove(fpath)
+            return None
+        try:
+            # Refresh modification time, which orders eviction.
+            os.utime(fpath)
+        except OSError:
+            pass
+        return trie
+
+    def store(self, key, trie):
+        """
+        Save a snapshot of a parsed trie, then evict old snapshots if the
+        cache exceeds its size limit.
+        :param key: cache key of the table
+        :param trie: the parsed trie
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                flat.dump(trie, f)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            self.__remove(tmp_path)
+            raise
+        self.evict(keep=key)
+
+    def entries(self):
+        """
+        Return paths of all cached snapshots, least recently used first.
+        """
+        try:
+            paths = list(self.directory.glob("*" + SUFFIX))
+        except OSError:
+            return []
+        stats = []
+        for p in paths:
+            try:
+                stats.append((p.stat().st_mtime, p))
+            except OSError:
+                continue
+        return [p for _, p in sorted(stats)]
+
+    def size(self):
+        """
+        Return the total size of cached snapshots in bytes.
+        """
+        total = 0
+        for p in self.entries():
+            try:
+                total += p.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Remove least recently used snapshots until the cache fits its size
+        limit.
+        :param keep: key of a snapshot that must not be removed
+        """
+        entries = self.entries()
+        total = self.size()
+        for p in entries:
+            if total <= self.max_size:
+                break
+            if keep is not None and p.name == keep + SUFFIX:
+                continue
+            try:
+                size = p.stat().st_size
+            except OSError:
+                continue
+            self.__remove(p)
+            total -= size
+
+    def clear(self):
+        """
+        Remove all cached snapshots.
+        """
+        for p in self.entries():
+            self.__remove(p)
+
+    @staticmethod
+    def __remove(fpath):
+        try:
+            os.remove(fpath)
+        except OSError:
+            pass
+
+
+def clear_cache():
+    """
+    Remove all stemming tables cached in the user cache directory.
+    """
+    TableCache().clear()
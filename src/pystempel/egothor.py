@@ -52,15 +52,28 @@
    individuals  on  behalf  of  the  Egothor  Project  and was originally
    created by Leo Galambos (Leo.G@seznam.cz).
 """
+import struct
+import sys
+import time
+from array import array
+from functools import lru_cache
+
 from sortedcontainers import SortedDict
 
-from pystempel.streams import DataInputStream, DataOutputStream
+from pystempel import observers
+from pystempel.stats import format_info, trie_stats
+from pystempel.streams import DataInputStream, DataOutputStream, DataInputBuffer
 
 DASH_COMMAND = "-"
 DELETE_COMMAND = "D"
 INSERT_COMMAND = "I"
 REPLACE_COMMAND = "R"
 
+# Serialized cell: char, cmd, cnt, ref, skip
+CELL_FORMAT = ">Hiiii"
+CELL = struct.Struct(CELL_FORMAT)
+INT = struct.Struct(">i")
+
 
 def reverse(s):
     return s[::-1]
@@ -71,6 +84,8 @@ class Cell:
     A Cell is a portion of a trie.
     """
 
+    __slots__ = ("ref", "cmd", "cnt", "skip")
+
     def __init__(self, ref=-1, cmd=-1, cnt=0, skip=0):
         """
         :param ref: next row id in this way
@@ -107,24 +122,25 @@ class Cell:
 class Row:
     """
     The Row class represents a row in a matrix representation of a trie.
+
+    Rows read from a table keep their cells in a SortedDict. Rows built by
+    adding keys or by reductions keep them in a plain dict, which takes a
+    fraction of the memory; cells are sorted by character when stored.
     """
 
-    uniform_cnt = 0
-    uniform_skip = 0
+    __slots__ = ("cells", "uniform_cnt", "uniform_skip")
 
     @classmethod
     def from_stream(cls, stream: DataInputStream):
-        cells = SortedDict()
         cells_count = stream.read_int()
-        for _ in range(cells_count):
-            ch = stream.read_char()
-            cell = Cell(
-                cmd=stream.read_int(),
-                cnt=stream.read_int(),
-                ref=stream.read_int(),
-                skip=stream.read_int(),
-            )
-            cells[ch] = cell
+        cells = SortedDict(
+            [
+                (chr(ch), Cell(ref, cmd, cnt, skip))
+                for ch, cmd, cnt, ref, skip in stream.read_records(
+                    CELL_FORMAT, cells_count
+                )
+            ]
+        )
         return Row(cells)
 
     @classmethod
@@ -133,7 +149,9 @@ class Row:
         return Row(old.cells)
 
     def __init__(self, cells=None):
-        self.cells = SortedDict() if cells is None else cells
+        self.cells = {} if cells is None else cells
+        self.uniform_cnt = 0
+        self.uniform_skip = 0
 
     def set_cmd(self, way, cmd):
         """
@@ -167,19 +185,32 @@ class Row:
         """
         Return the number of cells in use.
         """
-        return sum([cell.is_in_use() for _, cell in self.cells.items()])
+        return sum(cell.is_in_use() for cell in self.cells.values())
 
     def get_cells_pnt(self):
         """
         Return the number of references (how many transitions) to other rows.
         """
-        return sum([(cell.ref >= 0) for _, cell in self.cells.items()])
+        return sum((cell.ref >= 0) for cell in self.cells.values())
 
     def get_cells_val(self):
         """
         Return the number of patch commands saved in this Row.
         """
-        return sum([(cell.cmd >= 0) for _, cell in self.cells.items()])
+        return sum((cell.cmd >= 0) for cell in self.cells.values())
+
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by this Row and its Cells.
+        """
+        size = sys.getsizeof(self)
+        if isinstance(self.cells, SortedDict):
+            size += _sorted_dict_size(self.cells)
+        else:
+            size += sys.getsizeof(self.cells)
+        for cell in self.cells.values():
+            size += sys.getsizeof(cell)
+        return size
 
     def get_cmd(self, way):
         """
@@ -223,13 +254,14 @@ class Row:
         Write the contents of this Row to the given output stream.
         :param out: the output stream
         """
-        for c, cell in self.cells.items():
-            if cell.is_in_use():
-                out.write_char(c)
-                out.write_int(cell.cmd)
-                out.write_int(cell.cnt)
-                out.write_int(cell.ref)
-                out.write_int(cell.skip)
+        cells = sorted((c, cell) for c, cell in self.cells.items() if cell.is_in_use())
+        out.write_int(len(cells))
+        for c, cell in cells:
+            out.write_char(c)
+            out.write_int(cell.cmd)
+            out.write_int(cell.cnt)
+            out.write_int(cell.ref)
+            out.write_int(cell.skip)
 
     def uniform_cmd(self, eq_skip):
         """
@@ -248,8 +280,9 @@ class Row:
             if cell.ref >= 0:
                 return -1
             if cell.cmd >= 0:
-                if ret >= 0:
-                    return -1
+                if ret < 0:
+                    ret = cell.cmd
+                    self.uniform_skip = cell.skip
                 elif ret == cell.cmd:
                     if eq_skip:
                         if self.uniform_skip == cell.skip:
@@ -259,8 +292,7 @@ class Row:
                     else:
                         self.uniform_cnt += 1
                 else:
-                    ret = cell.cmd
-                    self.uniform_skip = cell.skip
+                    return -1
         return ret
 
 
@@ -268,6 +300,27 @@ def __str__(self):
     return str(["[%s:%s]".format(ch, cell) for ch, cell in self.cells.items()])
 
 
+def _sorted_dict_size(d):
+    # SortedDict keeps its keys in a SortedList and binds several methods
+    # per instance, all of which count towards the footprint of a Row.
+    size = sys.getsizeof(d) + sys.getsizeof(d.__dict__)
+    size += sum(sys.getsizeof(v) for v in d.__dict__.values())
+    try:
+        # The internals of SortedList are private to sortedcontainers.
+        keys = d._list
+        size += sys.getsizeof(keys.__dict__) + sys.getsizeof(keys._lists)
+        size += sum(sys.getsizeof(sub) for sub in keys._lists)
+        size += sys.getsizeof(keys._maxes) + sys.getsizeof(keys._index)
+    except AttributeError:
+        # Count the sorted keys as one list if the internals change.
+        size += sys.getsizeof(list(d.keys()))
+    return size
+
+
+def _cmds_size(cmds):
+    return sys.getsizeof(cmds) + sum(sys.getsizeof(cmd) for cmd in cmds)
+
+
 class Reduce:
     """
     The Reduce object is used to remove gaps in a Trie which stores a
@@ -281,44 +334,86 @@ class Reduce:
         :param orig: the Trie to optimize
         :return: the restructured Trie
         """
-        rows = []
         remap = [-1] * len(orig.rows)
-        rows = self._remove_gaps(ind=orig.root, old_rows=rows, to_rows=[], remap=remap)
+        rows = self._remove_gaps(
+            ind=orig.root, old_rows=orig.rows, to_rows=[], remap=remap
+        )
         return Trie(
             forward=orig.forward, root=remap[orig.root], cmds=orig.cmds, rows=rows
         )
 
     def _remove_gaps(self, ind, old_rows, to_rows, remap):
+        # Rows are visited depth-first and cells in the order of characters,
+        # as in Egothor, but with a stack instead of recursion: merged rows
+        # may form paths much longer than words.
         remap[ind] = len(to_rows)
-        now = old_rows[ind]
-        to_rows.append(now)
-        for _, cell in now.cells.items():
-            if cell.ref >= 0 > remap[cell.ref]:
-                self._remove_gaps(cell.ref, old_rows, to_rows, remap)
-        to_rows[remap[ind]] = Remap(now, remap)
+        to_rows.append(old_rows[ind])
+        stack = [(ind, iter(sorted(old_rows[ind].cells.items())))]
+        while stack:
+            ind, cells = stack[-1]
+            for _, cell in cells:
+                if cell.ref >= 0 > remap[cell.ref]:
+                    child = old_rows[cell.ref]
+                    remap[cell.ref] = len(to_rows)
+                    to_rows.append(child)
+                    stack.append((cell.ref, iter(sorted(child.cells.items()))))
+                    break
+            else:
+                stack.pop()
+                to_rows[remap[ind]] = Remap(old_rows[ind], remap)
         return to_rows
 
 
+def _read_cmds(stream):
+    cmds = []
+    cmds_count = stream.read_int()
+    for _ in range(cmds_count):
+        cmds.append(stream.read_utf())
+    return cmds
+
+
 class Trie:
+    # Number of rows decoded between two progress notifications
+    PROGRESS_ROWS = 4096
+
     @classmethod
     def from_stream(cls, stream: DataInputStream):
         forward = stream.read_boolean()
         root = stream.read_int()
-        cmds = []
-        cmds_count = stream.read_int()
-        for _ in range(cmds_count):
-            cmds.append(stream.read_utf())
+        observer = stream.observer
+        if observer is not None:
+            return cls.__observed_from_stream(stream, observer, forward, root)
+        cmds = _read_cmds(stream)
         rows = []
         rows_count = stream.read_int()
         for _ in range(rows_count):
             rows.append(Row.from_stream(stream))
         return Trie(forward=forward, root=root, cmds=cmds, rows=rows)
 
+    @classmethod
+    def __observed_from_stream(cls, stream, observer, forward, root):
+        start = time.perf_counter()
+        cmds = _read_cmds(stream)
+        observer.on_phase(observers.PARSE_CMDS, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        rows = []
+        rows_count = stream.read_int()
+        while len(rows) < rows_count:
+            for _ in range(min(cls.PROGRESS_ROWS, rows_count - len(rows))):
+                rows.append(Row.from_stream(stream))
+            observer.on_progress(stream.position(), len(rows))
+        observer.on_phase(observers.PARSE_ROWS, time.perf_counter() - start)
+        return Trie(forward=forward, root=root, cmds=cmds, rows=rows)
+
     def __init__(self, forward=False, root=0, cmds=None, rows=None):
         self.rows = [Row()] if rows is None else rows
         self.cmds = [] if cmds is None else cmds
         self.root = root
         self.forward = forward
+        # Ids of commands by command, so that adding a key does not search
+        # the list of commands
+        self.__cmd_ids = {}
 
     def __get_row(self, index):
         try:
@@ -327,13 +422,21 @@ class Trie:
             return None
 
     def get_cells(self):
-        return sum([row.get_cells() for row in self.rows])
+        return sum(row.get_cells() for row in self.rows)
 
     def get_cells_pnt(self):
-        return sum([row.get_cells_pnt() for row in self.rows])
+        return sum(row.get_cells_pnt() for row in self.rows)
 
     def get_cells_val(self):
-        return sum([row.get_cells_val() for row in self.rows])
+        return sum(row.get_cells_val() for row in self.rows)
+
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by this Trie.
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.rows)
+        size += sum(row.memory_usage() for row in self.rows)
+        return size + _cmds_size(self.cmds)
 
     def get_fully(self, key):
         """
@@ -352,7 +455,7 @@ class Trie:
             ch = key[i]
             i += 1
 
-            cell = now.cells[ch]
+            cell = now.cells.get(ch)
             if cell is None:
                 return None
 
@@ -419,10 +522,14 @@ class Trie:
         if not cmd:
             return
 
-        try:
-            id_cmd = self.cmds.index(cmd)
-        except ValueError:
-            id_cmd = len(self.cmds)
+        cmd_ids = self.__cmd_ids
+        if len(cmd_ids) != len(self.cmds):
+            cmd_ids.clear()
+            for i, c in enumerate(self.cmds):
+                cmd_ids.setdefault(c, i)
+        id_cmd = cmd_ids.get(cmd)
+        if id_cmd is None:
+            id_cmd = cmd_ids[cmd] = len(self.cmds)
             self.cmds.append(cmd)
 
         node = self.root
@@ -450,26 +557,139 @@ class Trie:
         """
         return by.optimize(self)
 
-    def print_info(self, prefix):
-        print(
-            "prefix %s nds %d cmds %d "
-            "cells %s valcells %s"
-            "pntcells %s".format(
-                prefix,
-                len(self.rows),
-                len(self.cmds),
-                self.get_cells(),
-                self.get_cells_val(),
-                self.get_cells_pnt(),
-            )
+    def stats(self):
+        """
+        Gather statistics of the structure of this Trie in one pass over its
+        rows, which also estimates the memory they use.
+        :return: TrieStats
+        """
+        memory = self._memory_by_structure()
+        return trie_stats(
+            self.forward,
+            self.root,
+            self.cmds,
+            self.__cells_by_row(memory),
+            memory,
         )
 
+    def __cells_by_row(self, memory):
+        count_rows = "rows" in memory
+        for row in self.rows:
+            if count_rows:
+                memory["rows"] += row.memory_usage()
+            yield [
+                (cell.cmd >= 0, cell.ref)
+                for cell in row.cells.values()
+                if cell.is_in_use()
+            ]
+
+    def _memory_by_structure(self):
+        # Rows are counted by stats while it walks them.
+        return {
+            "trie": sys.getsizeof(self) + sys.getsizeof(self.rows),
+            "rows": 0,
+            "cmds": _cmds_size(self.cmds),
+        }
+
+    def print_info(self, prefix):
+        print(format_info(prefix, self.stats()))
+
+
+class LazyRows:
+    """
+    A read-only sequence of rows which decodes each Row from the serialized
+    table only when it is first accessed, keeping recently used rows in a
+    bounded cache.
+    """
+
+    def __init__(self, buffer, offsets, cache_size):
+        """
+        :param buffer: uncompressed stemming table
+        :param offsets: position of every serialized row in the buffer
+        :param cache_size: maximum number of decoded rows kept in memory
+        """
+        self.buffer = buffer
+        self.offsets = offsets
+        self.__row = lru_cache(maxsize=cache_size)(self.__decode)
+
+    def __decode(self, index):
+        stream = DataInputBuffer(self.buffer)
+        stream.offset = self.offsets[index]
+        return Row.from_stream(stream)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self.offsets):
+            raise IndexError(index)
+        return self.__row(index)
+
+
+class LazyTrie(Trie):
+    """
+    A read-only Trie whose rows are decoded on demand from an in-memory (or
+    memory-mapped) stemming table.
+    """
+
+    DEFAULT_CACHE_SIZE = 4096
+
+    @classmethod
+    def from_stream(cls, stream: DataInputBuffer, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Index the rows of a serialized Trie without decoding them.
+        :param stream: buffer positioned at the start of the Trie
+        :param cache_size: maximum number of decoded rows kept in memory
+        :return: the lazy Trie
+        """
+        forward = stream.read_boolean()
+        root = stream.read_int()
+        start = time.perf_counter()
+        cmds = _read_cmds(stream)
+        observer = stream.observer
+        if observer is not None:
+            observer.on_phase(observers.PARSE_CMDS, time.perf_counter() - start)
+            start = time.perf_counter()
+        rows_count = stream.read_int()
+        offsets = array("Q", bytes(8 * rows_count))
+        offset = stream.offset
+        buffer = stream.buffer
+        read_int = INT.unpack_from
+        for i in range(rows_count):
+            offsets[i] = offset
+            offset += 4 + CELL.size * read_int(buffer, offset)[0]
+        if offset > len(buffer):
+            raise EOFError()
+        stream.offset = offset
+        if observer is not None:
+            observer.on_progress(stream.position(), rows_count)
+            observer.on_phase(observers.INDEX_ROWS, time.perf_counter() - start)
+        rows = LazyRows(buffer, offsets, cache_size)
+        return LazyTrie(forward=forward, root=root, cmds=cmds, rows=rows)
+
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by the row index of this Trie. The
+        table buffer and the rows held in the cache are not counted.
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.rows.offsets)
+        return size + _cmds_size(self.cmds)
+
+    def _memory_by_structure(self):
+        return {
+            "trie": sys.getsizeof(self),
+            "row_index": sys.getsizeof(self.rows.offsets),
+            "cmds": _cmds_size(self.cmds),
+        }
+
 
 class Remap(Row):
     """
     This class is part of the Egothor Project
     """
 
+    __slots__ = ()
+
     def __init__(self, old_row, remap):
         super().__init__()
         for ch, cell in old_row.cells.items():
@@ -479,27 +699,89 @@ class Remap(Row):
             self.cells[ch] = new_cell
 
 
+class _MergeIndex:
+    """
+    Bit sets of the rows of an Optimizer having a cell for a character, and
+    a cell with a given skip, command and reference for it. They rule out
+    rows a new row cannot be merged with, so that the first row it can be
+    merged with is found without trying to merge it with every row.
+    """
+
+    def __init__(self):
+        self.chars = {}
+        self.skips = {}
+        self.cmds = {}
+        self.refs = {}
+
+    def candidates(self, row, count, conflicts):
+        """
+        Return the bit set of rows, of the first count rows, which the given
+        row may be merged with.
+        :param row: the row to merge
+        :param count: number of rows
+        :param conflicts: function returning the bit set of rows which
+                          certainly cannot be merged with a cell
+        """
+        ruled_out = 0
+        for ch, cell in row.cells.items():
+            ruled_out |= conflicts(self, ch, cell)
+        return ((1 << count) - 1) & ~ruled_out
+
+    def update(self, i, old, new):
+        """
+        Record that the i-th row changed from old (None if added) to new.
+        """
+        old_cells = {} if old is None else old.cells
+        bit = 1 << i
+        for ch, cell in new.cells.items():
+            prev = old_cells.get(ch)
+            if prev is not None:
+                if (prev.skip, prev.cmd, prev.ref) == (cell.skip, cell.cmd, cell.ref):
+                    continue
+                self.__set(ch, prev, ~bit, int.__and__)
+            else:
+                self.chars[ch] = self.chars.get(ch, 0) | bit
+            self.__set(ch, cell, bit, int.__or__)
+
+    def __set(self, ch, cell, bit, op):
+        for bits, value in (
+            (self.skips, cell.skip),
+            (self.cmds, cell.cmd),
+            (self.refs, cell.ref),
+        ):
+            bits[ch, value] = op(bits.get((ch, value), 0), bit)
+
+
 class Optimizer(Reduce):
     def optimize(self, orig):
         cmds = orig.cmds
         rows = []
         orig_rows = orig.rows
         remap = [0] * len(orig.rows)
+        index = _MergeIndex()
 
         for j in range(len(orig_rows) - 1, -1, -1):
             now = Remap(orig_rows[j], remap)
             merged = False
 
-            for i in range(len(rows)):
+            # The index only rules out rows which cannot be merged, the merge
+            # itself decides.
+            candidates = index.candidates(now, len(rows), self._conflicts)
+            while candidates:
+                lowest = candidates & -candidates
+                i = lowest.bit_length() - 1
                 q = self._merge_rows(now, rows[i])
                 if q is not None:
+                    index.update(i, rows[i], q)
                     rows[i] = q
                     merged = True
                     remap[j] = i
                     break
+                candidates ^= lowest
 
             if not merged:
                 remap[j] = len(rows)
+                index.update(len(rows), None, now)
                 rows.append(now)
 
         root = remap[orig.root]
@@ -515,7 +797,7 @@ class Optimizer(Reduce):
         :return: the resulting Row, or None if the operation cannot be
                  realized
         """
-        new_row = Row()
+        new_row = Row(type(master.cells)())
         for ch in master.cells:
             # TODO (from original author) XXX also must handle Cnt and Skip !!
             a = master.cells[ch]
@@ -527,12 +809,32 @@ class Optimizer(Reduce):
             if s is None:
                 return None
             new_row.cells[ch] = s
-        for ch, cmd in existing.cells.items():
-            if master.get_cmd(ch) is not None:
+        for ch, cell in existing.cells.items():
+            if ch in master.cells:
                 continue
-            new_row.cells[ch] = existing.get_cmd[ch]
+            new_row.cells[ch] = cell
         return new_row
 
+    @staticmethod
+    def _conflicts(index, ch, cell):
+        """
+        Return the bit set of rows of the given _MergeIndex whose cell for the
+        given character certainly cannot be merged with the given cell.
+        """
+        has = index.chars.get(ch, 0)
+        if not has:
+            return 0
+        bits = has & ~index.skips.get((ch, cell.skip), 0)
+        if cell.cmd >= 0:
+            bits |= has & ~(
+                index.cmds.get((ch, -1), 0) | index.cmds.get((ch, cell.cmd), 0)
+            )
+        if cell.ref >= 0:
+            bits |= has & ~(
+                index.refs.get((ch, -1), 0) | index.refs.get((ch, cell.ref), 0)
+            )
+        return bits
+
     def _merge_cells(self, m, e):
         """
         Merge the given Cells and return the resulting Cell.
@@ -569,7 +871,7 @@ class Optimizer(Reduce):
             else:
                 n.ref = m.ref
         else:
-            n.ref = m.ref
+            n.ref = e.ref
 
         n.cnt = m.cnt + e.cnt
         n.skip = m.skip
@@ -603,6 +905,17 @@ class Optimizer2(Optimizer):
         else:
             return None
 
+    @staticmethod
+    def _conflicts(index, ch, cell):
+        has = index.chars.get(ch, 0)
+        if not has:
+            return 0
+        return has & ~(
+            index.skips.get((ch, cell.skip), 0)
+            & index.cmds.get((ch, cell.cmd), 0)
+            & index.refs.get((ch, cell.ref), 0)
+        )
+
 
 class Gener(Reduce):
     """
@@ -651,7 +964,7 @@ class Gener(Reduce):
         frame = int(sum_ / 10)
         live = False
         for _, cell in in_row.cells.items():
-            if cell.cnt < frame and cell.cmd > 0:
+            if cell.cnt < frame and cell.cmd >= 0:
                 cell.cnt = 0
                 cell.cmd = -1
             if cell.cmd >= 0 or cell.ref >= 0:
@@ -681,7 +994,7 @@ class Lift(Reduce):
         cmds = orig.cmds
         orig_rows = orig.rows
         for j in range(len(orig_rows) - 1, -1, -1):
-            self.__lift_up(orig_rows[j], orig_rows)
+            self._lift_up(orig_rows[j], orig_rows)
 
         remap = [-1] * len(orig.rows)
         rows = self._remove_gaps(
@@ -690,7 +1003,12 @@ class Lift(Reduce):
         # TODO When to provide parameter names in invokation?
         return Trie(orig.forward, remap[orig.root], cmds, rows)
 
-    def __lift_up(self, in_row, nodes):
+    def _lift_up(self, in_row, nodes):
+        """
+        Lift the commands of rows referenced by the given Row into it.
+        :param in_row: the Row
+        :param nodes: rows by index, those referenced lifted already
+        """
         for _, cell in in_row.cells.items():
             if cell.ref < 0:
                 continue
@@ -735,13 +1053,22 @@ class MultiTrie(Trie):
     BY = 1
 
     @classmethod
-    def from_stream(cls, stream: DataOutputStream, constructor):
+    def from_stream(
+        cls, stream: DataInputStream, constructor, trie_loader=Trie.from_stream
+    ):
         t = constructor()
         t.forward = stream.read_boolean()
         t.BY = stream.read_int()
         tries_count = stream.read_int()
-        for _ in range(tries_count):
-            t.tries.append(Trie.from_stream(stream))
+        observer = stream.observer
+        for i in range(tries_count):
+            if observer is None:
+                t.tries.append(trie_loader(stream))
+            else:
+                observer.on_trie(i)
+                start = time.perf_counter()
+                t.tries.append(trie_loader(stream))
+                observer.on_phase(observers.TRIE, time.perf_counter() - start)
         return t
 
     def __init__(self, forward=True):
@@ -831,11 +1158,25 @@ class MultiTrie(Trie):
         m.tries = h
         return m
 
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by this MultiTrie and its Tries.
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.tries)
+        return size + sum(trie.memory_usage() for trie in self.tries)
+
+    def stats(self):
+        """
+        Gather statistics of the structure of every Trie of this MultiTrie.
+        :return: list of TrieStats
+        """
+        return [trie.stats() for trie in self.tries]
+
     def print_info(self, prefix):
         c = 0
-        for trie in self.tries:
+        for stats in self.stats():
             c += 1
-            trie.print_info("%s [%d] ".format(prefix, c))
+            print(format_info("{} [{}] ".format(prefix, c), stats))
 
 
 class MultiTrie2(MultiTrie):
@@ -848,8 +1189,8 @@ class MultiTrie2(MultiTrie):
     """
 
     @classmethod
-    def from_stream(cls, stream):
-        trie = MultiTrie.from_stream(stream, MultiTrie2)
+    def from_stream(cls, stream, trie_loader=Trie.from_stream):
+        trie = MultiTrie.from_stream(stream, MultiTrie2, trie_loader)
         return trie
 
     def __init__(self, forward=True):
@@ -928,30 +1269,39 @@ class MultiTrie2(MultiTrie):
         super().store(output)
 
     def add(self, key, cmd):
+        for level, level_key, part in self.split(key, cmd):
+            while level >= len(self.tries):
+                self.tries.append(Trie(self.forward))
+            self.tries[level].add(level_key, part)
+
+    def split(self, key, cmd):
+        """
+        Return the keys and pieces of a patch command added to every Trie
+        when the given key and patch command are added to this structure.
+        :param key: the key
+        :param cmd: the patch command
+        :return: list of (index of the Trie, key, piece) tuples
+        """
         if not cmd:
-            return
+            return []
 
         p = self.__decompose(cmd)
         levels = len(p)
-        while levels >= len(self.tries):
-            self.tries.append(Trie(self.forward))
-
+        result = []
         last_key = key
         for i in range(0, levels):
             if key:
-                self.tries[i].add(key, p[i])
+                result.append((i, key, p[i]))
                 last_key = key
             else:
-                self.tries[i].add(last_key, p[i])
+                result.append((i, last_key, p[i]))
             if p[i] and p[i][0] == DASH_COMMAND:
                 if i > 0:
                     key = self.__skip(key, self.__length_pp(p[i - 1]))
                 key = self.__skip(key, self.__length_pp(p[i]))
 
-        if key:
-            self.tries[levels].add(key, self.EOM_NODE)
-        else:
-            self.tries[levels].add(last_key, self.EOM_NODE)
+        result.append((levels, key or last_key, self.EOM_NODE))
+        return result
 
     def __decompose(self, cmd):
         """
@@ -1015,18 +1365,27 @@ class MultiTrie2(MultiTrie):
 
     @staticmethod
     def __length_pp(cmd):
-        length = 0
-        i = 0
-        while i < len(cmd):
-            if cmd[i] in [DASH_COMMAND, DELETE_COMMAND]:
-                length += ord(cmd[i + 1]) - ord("a") + 1
-            elif cmd[i] == REPLACE_COMMAND:
-                length += 1
-            elif cmd[i] == INSERT_COMMAND:
-                pass
-            i += 2
+        return length_pp(cmd)
+
+
+def length_pp(cmd):
+    """
+    Return the number of characters of a key consumed by a patch command.
+    :param cmd: the patch command
+    :return: number of characters skipped, deleted or replaced
+    """
+    length = 0
+    i = 0
+    while i < len(cmd):
+        if cmd[i] in [DASH_COMMAND, DELETE_COMMAND]:
+            length += ord(cmd[i + 1]) - ord("a") + 1
+        elif cmd[i] == REPLACE_COMMAND:
+            length += 1
+        elif cmd[i] == INSERT_COMMAND:
+            pass
+        i += 2
 
-        return length
+    return length
 
 
 def apply_patch(destination, patch):
@@ -1072,3 +1431,105 @@ def apply_patch(destination, patch):
                 return
             destination.insert(position, letter)
         position -= 1
+
+
+def compile_patch(patch):
+    """
+    Compile a patch string into a function applying it to a word with string
+    slices. The patch is simulated once on placeholders of the last characters
+    of a word, which gives the number of characters the patch removes from the
+    end and what it puts in their place. Words too short for the patch are
+    still handled by apply_patch, so malformed patches behave as before.
+    :param patch: Patch string
+    :return: function taking a word and returning the patched word
+    """
+    commands = [
+        (patch[2 * i], patch[2 * i + 1], ord(patch[2 * i + 1]) - ord("a"))
+        for i in range(len(patch) // 2)
+    ]
+
+    def fallback(word):
+        buffer = list(word)
+        apply_patch(buffer, patch)
+        return "".join(buffer)
+
+    if any(offset < 0 for cmd, _, offset in commands if cmd in "-D"):
+        return fallback
+
+    # The last `depth` characters of a word, as their negative indexes. No
+    # command can reach further from the end of the word.
+    depth = 1 + sum(abs(offset) + 1 for _, _, offset in commands)
+    window = list(range(-depth, 0))
+    # A word must be at least this long for no bounds check to fail.
+    min_len = 1
+    position = depth - 1
+    for cmd, letter, offset in commands:
+        if cmd == DASH_COMMAND:
+            position -= offset
+        elif cmd == REPLACE_COMMAND:
+            if position < 0 or position >= len(window):
+                return fallback
+            min_len = max(min_len, depth - position)
+            window[position] = letter
+        elif cmd == DELETE_COMMAND:
+            original_position = position
+            position -= offset
+            if position < 0 or position >= len(window):
+                return fallback
+            min_len = max(min_len, depth - position)
+            window[position : original_position + 1] = []
+        elif cmd == INSERT_COMMAND:
+            position += 1
+            if position < 0 or position > len(window):
+                return fallback
+            min_len = max(min_len, depth - position)
+            window.insert(position, letter)
+        position -= 1
+
+    # Characters in front of the first change are kept as they are.
+    kept = 0
+    while kept < len(window) and window[kept] == kept - depth:
+        kept += 1
+    cut = depth - kept
+    min_len = max(min_len, cut)
+    pieces = []
+    for item in window[kept:]:
+        if isinstance(item, str):
+            if pieces and isinstance(pieces[-1], str):
+                pieces[-1] += item
+            else:
+                pieces.append(item)
+        elif pieces and isinstance(pieces[-1], list) and pieces[-1][1] == item:
+            pieces[-1][1] = item + 1
+        else:
+            pieces.append([item, item + 1])
+
+    if all(isinstance(piece, str) for piece in pieces):
+        suffix = "".join(pieces)
+
+        def program(word):
+            n = len(word)
+            if n < min_len:
+                return fallback(word)
+            return word[: n - cut] + suffix
+
+        return program
+
+    pieces = [
+        piece if isinstance(piece, str) else (piece[0], piece[1] or None)
+        for piece in pieces
+    ]
+
+    def program(word):
+        n = len(word)
+        if n < min_len:
+            return fallback(word)
+        parts = [word[: n - cut]]
+        for piece in pieces:
+            if isinstance(piece, str):
+                parts.append(piece)
+            else:
+                parts.append(word[piece[0] : piece[1]])
+        return "".join(parts)
+
+    return program
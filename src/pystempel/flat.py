@@ -0,0 +1,590 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import mmap
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Union
+
+from pystempel import observers
+from pystempel.egothor import (
+    CELL,
+    Cell,
+    MultiTrie2,
+    Reduce,
+    Row,
+    Trie,
+    _cmds_size,
+    reverse,
+)
+from pystempel.stats import format_info, trie_stats
+
+# Precompiled stemming table format, designed to be memory-mapped.
+#
+# All integers are little-endian. The file starts with a header followed by
+# one block per trie. Every block starts with a trie header and is followed
+# by these sections, each one padded to a multiple of 8 bytes:
+#
+#   row offsets     uint32[rows + 1]  first cell of every row
+#   chars           uint16[cells]     transition characters, sorted per row
+#   cmd ids         int32[cells]      command ids, -1 if none
+#   refs            int32[cells]      next row ids, -1 if none
+#   cmd offsets     uint32[cmds + 1]  command boundaries in the string table
+#   string table    bytes             UTF-8 encoded commands
+MAGIC = b"PYSTEMPL"
+VERSION = 1
+
+KIND_TRIE = 0
+KIND_MULTI_TRIE2 = 1
+
+HEADER = struct.Struct("<8sIIII")  # magic, version, kind, forward, tries
+TRIE_HEADER = struct.Struct("<IiIII")  # forward, root, rows, cells, cmds
+
+ALIGNMENT = 8
+
+
+class FlatTrie:
+    """
+    A read-only trie stored as flat arrays, in the layout of the precompiled
+    table format. The arrays can be memoryviews over a memory-mapped file,
+    so no per-row or per-cell Python objects are built.
+
+    Precompiled tables do not keep the cnt and skip of cells, which lookups
+    do not need. Tries loaded from them behave as if every cell with a
+    command had cnt 1 and every skip was 0, as in tables built without
+    Lift(change_skip=True). To add keys, use to_trie or load the table with
+    Trie.from_stream.
+    """
+
+    def __init__(
+        self,
+        forward,
+        root,
+        offsets,
+        chars,
+        cmd_ids,
+        refs,
+        cmds,
+        cnts=None,
+        skips=None,
+    ):
+        """
+        :param forward: True if keys are read left to right
+        :param root: id of the root row
+        :param offsets: index of the first cell of every row, plus the end
+        :param chars: code units of transition characters, sorted per row
+        :param cmd_ids: command id of every cell, -1 if none
+        :param refs: next row id of every cell, -1 if none
+        :param cmds: list of patch commands
+        :param cnts: cnt of every cell, if known; not needed for lookups
+        :param skips: skip of every cell, if known; not needed for lookups
+        """
+        self.forward = forward
+        self.root = root
+        self.offsets = offsets
+        self.chars = chars
+        self.cmd_ids = cmd_ids
+        self.refs = refs
+        self.cmds = cmds
+        self.cnts = cnts
+        self.skips = skips
+
+    @classmethod
+    def from_stream(cls, stream):
+        """
+        Decode a trie serialized in the Egothor format straight into flat
+        arrays, without building Row and Cell objects. Cells are expected to be
+        sorted by character within each row, as Egothor writes them.
+        :param stream: DataInputStream or DataInputBuffer positioned at the
+                       start of the trie
+        :return: the flat trie
+        """
+        forward = stream.read_boolean()
+        root = stream.read_int()
+        observer = stream.observer
+        start = time.perf_counter()
+        cmds = [stream.read_utf() for _ in range(stream.read_int())]
+        if observer is not None:
+            observer.on_phase(observers.PARSE_CMDS, time.perf_counter() - start)
+            start = time.perf_counter()
+
+        rows_count = stream.read_int()
+        offsets = array("I", bytes(4 * (rows_count + 1)))
+        parts = []
+        cells = 0
+        read_int = stream.read_int
+        read = stream.read
+        row = 0
+        while row < rows_count:
+            end = rows_count if observer is None else row + Trie.PROGRESS_ROWS
+            for row in range(row, min(end, rows_count)):
+                count = read_int()
+                parts.append(read(CELL.size * count))
+                cells += count
+                offsets[row + 1] = cells
+            row += 1
+            if observer is not None:
+                observer.on_progress(stream.position(), row)
+
+        records = b"".join(parts)
+        chars = _column(records, 0, "H")
+        cmd_ids = _column(records, 2, "i")
+        cnts = _column(records, 6, "i")
+        refs = _column(records, 10, "i")
+        skips = _column(records, 14, "i")
+        if observer is not None:
+            observer.on_phase(observers.PARSE_ROWS, time.perf_counter() - start)
+        return cls(forward, root, offsets, chars, cmd_ids, refs, cmds, cnts, skips)
+
+    @classmethod
+    def from_trie(cls, trie):
+        """
+        Flatten a trie built of Row objects.
+        :param trie: the trie to flatten
+        :return: flat trie holding the same transitions
+        """
+        offsets = array("I", [0])
+        chars = array("H")
+        cmd_ids = array("i")
+        refs = array("i")
+        cnts = array("i")
+        skips = array("i")
+        for row in trie.rows:
+            for ch, cell in sorted(row.cells.items()):
+                if cell.is_in_use():
+                    chars.append(ord(ch))
+                    cmd_ids.append(cell.cmd)
+                    refs.append(cell.ref)
+                    cnts.append(cell.cnt)
+                    skips.append(cell.skip)
+            offsets.append(len(chars))
+        return cls(
+            trie.forward,
+            trie.root,
+            offsets,
+            chars,
+            cmd_ids,
+            refs,
+            trie.cmds,
+            cnts,
+            skips,
+        )
+
+    def to_trie(self):
+        """
+        Build a trie of Row objects holding the same transitions, which can be
+        modified and reduced.
+        :return: the Trie
+        """
+        offsets = self.offsets
+        rows = []
+        for row in range(len(offsets) - 1):
+            cells = {}
+            for i in range(offsets[row], offsets[row + 1]):
+                cmd = self.cmd_ids[i]
+                cnt = self.cnts[i] if self.cnts is not None else int(cmd >= 0)
+                skip = self.skips[i] if self.skips is not None else 0
+                cells[chr(self.chars[i])] = Cell(self.refs[i], cmd, cnt, skip)
+            rows.append(Row(cells))
+        return Trie(self.forward, self.root, list(self.cmds), rows)
+
+    def __find(self, row, ch):
+        lo = self.offsets[row]
+        hi = self.offsets[row + 1]
+        c = ord(ch)
+        i = bisect_left(self.chars, c, lo, hi)
+        return i if i < hi and self.chars[i] == c else -1
+
+    def get_cmd(self, row, ch):
+        i = self.__find(row, ch)
+        return self.cmd_ids[i] if i >= 0 else -1
+
+    def get_ref(self, row, ch):
+        i = self.__find(row, ch)
+        return self.refs[i] if i >= 0 else -1
+
+    def get_cells(self):
+        return len(self.chars)
+
+    def get_cells_pnt(self):
+        return sum(ref >= 0 for ref in self.refs)
+
+    def get_cells_val(self):
+        return sum(cmd >= 0 for cmd in self.cmd_ids)
+
+    def get_fully(self, key):
+        """
+        Return the element that is stored in a cell associated with the given
+        key.
+        :param key: the key
+        :return: the associated element
+        """
+        now = self.root
+        cmd = -1
+        if not self.forward:
+            key = reverse(key)
+
+        i = 0
+        while i < len(key):
+            ch = key[i]
+            i += 1
+
+            cell = self.__find(now, ch)
+            if cell < 0:
+                return None
+
+            cmd = self.cmd_ids[cell]
+
+            skip = self.skips[cell] if self.skips is not None else 0
+            if skip > len(key) - i:
+                return None
+            i += skip
+
+            w = self.refs[cell]
+            if w >= 0:
+                now = w
+            elif i < len(key):
+                return None
+
+        return None if cmd == -1 else self.cmds[cmd]
+
+    def get_last_on_path(self, key):
+        """
+        Return the element that is stored as last on a path associated with the
+        given key.
+        :param key: the key associated with the desired element
+        :return:  the last on path element
+        """
+        offsets = self.offsets
+        chars = self.chars
+        last = None
+        now = self.root
+        if not self.forward:
+            key = reverse(key)
+        for ch in key[:-1]:
+            lo = offsets[now]
+            hi = offsets[now + 1]
+            c = ord(ch)
+            i = bisect_left(chars, c, lo, hi)
+            if i == hi or chars[i] != c:
+                return last
+            w = self.cmd_ids[i]
+            if w >= 0:
+                last = self.cmds[w]
+            now = self.refs[i]
+            if now < 0:
+                return last
+        w = self.get_cmd(now, key[-1])
+        return self.cmds[w] if w >= 0 else last
+
+    def release(self):
+        """
+        Release the views of a trie loaded from a buffer, so that the buffer
+        can be closed. The trie must not be used afterwards.
+        """
+        for values in (
+            self.offsets,
+            self.chars,
+            self.cmd_ids,
+            self.refs,
+            self.cnts,
+            self.skips,
+        ):
+            if isinstance(values, memoryview):
+                values.release()
+
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by this trie, including the arrays
+        it walks, even if they are memory-mapped.
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.cmds)
+        size += sum(sys.getsizeof(cmd) for cmd in self.cmds)
+        for values in (
+            self.offsets,
+            self.chars,
+            self.cmd_ids,
+            self.refs,
+            self.cnts,
+            self.skips,
+        ):
+            if values is not None:
+                size += memoryview(values).nbytes
+        return size
+
+    def stats(self):
+        """
+        Gather statistics of the structure of this trie in one pass.
+        :return: TrieStats
+        """
+        offsets = self.offsets
+        cmd_ids = self.cmd_ids
+        refs = self.refs
+        memory = {"trie": sys.getsizeof(self), "cmds": _cmds_size(self.cmds)}
+        for name in ("offsets", "chars", "cmd_ids", "refs", "cnts", "skips"):
+            values = getattr(self, name)
+            if values is not None:
+                memory[name] = memoryview(values).nbytes
+        return trie_stats(
+            self.forward,
+            self.root,
+            self.cmds,
+            (
+                [
+                    (cmd_ids[i] >= 0, refs[i])
+                    for i in range(offsets[row], offsets[row + 1])
+                ]
+                for row in range(len(offsets) - 1)
+            ),
+            memory,
+        )
+
+    def add(self, key, cmd):
+        raise TypeError(
+            "FlatTrie is read-only, convert it with to_trie() or load the table "
+            "with Trie.from_stream to add keys"
+        )
+
+    def reduce(self, by: Reduce):
+        """
+        Reduce a trie of Row objects holding the same transitions.
+        :param by: the reduction
+        :return: the reduced Trie
+        """
+        return by.optimize(self.to_trie())
+
+    def print_info(self, prefix):
+        print(format_info(prefix, self.stats()))
+
+    def store(self, out):
+        """
+        Write this trie in the Egothor format.
+        :param out: DataOutputStream
+        """
+        out.write_boolean(self.forward)
+        out.write_int(self.root)
+        out.write_int(len(self.cmds))
+        for cmd in self.cmds:
+            out.write_utf(cmd)
+        offsets = self.offsets
+        out.write_int(len(offsets) - 1)
+        for row in range(len(offsets) - 1):
+            out.write_int(offsets[row + 1] - offsets[row])
+            for i in range(offsets[row], offsets[row + 1]):
+                cmd = self.cmd_ids[i]
+                out.write_char(chr(self.chars[i]))
+                out.write_int(cmd)
+                out.write_int(self.cnts[i] if self.cnts is not None else int(cmd >= 0))
+                out.write_int(self.refs[i])
+                out.write_int(self.skips[i] if self.skips is not None else 0)
+
+    def write_block(self, out):
+        """
+        Write this trie as a block of the precompiled table format.
+        :param out: binary output stream
+        """
+        encoded = [cmd.encode("utf-8") for cmd in self.cmds]
+        cmd_offsets = array("I", [0])
+        for cmd in encoded:
+            cmd_offsets.append(cmd_offsets[-1] + len(cmd))
+        write_aligned(
+            out,
+            TRIE_HEADER.pack(
+                self.forward,
+                self.root,
+                len(self.offsets) - 1,
+                len(self.chars),
+                len(self.cmds),
+            ),
+        )
+        write_aligned(out, to_le_bytes(array("I", self.offsets)))
+        write_aligned(out, to_le_bytes(array("H", self.chars)))
+        write_aligned(out, to_le_bytes(array("i", self.cmd_ids)))
+        write_aligned(out, to_le_bytes(array("i", self.refs)))
+        write_aligned(out, to_le_bytes(cmd_offsets))
+        write_aligned(out, b"".join(encoded))
+
+
+def _column(records, start, typecode):
+    # Gather one field of every big-endian cell record into an array, one
+    # byte lane at a time, using strided slices instead of a Python loop.
+    size = array(typecode).itemsize
+    column = bytearray(len(records) // CELL.size * size)
+    for i in range(size):
+        lane = size - 1 - i if sys.byteorder == "little" else i
+        column[lane::size] = records[start + i :: CELL.size]
+    return array(typecode, column)
+
+
+def padding(size):
+    """
+    Return the number of bytes padding a section of the given size to the
+    alignment of the precompiled formats.
+    """
+    return -size % ALIGNMENT
+
+
+def write_aligned(out, data):
+    """
+    Write a section followed by its padding.
+    :param out: binary output stream
+    :param data: bytes of the section
+    """
+    out.write(data)
+    out.write(b"\0" * padding(len(data)))
+
+
+def to_le_bytes(values):
+    """
+    Return the bytes of an array in little-endian order.
+    """
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def read_view(buffer, offset, typecode, count):
+    """
+    Read an aligned section of little-endian values without copying it, when
+    the machine is little-endian.
+    :param buffer: memoryview of the table
+    :param offset: offset of the section
+    :param typecode: array typecode of the values
+    :param count: number of values
+    :return: the values and the offset of the next section
+    """
+    size = array(typecode).itemsize * count
+    view = buffer[offset : offset + size]
+    if len(view) != size:
+        raise EOFError()
+    if sys.byteorder == "little":
+        return view.cast(typecode), offset + size + padding(size)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values, offset + size + padding(size)
+
+
+def _read_trie(buffer, offset):
+    forward, root, rows, cells, cmds_count = TRIE_HEADER.unpack_from(buffer, offset)
+    offset += TRIE_HEADER.size + padding(TRIE_HEADER.size)
+    offsets, offset = read_view(buffer, offset, "I", rows + 1)
+    chars, offset = read_view(buffer, offset, "H", cells)
+    cmd_ids, offset = read_view(buffer, offset, "i", cells)
+    refs, offset = read_view(buffer, offset, "i", cells)
+    cmd_offsets, offset = read_view(buffer, offset, "I", cmds_count + 1)
+    blob = buffer[offset : offset + cmd_offsets[-1]]
+    offset += cmd_offsets[-1] + padding(cmd_offsets[-1])
+    cmds = [
+        str(blob[cmd_offsets[i] : cmd_offsets[i + 1]], "utf-8")
+        for i in range(cmds_count)
+    ]
+    trie = FlatTrie(bool(forward), root, offsets, chars, cmd_ids, refs, cmds)
+    return trie, offset
+
+
+def is_flat(data):
+    """
+    Check whether a buffer starts with the precompiled table header.
+    :param data: bytes-like object holding at least the first bytes of a table
+    :return: True if the buffer holds a precompiled table
+    """
+    return bytes(data[: len(MAGIC)]) == MAGIC
+
+
+def loads(data):
+    """
+    Load a precompiled table from a buffer. The returned trie keeps
+    referencing the buffer instead of copying it.
+    :param data: bytes-like object holding the table
+    :return: FlatTrie, or MultiTrie2 of FlatTries
+    """
+    buffer = memoryview(data)
+    magic, version, kind, forward, tries_count = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a precompiled stemming table")
+    if version != VERSION:
+        raise ValueError("Unsupported stemming table version: {}".format(version))
+
+    offset = HEADER.size + padding(HEADER.size)
+    tries = []
+    for _ in range(tries_count):
+        trie, offset = _read_trie(buffer, offset)
+        tries.append(trie)
+
+    if kind == KIND_TRIE:
+        return tries[0]
+    multi = MultiTrie2(forward=bool(forward))
+    multi.tries = tries
+    return multi
+
+
+def load(fpath: Union[Path, str]):
+    """
+    Memory-map a precompiled table file.
+    :param fpath: path to the table
+    :return: FlatTrie, or MultiTrie2 of FlatTries
+    """
+    with open(fpath, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(data)
+
+
+def dump(trie, out):
+    """
+    Write a trie in the precompiled table format.
+    :param trie: Trie, MultiTrie2 or FlatTrie to write
+    :param out: binary output stream
+    """
+    if isinstance(trie, MultiTrie2):
+        kind, tries = KIND_MULTI_TRIE2, trie.tries
+    else:
+        kind, tries = KIND_TRIE, [trie]
+    write_aligned(out, HEADER.pack(MAGIC, VERSION, kind, trie.forward, len(tries)))
+    for t in tries:
+        if not isinstance(t, FlatTrie):
+            t = FlatTrie.from_trie(t)
+        t.write_block(out)
+
+
+def convert(src: Union[Path, str], dst: Union[Path, str]):
+    """
+    Convert a stemming table in the Egothor format (optionally gzipped) to
+    the precompiled format.
+    :param src: path to the Egothor table
+    :param dst: path to the precompiled table to write
+    """
+    from pystempel import Stemmer
+
+    stemmer = Stemmer.from_file(src)
+    with open(dst, "wb") as f:
+        dump(stemmer.stemmer_trie, f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert an Egothor stemming table to the precompiled format."
+    )
+    parser.add_argument("src", help="Egothor table (.tbl or .tbl.gz)")
+    parser.add_argument("dst", help="precompiled table to write")
+    args = parser.parse_args()
+    convert(args.src, args.dst)
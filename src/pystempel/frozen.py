@@ -0,0 +1,111 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+from types import MappingProxyType
+
+from pystempel.egothor import MultiTrie, compile_patch
+from pystempel.lookup import HashMultiTrie2, HashTrie, compile_trie
+from pystempel.stemmer import Stemmer
+
+
+class FrozenStemmer(Stemmer):
+    """
+    An immutable stemmer which many threads can share without locks, also on
+    free-threaded Python builds.
+
+    The table is compiled into structures built for this stemmer alone and
+    only ever read afterwards; the loaded Row objects, which table reductions
+    mutate in place, are not referenced. Patch programs of all commands of
+    the table are compiled upfront; programs of patches joined from commands
+    of several sub-tries are compiled on first use into a cache private to
+    the calling thread, so stemming writes no state shared between threads.
+    """
+
+    def __init__(self, stemmer: Stemmer):
+        """
+        :param stemmer: stemmer to freeze, compiled or not
+        """
+        trie = stemmer.stemmer_trie
+        if not _is_compiled(trie):
+            trie = compile_trie(trie)
+        tries = trie.tries if isinstance(trie, MultiTrie) else [trie]
+        programs = {cmd: compile_patch(cmd) for t in tries for cmd in t.cmds}
+        super().__init__(trie)
+        self.programs = MappingProxyType(programs)
+        self.__local = threading.local()
+        self.__frozen = True
+
+    def __setattr__(self, name, value):
+        if "_FrozenStemmer__frozen" in self.__dict__:
+            raise AttributeError("FrozenStemmer is immutable")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("FrozenStemmer is immutable")
+
+    def freeze(self):
+        return self
+
+    def __call__(self, word):
+        """
+        Stem a word.
+        :param word: inp word to be stemmed
+        :return: stemmed word, or None if the stem could not be generated.
+        """
+        patch = self.stemmer_trie.get_last_on_path(word)
+        if patch is None:
+            return None
+        program = self.programs.get(patch)
+        if program is None:
+            program = self.__program(patch)
+        return program(word) or None
+
+    def _stem_distinct(self, words):
+        get_last_on_path = self.stemmer_trie.get_last_on_path
+        programs = self.programs
+        stems = []
+        append = stems.append
+        for word in words:
+            patch = get_last_on_path(word)
+            if patch is None:
+                append(None)
+                continue
+            program = programs.get(patch)
+            if program is None:
+                program = self.__program(patch)
+            append(program(word) or None)
+        return stems
+
+    def __program(self, patch):
+        local = self.__local
+        try:
+            programs = local.programs
+        except AttributeError:
+            programs = local.programs = {}
+        program = programs.get(patch)
+        if program is None:
+            program = programs[patch] = compile_patch(patch)
+        return program
+
+
+def _is_compiled(trie):
+    if isinstance(trie, (HashTrie, HashMultiTrie2)):
+        return True
+    return isinstance(trie, MultiTrie) and all(
+        isinstance(t, HashTrie) for t in trie.tries
+    )
@@ -0,0 +1,300 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Iterable, Sequence
+
+from pystempel.egothor import MultiTrie, MultiTrie2
+from pystempel.flat import FlatTrie
+from pystempel.lookup import HashTrie
+from pystempel.stemmer import Stemmer
+
+# Upper bounds of latency histogram buckets, in seconds
+CALL_LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3)
+BATCH_LATENCY_BUCKETS = (1e-4, 1e-3, 1e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+# Upper bounds of buckets of sub-tries visited and characters walked per word
+SUBTRIES_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 12, 16)
+DEPTH_BUCKETS = (0, 1, 2, 4, 6, 8, 12, 16, 24, 32, 48)
+
+
+class Histogram:
+    """
+    Counts of observed values by bucket, with the sum of all values, in the
+    shape of a Prometheus histogram.
+    """
+
+    def __init__(self, bounds: Sequence[float]):
+        """
+        :param bounds: increasing upper bounds of buckets; values above the
+                       last one are counted in an implicit +Inf bucket
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """
+        :return: dictionary with cumulative counts of values not greater than
+                 every bucket bound, the sum and the count of values
+        """
+        buckets = {}
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            buckets[bound] = total
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class _TracingTrie:
+    """
+    A sub-trie recording how many characters every lookup walks, so that a
+    MultiTrie over such sub-tries reports which of them a word visited.
+    """
+
+    def __init__(self, trie, trace):
+        self.trie = trie
+        self.forward = trie.forward
+        self.trace = trace
+
+    def get_last_on_path(self, key):
+        self.trace.depths.append(_walked_depth(self.trie, key))
+        return self.trie.get_last_on_path(key)
+
+
+def _walked_depth(trie, key):
+    """
+    Return the number of characters of a key walked in a trie by a lookup.
+    """
+    if not trie.forward:
+        key = key[::-1]
+    depth = 0
+    if isinstance(trie, HashTrie):
+        now = trie.root
+        for ch in key:
+            cell = now.get(ch)
+            if cell is None:
+                break
+            depth += 1
+            now = cell[1]
+            if now is None:
+                break
+    elif isinstance(trie, FlatTrie):
+        offsets = trie.offsets
+        chars = trie.chars
+        now = trie.root
+        for ch in key:
+            lo, hi = offsets[now], offsets[now + 1]
+            i = bisect_left(chars, ord(ch), lo, hi)
+            if i == hi or chars[i] != ord(ch):
+                break
+            depth += 1
+            now = trie.refs[i]
+            if now < 0:
+                break
+    else:
+        now = trie.root
+        for ch in key:
+            cell = trie.rows[now].cells.get(ch)
+            if cell is None:
+                break
+            depth += 1
+            now = cell.ref
+            if now < 0:
+                break
+    return depth
+
+
+class InstrumentedStemmer(Stemmer):
+    """
+    A stemmer counting calls, words which could not be stemmed, sub-tries
+    visited and characters walked per word, and recording latencies of
+    single and batch calls. It is safe to use from many threads.
+
+    Stems are computed by the wrapped stemmer, so stemmers which are not
+    instrumented pay nothing. Tracing sub-tries and depths walks the table
+    once more per traced word, outside of the measured latency.
+    """
+
+    def __init__(self, stemmer: Stemmer, trace_every: int = 1):
+        """
+        :param stemmer: stemmer computing stems
+        :param trace_every: trace sub-tries and depths of every n-th word;
+                            0 disables tracing
+        """
+        super().__init__(stemmer.stemmer_trie)
+        self.stemmer = stemmer
+        self.trace_every = trace_every
+        self.__trace = threading.local()
+        self.__tracing_trie = _tracing_trie(stemmer.stemmer_trie, self.__trace)
+        self.__lock = threading.Lock()
+        self.__words = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Reset all metrics.
+        """
+        with self.__lock:
+            self.calls = 0
+            self.batch_calls = 0
+            self.batch_words = 0
+            self.none_results = 0
+            self.call_latency = Histogram(CALL_LATENCY_BUCKETS)
+            self.batch_latency = Histogram(BATCH_LATENCY_BUCKETS)
+            self.subtries = Histogram(SUBTRIES_BUCKETS)
+            self.depth = Histogram(DEPTH_BUCKETS)
+
+    def __call__(self, word):
+        """
+        Stem a word.
+        :param word: inp word to be stemmed
+        :return: stemmed word, or None if the stem could not be generated.
+        """
+        start = time.perf_counter()
+        stem = self.stemmer(word)
+        elapsed = time.perf_counter() - start
+        traces = self.__traced([word])
+        with self.__lock:
+            self.calls += 1
+            self.none_results += stem is None
+            self.call_latency.observe(elapsed)
+            self.__record(traces)
+        return stem
+
+    def stem_many(self, words: Iterable[str], mask=False):
+        if isinstance(words, str):
+            raise TypeError("Expected an iterable of words, not a string")
+        if not isinstance(words, (list, tuple)):
+            words = list(words)
+        start = time.perf_counter()
+        result = self.stemmer.stem_many(words, mask)
+        elapsed = time.perf_counter() - start
+        if mask:
+            none_results = sum(result[1])
+        else:
+            none_results = sum(stem is None for stem in result)
+        traces = self.__traced(words)
+        with self.__lock:
+            self.batch_calls += 1
+            self.batch_words += len(words)
+            self.none_results += none_results
+            self.batch_latency.observe(elapsed)
+            self.__record(traces)
+        return result
+
+    def _stem_distinct(self, words):
+        return self.stem_many(words)
+
+    def __traced(self, words):
+        if not self.trace_every:
+            return []
+        with self.__lock:
+            first = self.__words
+            self.__words += len(words)
+        skip = -first % self.trace_every
+        trace = self.__trace
+        traces = []
+        for word in words[skip :: self.trace_every]:
+            trace.depths = []
+            if word:
+                self.__tracing_trie.get_last_on_path(word)
+            traces.append((len(trace.depths), sum(trace.depths)))
+        return traces
+
+    def __record(self, traces):
+        for subtries, depth in traces:
+            self.subtries.observe(subtries)
+            self.depth.observe(depth)
+
+    def snapshot(self):
+        """
+        Return a snapshot of all metrics.
+        :return: dictionary of counters and histograms
+        """
+        with self.__lock:
+            return {
+                "calls": self.calls,
+                "batch_calls": self.batch_calls,
+                "batch_words": self.batch_words,
+                "none_results": self.none_results,
+                "call_latency_seconds": self.call_latency.snapshot(),
+                "batch_latency_seconds": self.batch_latency.snapshot(),
+                "subtries_visited": self.subtries.snapshot(),
+                "depth_walked": self.depth.snapshot(),
+            }
+
+    def prometheus(self, prefix="pystempel"):
+        """
+        Export a snapshot of all metrics in the Prometheus text format.
+        :param prefix: prefix of metric names
+        :return: the exposition text
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, help_ in _COUNTERS:
+            metric = "{}_{}_total".format(prefix, name)
+            lines.append("# HELP {} {}".format(metric, help_))
+            lines.append("# TYPE {} counter".format(metric))
+            lines.append("{} {}".format(metric, snapshot[name]))
+        for name, help_ in _HISTOGRAMS:
+            metric = "{}_{}".format(prefix, name)
+            histogram = snapshot[name]
+            lines.append("# HELP {} {}".format(metric, help_))
+            lines.append("# TYPE {} histogram".format(metric))
+            for bound, count in histogram["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append('{}_bucket{{le="{}"}} {}'.format(metric, le, count))
+            lines.append("{}_sum {}".format(metric, histogram["sum"]))
+            lines.append("{}_count {}".format(metric, histogram["count"]))
+        return "\n".join(lines) + "\n"
+
+
+_COUNTERS = (
+    ("calls", "Words stemmed one at a time."),
+    ("batch_calls", "Batches of words stemmed."),
+    ("batch_words", "Words stemmed in batches."),
+    ("none_results", "Words which could not be stemmed."),
+)
+
+_HISTOGRAMS = (
+    ("call_latency_seconds", "Latency of stemming a single word."),
+    ("batch_latency_seconds", "Latency of stemming a batch of words."),
+    ("subtries_visited", "Sub-tries of the stemming table visited per word."),
+    ("depth_walked", "Characters walked in the stemming table per word."),
+)
+
+
+def _tracing_trie(trie, trace):
+    if isinstance(trie, MultiTrie):
+        # Compiled tables with a fused lookup are traced with the lookup of
+        # the table they were compiled from, which visits sub-tries one by one.
+        tracing = (MultiTrie2 if isinstance(trie, MultiTrie2) else MultiTrie)(
+            trie.forward
+        )
+        tracing.BY = trie.BY
+        tracing.tries = [_TracingTrie(t, trace) for t in trie.tries]
+        return tracing
+    return _TracingTrie(trie, trace)
@@ -0,0 +1,392 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import mmap
+import struct
+from array import array
+from hashlib import blake2b
+from pathlib import Path
+from typing import Iterable, Union
+
+from pystempel.flat import padding, read_view, to_le_bytes, write_aligned
+from pystempel.stemmer import Stemmer
+
+# Precomputed word-to-stem map, designed to be memory-mapped.
+#
+# Words are placed by a minimal perfect hash built with the CHD (compress,
+# hash and displace) algorithm. The hash of a word gives its bucket g and two
+# values f1 and f2, and the displacement stored for the bucket moves the word
+# to its own slot: (f1 + d1) % slots if the displacement d1 is below the number
+# of slots, otherwise (f1 + d0 * f2) % slots with d0 = displacement - slots.
+# All integers are little-endian. The header is followed by these sections,
+# each one padded to a multiple of 8 bytes:
+#
+#   displacements   uint32[buckets]   displacement of every bucket
+#   word offsets    uint32[slots + 1] word boundaries in the word table
+#   stem ids        uint32[slots]     stem of every slot, NO_STEM if none
+#   stem offsets    uint32[stems + 1] stem boundaries in the stem table
+#   word table      bytes             UTF-8 encoded words, by slot
+#   stem table      bytes             UTF-8 encoded distinct stems
+
+MAGIC = b"PYSTLEX\0"
+VERSION = 1
+
+# magic, version, seed, slots, buckets, stems, words
+HEADER = struct.Struct("<8sIIIIII")
+HASH = struct.Struct("<III")
+
+# Average number of words per bucket. Smaller buckets take more space but
+# are much faster to place, since more of them hold a single word.
+BUCKET_SIZE = 1
+
+NO_STEM = 0xFFFFFFFF
+
+
+def _salt(seed):
+    return seed.to_bytes(8, "little")
+
+
+def _hash(data, salt):
+    return HASH.unpack(blake2b(data, digest_size=HASH.size, salt=salt).digest())
+
+
+class Lexicon:
+    """
+    A read-only map from words to their stems, with lookups costing one hash
+    of the word and one comparison with the stored word.
+    """
+
+    def __init__(
+        self, seed, displacements, word_offsets, stem_ids, stem_offsets, words, stems
+    ):
+        self.seed = seed
+        self.salt = _salt(seed)
+        self.displacements = displacements
+        self.word_offsets = word_offsets
+        self.stem_ids = stem_ids
+        self.stem_offsets = stem_offsets
+        self.words = words
+        self.stems = stems
+        self.slots = len(stem_ids)
+
+    @classmethod
+    def build(cls, stemmer: Stemmer, words: Iterable[str]):
+        """
+        Stem every word of a lexicon and index the stems by a minimal perfect
+        hash.
+        :param stemmer: stemmer computing the stems
+        :param words: words of the lexicon; duplicates are ignored
+        :return: the lexicon
+        """
+        keys = list(dict.fromkeys(w.encode("utf-8", "surrogatepass") for w in words))
+        slots = len(keys)
+        seed = 0
+        placement = _place(keys, seed)
+        while placement is None:
+            seed += 1
+            placement = _place(keys, seed)
+        displacements, positions = placement
+
+        by_slot = [b""] * slots
+        for key, slot in zip(keys, positions):
+            by_slot[slot] = key
+        word_offsets = array("I", [0])
+        stem_ids = array("I")
+        stem_offsets = array("I", [0])
+        stem_index = {}
+        stems = bytearray()
+        for key in by_slot:
+            word_offsets.append(word_offsets[-1] + len(key))
+            stem = stemmer(key.decode("utf-8", "surrogatepass"))
+            if stem is None:
+                stem_ids.append(NO_STEM)
+                continue
+            stem_id = stem_index.get(stem)
+            if stem_id is None:
+                stem_id = stem_index[stem] = len(stem_index)
+                stems += stem.encode("utf-8", "surrogatepass")
+                stem_offsets.append(len(stems))
+            stem_ids.append(stem_id)
+        return cls(
+            seed,
+            displacements,
+            word_offsets,
+            stem_ids,
+            stem_offsets,
+            b"".join(by_slot),
+            bytes(stems),
+        )
+
+    def __len__(self):
+        return self.slots
+
+    def get(self, word, default=None):
+        """
+        Return the stem of a word of the lexicon.
+        :param word: the word
+        :param default: value returned for words not in the lexicon
+        :return: the stem, None if the stemmer could not stem the word
+        """
+        slots = self.slots
+        if not slots:
+            return default
+        key = word.encode("utf-8", "surrogatepass")
+        g, f1, f2 = _hash(key, self.salt)
+        displacements = self.displacements
+        d = displacements[g % len(displacements)]
+        if d < slots:
+            slot = (f1 + d) % slots
+        else:
+            slot = (f1 + (d - slots) * f2) % slots
+        start = self.word_offsets[slot]
+        if self.words[start : self.word_offsets[slot + 1]] != key:
+            return default
+        stem_id = self.stem_ids[slot]
+        if stem_id == NO_STEM:
+            return None
+        return str(
+            self.stems[self.stem_offsets[stem_id] : self.stem_offsets[stem_id + 1]],
+            "utf-8",
+            "surrogatepass",
+        )
+
+    def __contains__(self, word):
+        return self.get(word, self) is not self
+
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by the lexicon, even if it is
+        memory-mapped.
+        """
+        return sum(
+            memoryview(values).nbytes
+            for values in (
+                self.displacements,
+                self.word_offsets,
+                self.stem_ids,
+                self.stem_offsets,
+                self.words,
+                self.stems,
+            )
+        )
+
+    def store(self, out):
+        """
+        Write the lexicon.
+        :param out: binary output stream
+        """
+        write_aligned(
+            out,
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                self.seed,
+                self.slots,
+                len(self.displacements),
+                len(self.stem_offsets) - 1,
+                len(self.words),
+            ),
+        )
+        for values in (
+            self.displacements,
+            self.word_offsets,
+            self.stem_ids,
+            self.stem_offsets,
+        ):
+            write_aligned(out, to_le_bytes(values))
+        write_aligned(out, bytes(self.words))
+        write_aligned(out, bytes(self.stems))
+
+
+def _place(keys, seed):
+    """
+    Compute a minimal perfect hash of the keys.
+    :return: displacements of buckets and slots of keys, or None if some
+             bucket could not be placed with this seed
+    """
+    slots = len(keys)
+    buckets_count = max(1, slots // BUCKET_SIZE)
+    salt = _salt(seed)
+    hashes = [_hash(key, salt) for key in keys]
+    buckets = [[] for _ in range(buckets_count)]
+    for i, (g, _, _) in enumerate(hashes):
+        buckets[g % buckets_count].append(i)
+
+    displacements = array("I", bytes(4 * buckets_count))
+    positions = array("I", bytes(4 * slots))
+    taken = bytearray(slots)
+    # Slots are only ever taken, so the first free slot only moves on.
+    first_free = 0
+    # Place the largest buckets first, while most slots are still free.
+    # Attempts to place a bucket before giving up on the seed
+    max_displacements = 1000 + 10 * slots
+    for b in sorted(range(buckets_count), key=lambda b: -len(buckets[b])):
+        bucket = buckets[b]
+        if not bucket:
+            break
+        if len(bucket) == 1:
+            # A single word fits into any free slot by choosing d1.
+            slot = first_free = taken.find(0, first_free)
+            _, f1, _ = hashes[bucket[0]]
+            displacements[b] = (slot - f1) % slots
+            taken[slot] = 1
+            positions[bucket[0]] = slot
+            continue
+        for d0 in range(max_displacements):
+            placed = [(hashes[i][1] + d0 * hashes[i][2]) % slots for i in bucket]
+            if len(set(placed)) == len(placed) and not any(taken[p] for p in placed):
+                break
+        else:
+            return None
+        displacements[b] = slots + d0
+        for i, slot in zip(bucket, placed):
+            taken[slot] = 1
+            positions[i] = slot
+    return displacements, positions
+
+
+def loads(data):
+    """
+    Load a lexicon from a buffer. The returned lexicon keeps referencing the
+    buffer instead of copying it.
+    :param data: bytes-like object holding the lexicon
+    :return: the lexicon
+    """
+    buffer = memoryview(data)
+    magic, version, seed, slots, buckets, stems, words = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a stemmed lexicon")
+    if version != VERSION:
+        raise ValueError("Unsupported lexicon version: {}".format(version))
+    offset = HEADER.size + padding(HEADER.size)
+    displacements, offset = read_view(buffer, offset, "I", buckets)
+    word_offsets, offset = read_view(buffer, offset, "I", slots + 1)
+    stem_ids, offset = read_view(buffer, offset, "I", slots)
+    stem_offsets, offset = read_view(buffer, offset, "I", stems + 1)
+    word_table = buffer[offset : offset + words]
+    offset += words + padding(words)
+    stem_table = buffer[offset : offset + stem_offsets[-1]]
+    if len(word_table) != words or len(stem_table) != stem_offsets[-1]:
+        raise EOFError()
+    return Lexicon(
+        seed,
+        displacements,
+        word_offsets,
+        stem_ids,
+        stem_offsets,
+        word_table,
+        stem_table,
+    )
+
+
+def load(fpath: Union[Path, str]):
+    """
+    Memory-map a lexicon file.
+    :param fpath: path to the lexicon
+    :return: the lexicon
+    """
+    with open(fpath, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(data)
+
+
+def dump(lexicon: Lexicon, out):
+    """
+    Write a lexicon.
+    :param lexicon: the lexicon
+    :param out: binary output stream
+    """
+    lexicon.store(out)
+
+
+def build(stemmer: Stemmer, words: Iterable[str], dst: Union[Path, str]):
+    """
+    Stem a whole lexicon and save the word-to-stem map.
+    :param stemmer: stemmer computing the stems
+    :param words: words of the lexicon
+    :param dst: path to the lexicon file to write
+    """
+    lexicon = Lexicon.build(stemmer, words)
+    with open(dst, "wb") as f:
+        dump(lexicon, f)
+
+
+class LexiconStemmer(Stemmer):
+    """
+    A stemmer answering from a precomputed lexicon, which walks the stemming
+    trie only for words missing in it.
+    """
+
+    def __init__(self, stemmer: Stemmer, lexicon: Lexicon):
+        """
+        :param stemmer: stemmer for words missing in the lexicon
+        :param lexicon: precomputed stems
+        """
+        super().__init__(stemmer.stemmer_trie)
+        self.stemmer = stemmer
+        self.lexicon = lexicon
+
+    def memory_usage(self):
+        return self.stemmer.memory_usage() + self.lexicon.memory_usage()
+
+    def __call__(self, word):
+        """
+        Stem a word.
+        :param word: inp word to be stemmed
+        :return: stemmed word, or None if the stem could not be generated.
+        """
+        stem = self.lexicon.get(word, self)
+        if stem is self:
+            return self.stemmer(word)
+        return stem
+
+    def _stem_distinct(self, words):
+        get = self.lexicon.get
+        stems = [get(word, self) for word in words]
+        misses = [word for word, stem in zip(words, stems) if stem is self]
+        if not misses:
+            return stems
+        computed = iter(self.stemmer.stem_many(misses))
+        return [next(computed) if stem is self else stem for stem in stems]
+
+
+def _read_words(fpath):
+    with open(fpath, "rb") as f:
+        for line in f:
+            word = line.decode("utf-8").strip()
+            if word:
+                yield word
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stem a lexicon and save the word-to-stem map."
+    )
+    parser.add_argument("words", help="text file with one word per line")
+    parser.add_argument("dst", help="lexicon file to write")
+    parser.add_argument(
+        "--table",
+        default="polimorf",
+        help='"default", "polimorf" or path to a stemming table (default: polimorf)',
+    )
+    args = parser.parse_args()
+    if args.table in ("default", "polimorf"):
+        table_stemmer = getattr(Stemmer, args.table)()
+    else:
+        table_stemmer = Stemmer.from_file(args.table)
+    build(table_stemmer.compile(), _read_words(args.words), args.dst)
@@ -0,0 +1,257 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import sys
+
+from pystempel.egothor import (
+    DASH_COMMAND,
+    DELETE_COMMAND,
+    MultiTrie,
+    MultiTrie2,
+    length_pp,
+)
+from pystempel.stats import trie_stats
+
+
+class HashTrie:
+    """
+    A read-only Trie compiled for fast lookups. Every row is a dictionary
+    mapping a character to a (command, next row) pair, where the command is
+    the patch string itself (or None) and the next row is the dictionary of
+    the referenced row (or None), so a walk does one hash lookup per
+    character and no index arithmetic.
+    """
+
+    def __init__(self, forward, root, cmds):
+        """
+        :param forward: True if keys are read left to right
+        :param root: dictionary of the root row
+        :param cmds: patch commands stored in the trie
+        """
+        self.forward = forward
+        self.root = root
+        self.cmds = cmds
+
+    @classmethod
+    def from_trie(cls, trie):
+        """
+        Compile a loaded trie.
+        :param trie: a FlatTrie, or any Trie built of Row objects
+        :return: compiled trie holding the same transitions
+        """
+        from pystempel.flat import FlatTrie
+
+        if not isinstance(trie, FlatTrie):
+            trie = FlatTrie.from_trie(trie)
+        offsets = trie.offsets
+        chars = trie.chars
+        cmd_ids = trie.cmd_ids
+        refs = trie.refs
+        cmds = trie.cmds
+        rows = [{} for _ in range(len(offsets) - 1)]
+        for row, cells in enumerate(rows):
+            for i in range(offsets[row], offsets[row + 1]):
+                w = cmd_ids[i]
+                ref = refs[i]
+                cells[chr(chars[i])] = (
+                    cmds[w] if w >= 0 else None,
+                    rows[ref] if ref >= 0 else None,
+                )
+        return cls(trie.forward, rows[trie.root], list(cmds))
+
+    def get_last_on_path(self, key):
+        """
+        Return the element that is stored as last on a path associated with the
+        given key.
+        :param key: the key associated with the desired element
+        :return:  the last on path element
+        """
+        last = None
+        now = self.root
+        for ch in key if self.forward else reversed(key):
+            cell = now.get(ch)
+            if cell is None:
+                return last
+            cmd, now = cell
+            if cmd is not None:
+                last = cmd
+            if now is None:
+                return last
+        return last
+
+    def stats(self):
+        """
+        Gather statistics of the structure of this trie in one pass.
+        :return: TrieStats
+        """
+        # Number rows in the order they are first reached from the root.
+        ids = {id(self.root): 0}
+        order = [self.root]
+        for cells in order:
+            for _, ref in cells.values():
+                if ref is not None and id(ref) not in ids:
+                    ids[id(ref)] = len(order)
+                    order.append(ref)
+        rows_size = 0
+        cells_size = 0
+        for cells in order:
+            rows_size += sys.getsizeof(cells)
+            cells_size += sum(sys.getsizeof(cell) for cell in cells.values())
+        return trie_stats(
+            self.forward,
+            0,
+            self.cmds,
+            (
+                [
+                    (cmd is not None, -1 if ref is None else ids[id(ref)])
+                    for cmd, ref in cells.values()
+                ]
+                for cells in order
+            ),
+            {
+                "trie": sys.getsizeof(self),
+                "rows": rows_size,
+                "cells": cells_size,
+                "cmds": sys.getsizeof(self.cmds)
+                + sum(sys.getsizeof(cmd) for cmd in self.cmds),
+            },
+        )
+
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by this trie.
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.cmds)
+        size += sum(sys.getsizeof(cmd) for cmd in self.cmds)
+        seen = set()
+        stack = [self.root]
+        while stack:
+            cells = stack.pop()
+            if id(cells) in seen:
+                continue
+            seen.add(id(cells))
+            size += sys.getsizeof(cells)
+            for cmd, ref in cells.values():
+                size += sys.getsizeof((cmd, ref))
+                if ref is not None:
+                    stack.append(ref)
+        return size
+
+
+class HashMultiTrie2(MultiTrie2):
+    """
+    A MultiTrie2 over compiled tries with a lookup fused into a single pass:
+    the key is reversed once and every sub-trie walks it from an offset,
+    lengths of patch command fragments are computed once per command when
+    compiling, and the patch is joined only once.
+    """
+
+    def __init__(self, forward=True):
+        super().__init__(forward)
+        self.lengths = {}
+
+    @classmethod
+    def from_trie(cls, trie: MultiTrie2):
+        """
+        Compile every sub-trie of a loaded MultiTrie2.
+        :param trie: the loaded trie
+        :return: compiled trie with the same lookup results
+        """
+        compiled = cls(trie.forward)
+        compiled.BY = trie.BY
+        compiled.tries = [HashTrie.from_trie(t) for t in trie.tries]
+        for t in compiled.tries:
+            for cmd in t.cmds:
+                compiled.lengths[cmd] = length_pp(cmd)
+        return compiled
+
+    def get_last_on_path(self, key):
+        """
+        Return the element that is stored as last on a path belonging to the
+        given key.
+        :param key: the key associated with the desired element
+        :return: the element that is stored as last on a path
+        """
+        size = len(key)
+        # Skipped characters are always cut from the start of the walked key.
+        word = key if self.forward else key[::-1]
+        lengths = self.lengths
+        forward = self.forward
+        parts = []
+        start = 0
+        walk_start = 0
+        prev = None
+        last_ch = " "
+        for trie in self.tries:
+            r = None
+            now = trie.root
+            for ch in word[walk_start:]:
+                cell = now.get(ch)
+                if cell is None:
+                    break
+                cmd, now = cell
+                if cmd is not None:
+                    r = cmd
+                if now is None:
+                    break
+            if r is None or r == self.EOM:
+                break
+            first = r[0]
+            if first == last_ch and (first == DASH_COMMAND or first == DELETE_COMMAND):
+                break
+            last_ch = r[-2]
+            if first == DASH_COMMAND:
+                if prev is not None:
+                    start += lengths[prev]
+                    if start > size:
+                        if not forward:
+                            break
+                        start = size
+                start += lengths[r]
+                if start > size:
+                    if not forward:
+                        break
+                    start = size
+            parts.append(r)
+            prev = r
+            if start < size:
+                walk_start = start
+        return "".join(parts)
+
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by this MultiTrie and its Tries.
+        """
+        return super().memory_usage() + sys.getsizeof(self.lengths)
+
+
+def compile_trie(trie):
+    """
+    Compile a loaded trie, or every sub-trie of a MultiTrie, for fast lookups.
+    :param trie: the loaded trie
+    :return: compiled trie with the same lookup results
+    """
+    if isinstance(trie, MultiTrie2) and all(
+        t.forward == trie.forward for t in trie.tries
+    ):
+        return HashMultiTrie2.from_trie(trie)
+    if isinstance(trie, MultiTrie):
+        compiled = type(trie)(trie.forward)
+        compiled.BY = trie.BY
+        compiled.tries = [HashTrie.from_trie(t) for t in trie.tries]
+        return compiled
+    return HashTrie.from_trie(trie)
@@ -0,0 +1,120 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from typing import Optional
+
+# Phases reported while loading a stemming table
+DECOMPRESS = "decompress"
+PARSE_CMDS = "parse_cmds"
+PARSE_ROWS = "parse_rows"
+INDEX_ROWS = "index_rows"
+TRIE = "trie"
+
+
+class LoadObserver:
+    """
+    Receives progress and timings while a stemming table is loaded. All
+    methods do nothing by default; override the ones you need.
+
+    Events are reported in order: on_start, then for every (sub-)trie
+    on_trie followed by its phases and progress, then on_end.
+    """
+
+    def on_start(self, total_bytes: Optional[int]):
+        """
+        Loading started.
+        :param total_bytes: size of the uncompressed table, if known
+        """
+
+    def on_trie(self, index: int):
+        """
+        Loading of a sub-trie of a MultiTrie started.
+        :param index: position of the sub-trie
+        """
+
+    def on_phase(self, phase: str, seconds: float):
+        """
+        A loading phase finished.
+        :param phase: one of DECOMPRESS, PARSE_CMDS, PARSE_ROWS, INDEX_ROWS
+                      or TRIE
+        :param seconds: time the phase took
+        """
+
+    def on_progress(self, position: Optional[int], rows: int):
+        """
+        Another chunk of rows has been decoded.
+        :param position: number of uncompressed bytes consumed so far, if known
+        :param rows: number of rows decoded in the current trie so far
+        """
+
+    def on_end(self, seconds: float):
+        """
+        Loading finished.
+        :param seconds: total loading time
+        """
+
+
+class TimingObserver(LoadObserver):
+    """
+    Collects timings of all loading phases as (sub-trie index, phase,
+    seconds) tuples; the index is None for phases outside of sub-tries.
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.total = None
+        self.__trie = None
+
+    def on_trie(self, index):
+        self.__trie = index
+
+    def on_phase(self, phase, seconds):
+        self.phases.append((self.__trie, phase, seconds))
+        if phase == TRIE:
+            self.__trie = None
+
+    def on_end(self, seconds):
+        self.total = seconds
+
+
+class TqdmObserver(LoadObserver):
+    """
+    Displays a tqdm progress bar while loading.
+    """
+
+    def __init__(self, **tqdm_kwargs):
+        """
+        :param tqdm_kwargs: further arguments of the tqdm progress bar
+        """
+        self.tqdm_kwargs = tqdm_kwargs
+        self.pbar = None
+
+    def on_start(self, total_bytes):
+        from tqdm import tqdm
+
+        kwargs = dict(desc="Loading", unit="bytes", unit_scale=True)
+        kwargs.update(self.tqdm_kwargs)
+        self.pbar = tqdm(total=total_bytes, **kwargs)
+
+    def on_progress(self, position, rows):
+        if position is not None and position > self.pbar.n:
+            self.pbar.update(position - self.pbar.n)
+
+    def on_end(self, seconds):
+        if self.pbar.total is not None and self.pbar.total > self.pbar.n:
+            self.pbar.update(self.pbar.total - self.pbar.n)
+        self.pbar.close()
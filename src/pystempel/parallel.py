@@ -0,0 +1,245 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from pystempel import shared
+from pystempel.stemmer import Stemmer
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Stemmer of a worker process, set up once by _init_worker
+_worker_stemmer = None
+
+
+def _init_worker(table_name, loader, compile_):
+    global _worker_stemmer
+    if table_name is not None:
+        stemmer = shared.attach(table_name)
+        # By default workers walk the shared table, so that it is not copied.
+        _worker_stemmer = stemmer.compile() if compile_ else stemmer
+    else:
+        stemmer = loader()
+        _worker_stemmer = stemmer.compile() if compile_ is not False else stemmer
+
+
+def _stem_chunk(words):
+    return _worker_stemmer.stem_many(words)
+
+
+def _map_ordered(executor, fn, args, max_pending):
+    """
+    Apply a function to every argument in an executor, keeping a bounded
+    number of calls in flight, and yield the results in order.
+    """
+    pending = deque()
+    for arg in args:
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, arg))
+    while pending:
+        yield pending.popleft().result()
+
+
+def _chunks(words, chunksize):
+    words = iter(words)
+    while True:
+        chunk = list(islice(words, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _imap_chunks(executor, fn, words, chunksize, max_pending):
+    """
+    Apply a function to chunks of words in an executor, keeping a bounded
+    number of chunks in flight, and yield the results in order.
+    """
+    for result in _map_ordered(executor, fn, _chunks(words, chunksize), max_pending):
+        yield from result
+
+
+class ParallelStemmer:
+    """
+    Stems words in a pool of worker processes. Every worker sets up its
+    stemmer once when it starts: it attaches to the table published in shared
+    memory by this process, or loads the table itself. Only words and stems
+    travel between processes, in chunks.
+
+    Results come in the order of the words. Words are read lazily and only a
+    bounded number of chunks is in flight, so unbounded iterables can be
+    stemmed in constant memory.
+    """
+
+    def __init__(
+        self,
+        stemmer: Optional[Stemmer] = None,
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_CHUNK_SIZE,
+        loader: Optional[Callable[[], Stemmer]] = None,
+        compile: Optional[bool] = None,
+        max_pending: Optional[int] = None,
+        mp_context=None,
+    ):
+        """
+        :param stemmer: stemmer whose table is shared with workers through
+                        shared memory; it must not be compiled
+        :param workers: number of worker processes, the number of CPUs by
+                        default
+        :param chunksize: number of words sent to a worker at once
+        :param loader: picklable function constructing a stemmer in every
+                       worker, used instead of sharing the table of a stemmer,
+                       e.g. Stemmer.polimorf
+        :param compile: if True, workers compile their table for fast lookups,
+                        which stems about twice as fast but builds a private
+                        copy of the table in every worker (about 50MB for
+                        polimorf); by default only workers using a loader
+                        compile it, and workers attached to a shared table
+                        walk the shared copy
+        :param max_pending: maximum number of chunks in flight, twice the
+                            number of workers by default
+        :param mp_context: multiprocessing context of the pool
+        """
+        if (stemmer is None) == (loader is None):
+            raise ValueError("Pass either a stemmer or a loader")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.max_pending = max_pending or 2 * self.workers
+        self.table = shared.publish(stemmer) if stemmer is not None else None
+        try:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=mp_context,
+                initializer=_init_worker,
+                initargs=(
+                    self.table.name if self.table is not None else None,
+                    loader,
+                    compile,
+                ),
+            )
+        except BaseException:
+            self.__release_table()
+            raise
+
+    def imap(self, words: Iterable[str]) -> Iterator[Optional[str]]:
+        """
+        Stem words lazily.
+        :param words: iterable of words, possibly unbounded
+        :return: iterator over stems, None for words which could not be stemmed
+        """
+        return _imap_chunks(
+            self.executor, _stem_chunk, words, self.chunksize, self.max_pending
+        )
+
+    def map(self, words: Iterable[str]) -> List[Optional[str]]:
+        """
+        Stem words.
+        :param words: iterable of words
+        :return: list of stems, None for words which could not be stemmed
+        """
+        return list(self.imap(words))
+
+    def close(self):
+        """
+        Stop the worker processes and release the shared table.
+        """
+        try:
+            self.executor.shutdown()
+        finally:
+            self.__release_table()
+
+    def __release_table(self):
+        if self.table is not None:
+            self.table.close()
+            self.table.unlink()
+            self.table = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ThreadedStemmer:
+    """
+    Stems words in a pool of threads sharing one frozen stemmer. Threads
+    only speed stemming up on free-threaded Python builds; with the GIL
+    ParallelStemmer should be used instead.
+
+    Results come in the order of the words. Words are read lazily and only a
+    bounded number of chunks is in flight, so unbounded iterables can be
+    stemmed in constant memory.
+    """
+
+    def __init__(
+        self,
+        stemmer: Stemmer,
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_CHUNK_SIZE,
+        max_pending: Optional[int] = None,
+    ):
+        """
+        :param stemmer: stemmer to share, frozen first unless it already is
+        :param workers: number of threads, the number of CPUs by default
+        :param chunksize: number of words stemmed by a thread at once
+        :param max_pending: maximum number of chunks in flight, twice the
+                            number of threads by default
+        """
+        self.stemmer = stemmer.freeze()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.max_pending = max_pending or 2 * self.workers
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def imap(self, words: Iterable[str]) -> Iterator[Optional[str]]:
+        """
+        Stem words lazily.
+        :param words: iterable of words, possibly unbounded
+        :return: iterator over stems, None for words which could not be stemmed
+        """
+        return _imap_chunks(
+            self.executor,
+            self.stemmer.stem_many,
+            words,
+            self.chunksize,
+            self.max_pending,
+        )
+
+    def map(self, words: Iterable[str]) -> List[Optional[str]]:
+        """
+        Stem words.
+        :param words: iterable of words
+        :return: list of stems, None for words which could not be stemmed
+        """
+        return list(self.imap(words))
+
+    def close(self):
+        """
+        Stop the threads.
+        """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
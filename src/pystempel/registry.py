@@ -0,0 +1,163 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from pystempel.stemmer import Stemmer
+
+
+class StemmerRegistry:
+    """
+    A thread-safe registry of stemmers which loads each stemming table at most
+    once and shares the loaded instance between all callers.
+
+    When a memory budget is set, least recently used stemmers are evicted
+    once the estimated size of all loaded tables exceeds it. An evicted
+    stemmer is loaded again on its next use.
+    """
+
+    def __init__(self, memory_budget: Optional[int] = None):
+        """
+        :param memory_budget: maximum estimated size of loaded tables in bytes,
+                              or None for no limit
+        """
+        self.memory_budget = memory_budget
+        self.__lock = threading.Lock()
+        self.__loaders = {}
+        self.__load_locks = {}
+        self.__loaded = OrderedDict()
+        self.__sizes = {}
+        self.register("default", Stemmer.default)
+        self.register("polimorf", Stemmer.polimorf)
+
+    def register(self, name: str, loader: Callable[[], Stemmer]):
+        """
+        Register a stemmer under a given name. The stemmer is not loaded until
+        it is first requested.
+        :param name: name of the stemmer
+        :param loader: function constructing the stemmer
+        """
+        with self.__lock:
+            self.__loaders[name] = loader
+            self.__load_locks.setdefault(name, threading.Lock())
+            self.__unload(name)
+
+    def register_file(self, name: str, fpath: Union[Path, str], **kwargs):
+        """
+        Register a stemmer using stemming table from a given file.
+        :param name: name of the stemmer
+        :param fpath: path to the file containing stemming trie
+        :param kwargs: further arguments of Stemmer.from_file
+        """
+        self.register(name, lambda: Stemmer.from_file(fpath, **kwargs))
+
+    def get(self, name: str) -> Stemmer:
+        """
+        Return the shared stemmer registered under a given name, loading it
+        on first use.
+        :param name: name of the stemmer
+        :return: stemmer instance
+        """
+        with self.__lock:
+            stemmer = self.__loaded.get(name)
+            if stemmer is not None:
+                self.__loaded.move_to_end(name)
+                return stemmer
+            try:
+                load_lock = self.__load_locks[name]
+            except KeyError:
+                raise KeyError("No stemmer registered as {!r}".format(name))
+
+        # Load outside of the registry lock, so that loading one table does
+        # not block callers of other tables.
+        with load_lock:
+            with self.__lock:
+                stemmer = self.__loaded.get(name)
+                if stemmer is not None:
+                    self.__loaded.move_to_end(name)
+                    return stemmer
+                loader = self.__loaders[name]
+            stemmer = loader()
+            size = stemmer.memory_usage()
+            with self.__lock:
+                self.__loaded[name] = stemmer
+                self.__sizes[name] = size
+                self.__enforce_budget(keep=name)
+            return stemmer
+
+    def memory_usage(self):
+        """
+        Return the estimated size of every loaded stemming table.
+        :return: dictionary of sizes in bytes, keyed by stemmer name
+        """
+        with self.__lock:
+            return dict(self.__sizes)
+
+    def loaded(self):
+        """
+        Return names of loaded stemmers, least recently used first.
+        """
+        with self.__lock:
+            return list(self.__loaded)
+
+    def evict(self, name: str):
+        """
+        Drop the loaded instance of a stemmer. It stays registered.
+        :param name: name of the stemmer
+        """
+        with self.__lock:
+            self.__unload(name)
+
+    def clear(self):
+        """
+        Drop all loaded stemmers. They stay registered.
+        """
+        with self.__lock:
+            self.__loaded.clear()
+            self.__sizes.clear()
+
+    def __unload(self, name):
+        self.__loaded.pop(name, None)
+        self.__sizes.pop(name, None)
+
+    def __enforce_budget(self, keep):
+        if self.memory_budget is None:
+            return
+        total = sum(self.__sizes.values())
+        for name in list(self.__loaded):
+            if total <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            total -= self.__sizes[name]
+            self.__unload(name)
+
+
+registry = StemmerRegistry()
+
+
+def get_stemmer(name: str) -> Stemmer:
+    """
+    Return the process-wide shared stemmer registered under a given name.
+    Stemmers "default" and "polimorf" are registered out of the box.
+    :param name: name of the stemmer
+    :return: stemmer instance
+    """
+    return registry.get(name)
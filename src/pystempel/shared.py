@@ -0,0 +1,158 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import multiprocessing
+import sys
+import weakref
+from multiprocessing import shared_memory
+from typing import Optional
+
+from pystempel import flat
+from pystempel.egothor import MultiTrie
+from pystempel.stemmer import Stemmer
+
+
+class SharedTable:
+    """
+    A stemming table published in shared memory in the precompiled format,
+    so that many processes on one host can stem with a single copy of it.
+
+    The process that publishes the table owns the block and should unlink it
+    when all workers are done. Other processes attach to it by name.
+
+    The stemmer of the table keeps it mapped for as long as the stemmer is
+    alive. When both are garbage collected, or the process exits, the
+    block is detached; it stays mapped until exit if objects made from the
+    stemmer still reference it, e.g. a vectorized stemmer.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        trie = flat.loads(shm.buf.toreadonly())
+        self.stemmer = Stemmer(trie)
+        self.stemmer.shared_table = self
+        self.__finalizer = weakref.finalize(self, _detach, trie, shm)
+
+    @classmethod
+    def publish(cls, stemmer: Stemmer, name: Optional[str] = None):
+        """
+        Copy the table of a loaded stemmer into a new shared memory block.
+        :param stemmer: the stemmer to publish
+        :param name: name of the block, generated if not given
+        :return: the published table
+        """
+        out = io.BytesIO()
+        flat.dump(stemmer.stemmer_trie, out)
+        data = out.getbuffer()
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+        shm.buf[: len(data)] = data
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str):
+        """
+        Attach to a table published by another process.
+        :param name: name of the shared memory block
+        :return: the attached table
+        """
+        if sys.version_info >= (3, 13):
+            return cls(shared_memory.SharedMemory(name=name, track=False), False)
+
+        from multiprocessing import resource_tracker
+
+        # Child processes share the resource tracker of their parent, where
+        # registering the block again does nothing. A tracker of our own
+        # would unlink the block on exit, so the registration is undone.
+        inherited = (
+            multiprocessing.parent_process() is not None
+            and resource_tracker._resource_tracker._fd is not None
+        )
+        shm = shared_memory.SharedMemory(name=name)
+        if not inherited and sys.platform != "win32":
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        """
+        Detach from the shared memory block. The stemmer of this table must not
+        be used afterwards.
+        :raises BufferError: if objects made from the stemmer still reference
+                             the block
+        """
+        detached = self.__finalizer.detach()
+        self.stemmer = None
+        if detached is not None:
+            _release(detached[2][0])
+        self.shm.close()
+
+    def unlink(self):
+        """
+        Request the shared memory block to be destroyed once all processes
+        have detached from it.
+        """
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        if self.owner:
+            self.unlink()
+
+
+def _release(trie):
+    # Release the views of the table, which would keep the block from being
+    # closed.
+    tries = trie.tries if isinstance(trie, MultiTrie) else [trie]
+    for t in tries:
+        t.release()
+
+
+def _detach(trie, shm):
+    _release(trie)
+    try:
+        shm.close()
+    except BufferError:
+        # Still referenced by other objects; unmapped when the process exits.
+        pass
+
+
+def publish(stemmer: Stemmer, name: Optional[str] = None) -> SharedTable:
+    """
+    Publish the table of a loaded stemmer in shared memory.
+    :param stemmer: the stemmer to publish
+    :param name: name of the shared memory block, generated if not given
+    :return: the published table
+    """
+    return SharedTable.publish(stemmer, name)
+
+
+def attach(name: str) -> Stemmer:
+    """
+    Construct a stemmer over a table published in shared memory by another
+    process. The table is mapped read-only and not copied.
+    :param name: name of the shared memory block
+    :return: stemmer instance
+    """
+    return SharedTable.attach(name).stemmer
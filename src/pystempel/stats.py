@@ -0,0 +1,114 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from collections import Counter, namedtuple
+
+# Structure of a trie:
+#
+#   forward     True if keys are read left to right
+#   rows        number of rows
+#   cells       number of cells in use
+#   cmd_cells   number of cells holding a patch command
+#   ptr_cells   number of cells referencing another row
+#   cmds        number of distinct patch commands
+#   depths      number of rows by their shortest distance from the root row;
+#               rows which cannot be reached from the root are not counted
+#   fanout      number of rows by the number of their cells in use
+#   memory      estimated number of bytes used by every structure of the trie
+TrieStats = namedtuple(
+    "TrieStats",
+    [
+        "forward",
+        "rows",
+        "cells",
+        "cmd_cells",
+        "ptr_cells",
+        "cmds",
+        "depths",
+        "fanout",
+        "memory",
+    ],
+)
+
+
+def trie_stats(forward, root, cmds, rows, memory):
+    """
+    Gather statistics of a trie in one pass over its cells.
+    :param forward: True if keys are read left to right
+    :param root: index of the root row
+    :param cmds: patch commands of the trie
+    :param rows: iterable over rows, each one an iterable over (has command,
+                 next row index or -1) pairs of its cells in use
+    :param memory: estimated number of bytes used by every structure
+    :return: TrieStats
+    """
+    cells = 0
+    cmd_cells = 0
+    ptr_cells = 0
+    fanout = Counter()
+    children = []
+    for row in rows:
+        refs = []
+        count = 0
+        for has_cmd, ref in row:
+            count += 1
+            if has_cmd:
+                cmd_cells += 1
+            if ref >= 0:
+                refs.append(ref)
+        cells += count
+        ptr_cells += len(refs)
+        fanout[count] += 1
+        children.append(refs)
+
+    depths = Counter()
+    if root < len(children):
+        seen = {root}
+        level = [root]
+        depth = 0
+        while level:
+            depths[depth] = len(level)
+            following = []
+            for row in level:
+                for ref in children[row]:
+                    if ref not in seen:
+                        seen.add(ref)
+                        following.append(ref)
+            level = following
+            depth += 1
+    return TrieStats(
+        forward,
+        len(children),
+        cells,
+        cmd_cells,
+        ptr_cells,
+        len(cmds),
+        dict(sorted(depths.items())),
+        dict(sorted(fanout.items())),
+        memory,
+    )
+
+
+def format_info(prefix, stats):
+    """
+    Format the summary of a trie printed by Trie.print_info.
+    :param prefix: text the summary starts with
+    :param stats: TrieStats of the trie
+    """
+    return "{}nds {} cmds {} cells {} valcells {} pntcells {}".format(
+        prefix, stats.rows, stats.cmds, stats.cells, stats.cmd_cells, stats.ptr_cells
+    )
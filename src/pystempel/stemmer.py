@@ -16,15 +16,22 @@ limitations under the License.
 """
 
 import gzip
+import mmap
 import os
 import struct
-from importlib.resources import Package, Resource
+import time
 from pathlib import Path
-from typing import Union
+from types import ModuleType
+from typing import Iterable, Iterator, Optional, Union
 
-from pystempel import egothor
-from pystempel.egothor import Trie, MultiTrie2
-from pystempel.streams import DataInputStream
+from pystempel import egothor, observers
+from pystempel.egothor import MultiTrie2, LazyTrie
+from pystempel.observers import LoadObserver
+from pystempel.streams import DataInputStream, DataInputBuffer, InflatingBuffer
+
+# importlib.resources dropped these aliases in Python 3.13.
+Package = Union[str, ModuleType]
+Resource = str
 
 
 class Stemmer:
@@ -36,7 +43,7 @@ class Stemmer:
         """
         from .data import original as file_resources
 
-        return cls.from_resource(file_resources, "stemmer_20000.tbl.gz")
+        return cls.from_resource(file_resources, "stemmer_20000.mtbl")
 
     @classmethod
     def polimorf(cls):
@@ -46,7 +53,7 @@ class Stemmer:
         """
         from .data import polimorf as file_resources
 
-        return cls.from_resource(file_resources, "stemmer_polimorf.tbl.gz")
+        return cls.from_resource(file_resources, "stemmer_polimorf.mtbl")
 
     @classmethod
     def from_resource(cls, file_resources: Package, fname: Resource):
@@ -69,41 +76,182 @@ class Stemmer:
         return cls.from_file(package_path)
 
     @classmethod
-    def from_file(cls, fpath: Union[Path, str]):
+    def from_file(
+        cls,
+        fpath: Union[Path, str],
+        lazy=False,
+        cache=False,
+        observer: Optional[LoadObserver] = None,
+        pipelined=False,
+    ):
         """
         Construct a stemmer using stemming table from a given file.
         :param fpath: path to the file containing stemming trie.
+        :param lazy: if True, rows of the trie are decoded only when first
+                     needed, and uncompressed tables are memory-mapped.
+        :param cache: if True, or a TableCache instance, the parsed table is
+                      snapshotted on disk and later loads reuse the snapshot.
+        :param observer: LoadObserver notified of loading progress and timings.
+        :param pipelined: if True, a gzip-compressed table is inflated in a
+                          background thread while it is decoded, instead of
+                          up front. Ignored for lazy and cached loads.
         :return: stemmer instance.
         """
         if isinstance(fpath, str):
             fpath = Path(fpath)
 
+        if observer is None:
+            return Stemmer(cls.__load_file(fpath, lazy, cache, None, pipelined))
         if fpath.suffix == ".gz":
-            file_size = get_uncompressed_size(fpath)
-            with gzip.open(fpath, "rb") as f:
-                return cls.from_stream(DataInputStream(f, file_size))
+            total_bytes = get_uncompressed_size(fpath)
+        else:
+            total_bytes = os.stat(fpath).st_size
+        return Stemmer(
+            _observe(
+                observer,
+                total_bytes,
+                lambda: cls.__load_file(fpath, lazy, cache, observer, pipelined),
+            )
+        )
+
+    @classmethod
+    def __load_file(cls, fpath: Path, lazy, cache, observer, pipelined=False):
+        from pystempel import flat
+
+        if cache:
+            return cls.__load_cached(fpath, cache, observer)
+
+        if fpath.suffix == ".gz" and pipelined and not lazy:
+            with open(fpath, "rb") as f, InflatingBuffer(f) as stream:
+                if not flat.is_flat(stream.peek(len(flat.MAGIC))):
+                    return cls.__load_stream(stream, False, observer)
+
+        if fpath.suffix == ".gz":
+            # Inflating up front is as fast as InflatingBuffer on one core,
+            # and no gain from more cores has been measured.
+            with open(fpath, "rb") as f:
+                data = _decompress(f.read(), observer)
         else:
-            file_size = os.stat(fpath).st_size
             with open(fpath, "rb") as f:
-                return cls.from_stream(DataInputStream(f, file_size))
+                if flat.is_flat(f.read(len(flat.MAGIC))):
+                    return flat.load(fpath)
+                if lazy:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    f.seek(0)
+                    data = f.read()
+        return cls.__load_bytes(data, lazy, observer)
 
     @classmethod
-    def from_stream(cls, stream):
+    def __load_cached(cls, fpath: Path, cache, observer):
+        from pystempel import flat
+        from pystempel.diskcache import TableCache
+
+        table_cache = cache if isinstance(cache, TableCache) else TableCache()
+        with open(fpath, "rb") as f:
+            raw = f.read()
+        if flat.is_flat(raw):
+            return flat.load(fpath)
+
+        key = table_cache.key(raw)
+        stemmer_trie = table_cache.load(key)
+        if stemmer_trie is not None:
+            return stemmer_trie
+
+        data = _decompress(raw, observer) if fpath.suffix == ".gz" else raw
+        stemmer_trie = cls.__load_bytes(data, False, observer)
+        table_cache.store(key, stemmer_trie)
+        return stemmer_trie
+
+    @classmethod
+    def from_bytes(cls, data, lazy=False, observer: Optional[LoadObserver] = None):
+        """
+        Construct a stemmer using stemming table from an uncompressed
+        in-memory buffer.
+        :param data: bytes-like object containing stemming trie.
+        :param lazy: if True, rows of the trie are decoded only when first
+                     needed.
+        :param observer: LoadObserver notified of loading progress and timings.
+        :return: stemmer instance.
+        """
+        return Stemmer(
+            _observe(
+                observer, len(data), lambda: cls.__load_bytes(data, lazy, observer)
+            )
+        )
+
+    @classmethod
+    def __load_bytes(cls, data, lazy, observer):
+        from pystempel import flat
+
+        if flat.is_flat(data):
+            return flat.loads(data)
+        return cls.__load_stream(DataInputBuffer(data), lazy, observer)
+
+    @classmethod
+    def from_stream(
+        cls,
+        stream,
+        lazy=False,
+        observer: Optional[LoadObserver] = None,
+        pipelined=False,
+    ):
         """
         Construct a stemmer using stemming table from a given stream.
-        :param stream:
-        :return:
+        :param stream: DataInputStream or DataInputBuffer with stemming trie,
+                       or a binary file-like object.
+        :param lazy: if True, rows of the trie are decoded only when first
+                     needed; requires a DataInputBuffer.
+        :param observer: LoadObserver notified of loading progress and timings.
+        :param pipelined: if True, `stream` is a binary file-like object with
+                          gzip-compressed data, inflated in a background
+                          thread while it is decoded.
+        :return: stemmer instance.
         """
-        stemmer_table = cls.__trie_from_stream(stream)
-        return Stemmer(stemmer_table)
+        if pipelined:
+            if lazy:
+                raise TypeError("Lazy loading requires a DataInputBuffer")
+            with InflatingBuffer(stream) as inflating:
+                return Stemmer(
+                    _observe(
+                        observer,
+                        None,
+                        lambda: cls.__load_stream(inflating, False, observer),
+                    )
+                )
+        if not isinstance(stream, (DataInputStream, DataInputBuffer)):
+            stream = DataInputStream(stream)
+        return Stemmer(
+            _observe(
+                observer,
+                stream.total_bytes,
+                lambda: cls.__load_stream(stream, lazy, observer),
+            )
+        )
 
     @classmethod
-    def __trie_from_stream(cls, inp: DataInputStream):
+    def __load_stream(cls, stream, lazy, observer):
+        if observer is not None:
+            stream.observer = observer
+        stemmer_trie = cls.__trie_from_stream(stream, lazy)
+        if observer is not None and isinstance(stream, InflatingBuffer):
+            observer.on_phase(observers.DECOMPRESS, stream.inflate_seconds)
+        return stemmer_trie
+
+    @classmethod
+    def __trie_from_stream(
+        cls, inp: Union[DataInputStream, DataInputBuffer], lazy=False
+    ):
+        if lazy and not isinstance(inp, DataInputBuffer):
+            raise TypeError("Lazy loading requires a DataInputBuffer")
+        from pystempel.flat import FlatTrie
+
+        trie_loader = LazyTrie.from_stream if lazy else FlatTrie.from_stream
         method = inp.read_utf().upper()
         if "M" in method:
-            return MultiTrie2.from_stream(inp)
+            return MultiTrie2.from_stream(inp, trie_loader)
         else:
-            return Trie.from_stream(inp)
+            return trie_loader(inp)
 
     def __init__(self, stemmer_trie):
         """
@@ -111,6 +259,171 @@ class Stemmer:
         :param stemmer_trie: stemming trie.
         """
         self.stemmer_trie = stemmer_trie
+        # Patch programs compiled on first use, by patch string
+        self.__programs = {}
+
+    def memory_usage(self):
+        """
+        Estimate the number of bytes used by the stemming table.
+        :return: estimated size in bytes
+        """
+        return self.stemmer_trie.memory_usage()
+
+    def stats(self):
+        """
+        Gather statistics of the structure of the stemming table: numbers of
+        rows and cells, command table size, depth and fan-out histograms, and
+        estimated bytes used by every structure.
+        :return: list of TrieStats, one for every sub-trie of the table.
+        """
+        stats = self.stemmer_trie.stats()
+        return stats if isinstance(stats, list) else [stats]
+
+    def compile(self):
+        """
+        Construct a stemmer with the stemming table compiled for fast lookups.
+        Compiling takes a moment and the compiled table needs more memory, so
+        it pays off when many words are stemmed.
+        :return: stemmer instance producing the same stems.
+        """
+        from pystempel.lookup import compile_trie
+
+        return Stemmer(compile_trie(self.stemmer_trie))
+
+    def cached(self, maxsize=65536, policy="lru"):
+        """
+        Construct a stemmer remembering stems of recently stemmed words.
+        :param maxsize: maximum number of cached words.
+        :param policy: eviction policy, "lru" or frequency-aware "tinylfu".
+        :return: CachedStemmer instance.
+        """
+        from pystempel.caching import CachedStemmer
+
+        return CachedStemmer(self, maxsize, policy)
+
+    def instrumented(self, trace_every=1):
+        """
+        Construct a stemmer recording metrics of this stemmer: numbers of
+        calls and of words which could not be stemmed, sub-tries visited and
+        characters walked per word, and latency histograms of single and
+        batch calls, exportable as a dict or in the Prometheus text format.
+        :param trace_every: trace sub-tries and characters walked of every
+                            n-th word; 0 disables tracing.
+        :return: InstrumentedStemmer instance.
+        """
+        from pystempel.instrumentation import InstrumentedStemmer
+
+        return InstrumentedStemmer(self, trace_every)
+
+    def vectorize(self, batch_size=65536, max_length=64):
+        """
+        Construct a stemmer which stems batches of words passed to stem_many
+        with NumPy, walking the stemming table for all words at once. Requires
+        NumPy.
+        :param batch_size: maximum number of words walked at once.
+        :param max_length: longest word walked in a batch; longer words are
+                           stemmed one by one.
+        :return: VectorizedStemmer instance.
+        """
+        from pystempel.vectorized import VectorizedStemmer
+
+        return VectorizedStemmer(self, batch_size, max_length)
+
+    def with_lexicon(self, lexicon):
+        """
+        Construct a stemmer answering from a precomputed lexicon first and
+        using this stemmer only for words missing in it.
+        :param lexicon: Lexicon instance, or path to a lexicon file which is
+                        memory-mapped.
+        :return: LexiconStemmer instance.
+        """
+        from pystempel import lexicon as lexicons
+
+        if isinstance(lexicon, (str, Path)):
+            lexicon = lexicons.load(lexicon)
+        return lexicons.LexiconStemmer(self, lexicon)
+
+    def freeze(self):
+        """
+        Construct an immutable stemmer which many threads can share without
+        locks, also on free-threaded Python builds. The stemming table is
+        compiled unless it already is.
+        :return: FrozenStemmer instance producing the same stems.
+        """
+        from pystempel.frozen import FrozenStemmer
+
+        return FrozenStemmer(self)
+
+    def stem_parallel(
+        self, words: Iterable[str], workers=None, chunksize=10000
+    ) -> Iterator[Optional[str]]:
+        """
+        Stem words in a pool of worker processes sharing the stemming table
+        through shared memory. Stems are yielded in the order of the words,
+        which are read lazily, so unbounded iterables can be stemmed. The
+        table must not be compiled; workers walk the shared copy of it.
+        :param words: iterable of words.
+        :param workers: number of worker processes, the number of CPUs by
+                        default.
+        :param chunksize: number of words sent to a worker at once.
+        :return: iterator over stems, None for words which could not be
+                 stemmed.
+        """
+        from pystempel.parallel import ParallelStemmer
+
+        with ParallelStemmer(self, workers, chunksize) as parallel:
+            yield from parallel.imap(words)
+
+    def stem_threaded(
+        self, words: Iterable[str], workers=None, chunksize=10000
+    ) -> Iterator[Optional[str]]:
+        """
+        Stem words in a pool of threads sharing a frozen copy of this stemmer.
+        Stems are yielded in the order of the words, which are read lazily.
+        Threads only run in parallel on free-threaded Python builds; with the
+        GIL use stem_parallel.
+        :param words: iterable of words.
+        :param workers: number of threads, the number of CPUs by default.
+        :param chunksize: number of words stemmed by a thread at once.
+        :return: iterator over stems, None for words which could not be
+                 stemmed.
+        """
+        from pystempel.parallel import ThreadedStemmer
+
+        with ThreadedStemmer(self, workers, chunksize) as threaded:
+            yield from threaded.imap(words)
+
+    def stem_text(self, text: str, lowercase=True, cache=0):
+        """
+        Tokenize and stem text. Tokens are runs of letters.
+        :param text: the text.
+        :param lowercase: if True, tokens are lowercased before stemming.
+        :param cache: if positive, stems of this many recently seen tokens are
+                      remembered.
+        :return: iterator over (token, stem, start, end) tuples, where token is
+                 the normalized token, stem is None if it could not be stemmed,
+                 and start and end are character offsets of the token.
+        """
+        from pystempel import text as texts
+
+        return texts.stem_text(self, text, lowercase, cache)
+
+    def stem_stream(self, stream, lowercase=True, cache=0, encoding="utf-8"):
+        """
+        Tokenize and stem text read from a stream in chunks, in bounded
+        memory. Tokens are runs of letters.
+        :param stream: text or binary file-like object.
+        :param lowercase: if True, tokens are lowercased before stemming.
+        :param cache: if positive, stems of this many recently seen tokens are
+                      remembered.
+        :param encoding: encoding of binary streams.
+        :return: iterator over (token, stem, start, end) tuples, where token is
+                 the normalized token, stem is None if it could not be stemmed,
+                 and start and end are character offsets of the token.
+        """
+        from pystempel import text as texts
+
+        return texts.stem_stream(self, stream, lowercase, cache, encoding=encoding)
 
     def __call__(self, word):
         """
@@ -123,9 +436,74 @@ class Stemmer:
         if patch is None:
             return None
 
-        buffer = list(word)
-        egothor.apply_patch(buffer, patch)
-        return "".join(buffer) if len(buffer) > 0 else None
+        program = self.__programs.get(patch)
+        if program is None:
+            program = self.__programs[patch] = egothor.compile_patch(patch)
+        return program(word) or None
+
+    def stem_many(self, words: Iterable[str], mask=False):
+        """
+        Stem a batch of words. Every distinct word is stemmed once, which
+        saves a lot of work on natural text, where words repeat.
+        :param words: iterable of words.
+        :param mask: if True, return stems of words which could not be stemmed
+                     as the words themselves, together with a mask of them.
+        :return: list of stems aligned with the words, None for words which
+                 could not be stemmed; if mask is True, a tuple of the list of
+                 stems and a list of flags set for words which could not be
+                 stemmed.
+        """
+        if isinstance(words, str):
+            raise TypeError("Expected an iterable of words, not a string")
+        if not isinstance(words, (list, tuple)):
+            words = list(words)
+        distinct = list(dict.fromkeys(words))
+        stems = dict(zip(distinct, self._stem_distinct(distinct)))
+        result = list(map(stems.__getitem__, words))
+        if not mask:
+            return result
+        missing = [stem is None for stem in result]
+        result = [word if stem is None else stem for word, stem in zip(words, result)]
+        return result, missing
+
+    def _stem_distinct(self, words):
+        """
+        Stem distinct words, without per-word method calls.
+        :param words: list of distinct words.
+        :return: list of stems, None for words which could not be stemmed.
+        """
+        get_last_on_path = self.stemmer_trie.get_last_on_path
+        programs = self.__programs
+        stems = []
+        append = stems.append
+        for word in words:
+            patch = get_last_on_path(word)
+            if patch is None:
+                append(None)
+                continue
+            program = programs.get(patch)
+            if program is None:
+                program = programs[patch] = egothor.compile_patch(patch)
+            append(program(word) or None)
+        return stems
+
+
+def _observe(observer, total_bytes, load):
+    if observer is None:
+        return load()
+    start = time.perf_counter()
+    observer.on_start(total_bytes)
+    result = load()
+    observer.on_end(time.perf_counter() - start)
+    return result
+
+
+def _decompress(data, observer):
+    start = time.perf_counter()
+    data = gzip.decompress(data)
+    if observer is not None:
+        observer.on_phase(observers.DECOMPRESS, time.perf_counter() - start)
+    return data
 
 
 def get_uncompressed_size(fpath):
@@ -15,31 +15,48 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import queue
 import struct
-from tqdm import tqdm
-import os
+import threading
+import time
+import zlib
 
-DISABLE_TQDM = os.environ.get("DISABLE_TQDM", False)
+_structs = {}
 
 
-class ProgressStream:
-    def __init__(self, stream, total_bytes):
-        self.stream = stream
-        self.pbar = tqdm(
-            total=total_bytes, desc="Loading", unit="bytes", disable=DISABLE_TQDM
-        )
-
-    def read(self, size):
-        self.pbar.update(size)
-        return self.stream.read(size)
+def _struct(fmt):
+    try:
+        return _structs[fmt]
+    except KeyError:
+        record = _structs[fmt] = struct.Struct(fmt)
+        return record
 
 
 class DataInputStream:
-    def __init__(self, stream, total_bytes=None):
-        if total_bytes is None:
-            self.stream = stream
-        else:
-            self.stream = ProgressStream(stream, total_bytes)
+    def __init__(self, stream, total_bytes=None, observer=None):
+        """
+        :param stream: binary file-like object
+        :param total_bytes: number of bytes in the stream, if known
+        :param observer: LoadObserver notified while a table is decoded
+        """
+        self.stream = stream
+        self.total_bytes = total_bytes
+        self.observer = observer
+
+    def position(self):
+        """
+        Return the number of bytes consumed so far, if the stream tells it.
+        """
+        try:
+            return self.stream.tell()
+        except (AttributeError, OSError):
+            return None
+
+    def read(self, size):
+        data = self.stream.read(size)
+        if len(data) != size:
+            raise EOFError()
+        return data
 
     def read_boolean(self):
         return struct.unpack("?", self.stream.read(1))[0]
@@ -75,6 +92,102 @@ class DataInputStream:
     def read_int(self):
         return struct.unpack(">i", self.stream.read(4))[0]
 
+    def read_records(self, fmt, count):
+        """
+        Read `count` consecutive fixed-size records in a single read.
+        :param fmt: struct format of a single record
+        :param count: number of records to read
+        :return: iterator over unpacked records
+        """
+        record = _struct(fmt)
+        return record.iter_unpack(self.stream.read(record.size * count))
+
+
+class DataInputBuffer:
+    """
+    Decodes the same primitives as DataInputStream, but from an in-memory
+    buffer, so that fields are unpacked in place instead of being read one
+    by one from the underlying stream.
+    """
+
+    def __init__(self, buffer, observer=None):
+        """
+        :param buffer: bytes-like object
+        :param observer: LoadObserver notified while a table is decoded
+        """
+        self.buffer = memoryview(buffer)
+        self.offset = 0
+        self.total_bytes = len(self.buffer)
+        self.observer = observer
+
+    def position(self):
+        """
+        Return the number of bytes consumed so far.
+        """
+        return self.offset
+
+    def _unpack(self, record):
+        value = record.unpack_from(self.buffer, self.offset)[0]
+        self.offset += record.size
+        return value
+
+    def read(self, size):
+        end = self.offset + size
+        if end > len(self.buffer):
+            raise EOFError()
+        data = self.buffer[self.offset : end].tobytes()
+        self.offset = end
+        return data
+
+    def read_boolean(self):
+        return self._unpack(_struct("?"))
+
+    def read_byte(self):
+        return self._unpack(_struct("b"))
+
+    def read_unsigned_byte(self):
+        return self._unpack(_struct("B"))
+
+    def read_char(self):
+        return chr(self._unpack(_struct(">H")))
+
+    def read_double(self):
+        return self._unpack(_struct(">d"))
+
+    def read_float(self):
+        return self._unpack(_struct(">f"))
+
+    def read_short(self):
+        return self._unpack(_struct(">h"))
+
+    def read_unsigned_short(self):
+        return self._unpack(_struct(">H"))
+
+    def read_long(self):
+        return self._unpack(_struct(">q"))
+
+    def read_utf(self):
+        utf_length = self._unpack(_struct(">H"))
+        return self.read(utf_length).decode("utf-8")
+
+    def read_int(self):
+        return self._unpack(_struct(">i"))
+
+    def read_records(self, fmt, count):
+        """
+        Decode `count` consecutive fixed-size records directly from the buffer.
+        :param fmt: struct format of a single record
+        :param count: number of records to read
+        :return: iterator over unpacked records
+        """
+        record = _struct(fmt)
+        end = self.offset + record.size * count
+        if end > len(self.buffer):
+            raise EOFError()
+        records = record.iter_unpack(self.buffer[self.offset : end])
+        self.offset = end
+        return records
+
 
 class DataOutputStream:
     def __init__(self, stream):
@@ -84,10 +197,140 @@ class DataOutputStream:
         self.stream.write(struct.pack(">i", i))
 
     def write_char(self, ch):
-        self.stream.write(struct.pack(">H", ch))
+        self.stream.write(struct.pack(">H", ord(ch)))
 
     def write_utf(self, s):
-        self.stream.write(s.encode("utf-8"))
+        data = s.encode("utf-8")
+        if len(data) > 0xFFFF:
+            raise ValueError("String too long: {} bytes".format(len(data)))
+        self.stream.write(struct.pack(">H", len(data)))
+        self.stream.write(data)
 
     def write_boolean(self, b):
         self.stream.write(struct.pack("?", b))
+
+
+class InflatingBuffer(DataInputBuffer):
+    """
+    A DataInputBuffer over a gzip-compressed stream, which is inflated in a
+    background thread while the caller decodes already inflated data. zlib
+    releases the GIL while inflating, so both run in parallel.
+    """
+
+    CHUNK_SIZE = 256 * 1024
+    MAX_PENDING_CHUNKS = 16
+
+    def __init__(self, fileobj, total_bytes=None, observer=None, chunk_size=CHUNK_SIZE):
+        """
+        :param fileobj: binary file-like object with gzip-compressed data
+        :param total_bytes: uncompressed size, if known
+        :param observer: LoadObserver notified while a table is decoded
+        :param chunk_size: number of compressed bytes inflated at once
+        """
+        super().__init__(b"", observer)
+        self.total_bytes = total_bytes
+        self.inflate_seconds = 0.0
+        self.__consumed = 0
+        self.__error = None
+        self.__chunks = queue.Queue(self.MAX_PENDING_CHUNKS)
+        self.__closed = threading.Event()
+        self.__thread = threading.Thread(
+            target=self.__inflate, args=(fileobj, chunk_size), daemon=True
+        )
+        self.__thread.start()
+
+    def __put(self, item):
+        while not self.__closed.is_set():
+            try:
+                self.__chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __inflate(self, fileobj, chunk_size):
+        try:
+            inflater = zlib.decompressobj(wbits=31)
+            while True:
+                data = fileobj.read(chunk_size)
+                if not data:
+                    break
+                while data:
+                    start = time.perf_counter()
+                    chunk = inflater.decompress(data)
+                    self.inflate_seconds += time.perf_counter() - start
+                    if chunk and not self.__put(chunk):
+                        return
+                    data = b""
+                    if inflater.eof:
+                        # Concatenated gzip members
+                        data = inflater.unused_data
+                        inflater = zlib.decompressobj(wbits=31)
+            chunk = inflater.flush()
+            if chunk:
+                self.__put(chunk)
+            self.__put(None)
+        except BaseException as e:
+            self.__put(e)
+
+    def position(self):
+        return self.__consumed + self.offset
+
+    def __fill(self, size):
+        if self.__error is not None:
+            raise self.__error
+        self.__consumed += self.offset
+        pending = [self.buffer[self.offset :]]
+        available = len(pending[0])
+        while available < size:
+            chunk = self.__chunks.get()
+            if chunk is None:
+                self.__chunks.put(None)
+                break
+            if isinstance(chunk, BaseException):
+                # The producer has stopped, so every later read fails too.
+                self.__error = chunk
+                raise chunk
+            pending.append(chunk)
+            available += len(chunk)
+        self.buffer = memoryview(b"".join(pending))
+        self.offset = 0
+        if available < size:
+            raise EOFError()
+
+    def _unpack(self, record):
+        if self.offset + record.size > len(self.buffer):
+            self.__fill(record.size)
+        return super()._unpack(record)
+
+    def read(self, size):
+        if self.offset + size > len(self.buffer):
+            self.__fill(size)
+        return super().read(size)
+
+    def read_records(self, fmt, count):
+        size = _struct(fmt).size * count
+        if self.offset + size > len(self.buffer):
+            self.__fill(size)
+        return super().read_records(fmt, count)
+
+    def peek(self, size):
+        """
+        Return up to `size` next bytes without consuming them.
+        """
+        if self.offset + size > len(self.buffer):
+            self.__fill(size)
+        return self.buffer[self.offset : self.offset + size].tobytes()
+
+    def close(self):
+        """
+        Stop the background thread.
+        """
+        self.__closed.set()
+        self.__thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,130 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import codecs
+import re
+from itertools import islice
+from typing import Iterator, Optional, Tuple
+
+from pystempel.stemmer import Stemmer
+
+# Runs of letters; digits, underscores and all other characters separate tokens
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+")
+
+# Number of tokens stemmed at once
+DEFAULT_BATCH_SIZE = 65536
+
+# Number of characters read from a stream at once
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+StemmedToken = Tuple[str, Optional[str], int, int]
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    Split text into tokens, i.e. runs of letters of any script.
+    :param text: the text
+    :return: iterator over (token, start, end) tuples, where start and end
+             are character offsets of the token in the text
+    """
+    for match in TOKEN_PATTERN.finditer(text):
+        yield match.group(), match.start(), match.end()
+
+
+def stem_text(
+    stemmer: Stemmer,
+    text: str,
+    lowercase=True,
+    cache: int = 0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[StemmedToken]:
+    """
+    Tokenize and stem text.
+    :param stemmer: the stemmer
+    :param text: the text
+    :param lowercase: if True, tokens are lowercased before stemming
+    :param cache: if positive, stems of this many recently seen tokens are
+                  remembered across batches
+    :param batch_size: number of tokens stemmed at once
+    :return: iterator over (token, stem, start, end) tuples, where token is
+             the normalized token, stem is None if it could not be stemmed,
+             and start and end are character offsets of the token in the text
+    """
+    if cache > 0:
+        stemmer = stemmer.cached(cache)
+    matches = TOKEN_PATTERN.finditer(text)
+    while True:
+        batch = list(islice(matches, batch_size))
+        if not batch:
+            return
+        yield from _stem_matches(stemmer, batch, 0, lowercase)
+
+
+def stem_stream(
+    stemmer: Stemmer,
+    stream,
+    lowercase=True,
+    cache: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    encoding: str = "utf-8",
+) -> Iterator[StemmedToken]:
+    """
+    Tokenize and stem text read from a stream, in chunks, so that memory use
+    does not depend on the size of the text.
+    :param stemmer: the stemmer
+    :param stream: text or binary file-like object
+    :param lowercase: if True, tokens are lowercased before stemming
+    :param cache: if positive, stems of this many recently seen tokens are
+                  remembered across chunks
+    :param chunk_size: number of characters or bytes read at once
+    :param encoding: encoding of binary streams
+    :return: iterator over (token, stem, start, end) tuples, where token is
+             the normalized token, stem is None if it could not be stemmed,
+             and start and end are character offsets of the token in the text
+    """
+    if cache > 0:
+        stemmer = stemmer.cached(cache)
+    decoder = None
+    if isinstance(stream.read(0), bytes):
+        decoder = codecs.getincrementaldecoder(encoding)()
+    offset = 0
+    tail = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        end = not chunk
+        if decoder is not None:
+            chunk = decoder.decode(chunk, final=end)
+        text = tail + chunk
+        matches = list(TOKEN_PATTERN.finditer(text))
+        cut = len(text)
+        if not end and matches and matches[-1].end() == cut:
+            # The last token may continue in the next chunk.
+            cut = matches.pop().start()
+        yield from _stem_matches(stemmer, matches, offset, lowercase)
+        if end:
+            return
+        tail = text[cut:]
+        offset += cut
+
+
+def _stem_matches(stemmer, matches, offset, lowercase):
+    tokens = [match.group() for match in matches]
+    if lowercase:
+        tokens = [token.lower() for token in tokens]
+    stems = stemmer.stem_many(tokens)
+    for token, stem, match in zip(tokens, stems, matches):
+        yield token, stem, offset + match.start(), offset + match.end()
@@ -0,0 +1,255 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import numpy as np
+
+from pystempel.egothor import (
+    DASH_COMMAND,
+    DELETE_COMMAND,
+    MultiTrie,
+    MultiTrie2,
+    compile_patch,
+    length_pp,
+)
+from pystempel.flat import FlatTrie
+from pystempel.stemmer import Stemmer
+
+# Transitions are looked up by row << CHAR_BITS | code point
+CHAR_BITS = 21
+
+# Number of words walked at once
+DEFAULT_BATCH_SIZE = 65536
+
+# Longest word walked in a batch; batches are padded to their longest word,
+# so longer words are stemmed one by one
+DEFAULT_MAX_LENGTH = 64
+
+
+class VectorTrie:
+    """
+    The transitions of a trie as NumPy arrays, sorted by (row, character),
+    so that transitions of many words are looked up with one binary search.
+    """
+
+    def __init__(self, trie):
+        """
+        :param trie: a FlatTrie, or any Trie built of Row objects
+        """
+        if not isinstance(trie, FlatTrie):
+            trie = FlatTrie.from_trie(trie)
+        offsets = np.asarray(trie.offsets, dtype=np.int64)
+        rows = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+        self.forward = trie.forward
+        self.root = trie.root
+        self.keys = rows << CHAR_BITS | np.asarray(trie.chars, dtype=np.int64)
+        self.cmd_ids = np.asarray(trie.cmd_ids, dtype=np.int64)
+        self.refs = np.asarray(trie.refs, dtype=np.int64)
+        self.cmds = list(trie.cmds)
+
+    def walk(self, codes, lengths, starts):
+        """
+        Walk the trie for many keys at once, one character position at a time.
+        :param codes: matrix of code points of keys, one key per row, in the
+                      order the trie reads them
+        :param lengths: length of every key
+        :param starts: position of every key the walk starts at
+        :return: id of the last command on the path of every key, -1 if none
+        """
+        last = np.full(len(lengths), -1, dtype=np.int64)
+        active = np.flatnonzero(starts < lengths)
+        now = np.full(len(active), self.root, dtype=np.int64)
+        positions = starts[active]
+        keys = self.keys
+        while len(active):
+            query = now << CHAR_BITS | codes[active, positions]
+            found = np.searchsorted(keys, query)
+            np.minimum(found, len(keys) - 1, out=found)
+            hit = keys[found] == query
+            active, positions, found = active[hit], positions[hit], found[hit]
+            cmd_ids = self.cmd_ids[found]
+            has_cmd = cmd_ids >= 0
+            last[active[has_cmd]] = cmd_ids[has_cmd]
+            now = self.refs[found]
+            positions += 1
+            go_on = (now >= 0) & (positions < lengths[active])
+            active, positions, now = active[go_on], positions[go_on], now[go_on]
+        return last
+
+
+class VectorizedStemmer(Stemmer):
+    """
+    A stemmer which stems batches of words with NumPy: the stemming tries are
+    walked for all words of a batch at once, level by level, and every
+    distinct patch is compiled once and applied to all words needing it.
+    Single words are stemmed as by the wrapped stemmer.
+    """
+
+    def __init__(
+        self,
+        stemmer: Stemmer,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_length: int = DEFAULT_MAX_LENGTH,
+    ):
+        """
+        :param stemmer: stemmer with a Trie, FlatTrie or MultiTrie2 of them
+        :param batch_size: maximum number of words walked at once
+        :param max_length: longest word walked in a batch; a batch takes
+                           about 9 * batch_size * max_length bytes, longer
+                           words are stemmed by the wrapped stemmer
+        """
+        super().__init__(stemmer.stemmer_trie)
+        trie = stemmer.stemmer_trie
+        if isinstance(trie, MultiTrie) and not isinstance(trie, MultiTrie2):
+            raise TypeError("MultiTrie tables are not supported")
+        tries = trie.tries if isinstance(trie, MultiTrie2) else [trie]
+        if any(t.forward != trie.forward for t in tries):
+            raise TypeError("Tries of mixed directions are not supported")
+        self.stemmer = stemmer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.multi = isinstance(trie, MultiTrie2)
+        self.forward = trie.forward
+        self.tries = [VectorTrie(t) for t in tries]
+        self.__cmd_info = [_cmd_info(t.cmds) for t in self.tries]
+        self.__programs = {}
+
+    def __call__(self, word):
+        return self.stemmer(word)
+
+    def _stem_distinct(self, words):
+        max_length = self.max_length
+        short = [word for word in words if len(word) <= max_length]
+        stems = []
+        for i in range(0, len(short), self.batch_size):
+            stems.extend(self.__stem_batch(short[i : i + self.batch_size]))
+        if len(short) == len(words):
+            return stems
+        stems = iter(stems)
+        return [
+            next(stems) if len(word) <= max_length else self.stemmer(word)
+            for word in words
+        ]
+
+    def __stem_batch(self, words):
+        if not words:
+            return []
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        codes = _encode(words if self.forward else [w[::-1] for w in words], lengths)
+        if self.multi:
+            patch_ids = self.__walk_multi(codes, lengths)
+        else:
+            patch_ids = self.tries[0].walk(codes, lengths, np.zeros_like(lengths))[
+                :, None
+            ]
+
+        # Apply every distinct patch to all words needing it.
+        groups = np.zeros(len(words), dtype=np.int64)
+        for column in patch_ids.T:
+            # Number the distinct combinations of command ids seen so far.
+            _, groups = np.unique(
+                groups * (int(column.max()) + 2) + column + 1, return_inverse=True
+            )
+            groups = groups.reshape(-1)
+        order = np.argsort(groups, kind="stable")
+        firsts = order[np.flatnonzero(np.diff(groups[order], prepend=-1))]
+        bounds = np.append(np.searchsorted(groups[order], groups[firsts]), len(words))
+        stems = [None] * len(words)
+        for u, ids in enumerate(patch_ids[firsts].tolist()):
+            program = self.__program(ids)
+            if program is None:
+                continue
+            for i in order[bounds[u] : bounds[u + 1]].tolist():
+                stems[i] = program(words[i]) or None
+        return stems
+
+    def __program(self, ids):
+        if self.multi:
+            patch = "".join(self.tries[t].cmds[c] for t, c in enumerate(ids) if c >= 0)
+        elif ids[0] < 0:
+            return None
+        else:
+            patch = self.tries[0].cmds[ids[0]]
+        program = self.__programs.get(patch)
+        if program is None:
+            program = self.__programs[patch] = compile_patch(patch)
+        return program
+
+    def __walk_multi(self, codes, lengths):
+        """
+        Evaluate the MultiTrie2 lookup for all words, tracking the position
+        every sub-trie walk starts at, as HashMultiTrie2 does for one word.
+        :return: matrix of command ids making up the patch of every word, one
+                 column per sub-trie, -1 where the patch has no part
+        """
+        count = len(lengths)
+        parts = np.full((count, len(self.tries)), -1, dtype=np.int64)
+        start = np.zeros(count, dtype=np.int64)
+        walk_start = np.zeros(count, dtype=np.int64)
+        prev_len = np.zeros(count, dtype=np.int64)
+        last_ch = np.full(count, ord(" "), dtype=np.int64)
+        alive = np.ones(count, dtype=bool)
+        for t, (trie, info) in enumerate(zip(self.tries, self.__cmd_info)):
+            last = trie.walk(codes, lengths, np.where(alive, walk_start, lengths))
+            alive &= last >= 0
+            r = np.where(alive, last, 0)
+            eom, first, second_last, length, is_dash = (column[r] for column in info)
+            alive &= ~eom
+            alive &= ~(
+                (first == last_ch)
+                & ((first == ord(DASH_COMMAND)) | (first == ord(DELETE_COMMAND)))
+            )
+            last_ch = np.where(alive, second_last, last_ch)
+            dash = alive & is_dash
+            for skip in ([prev_len] if t > 0 else []) + [length]:
+                start = np.where(dash, start + skip, start)
+                over = dash & (start > lengths)
+                if self.forward:
+                    start = np.where(over, lengths, start)
+                else:
+                    alive &= ~over
+                    dash &= ~over
+            parts[alive, t] = r[alive]
+            prev_len = length
+            walk_start = np.where(alive & (start < lengths), start, walk_start)
+            if not alive.any():
+                break
+        return parts
+
+
+def _cmd_info(cmds):
+    """
+    Properties of every command of a trie needed by the MultiTrie2 lookup.
+    """
+    return (
+        np.array([cmd == MultiTrie.EOM for cmd in cmds] or [False]),
+        np.array([ord(cmd[0]) if cmd else 0 for cmd in cmds] or [0]),
+        np.array([ord(cmd[-2]) if len(cmd) > 1 else 0 for cmd in cmds] or [0]),
+        np.array([length_pp(cmd) for cmd in cmds] or [0], dtype=np.int64),
+        np.array([cmd[:1] == DASH_COMMAND for cmd in cmds] or [False]),
+    )
+
+
+def _encode(words, lengths):
+    """
+    Encode words as a matrix of code points padded with zeros.
+    """
+    codes = np.zeros((len(words), max(int(lengths.max()), 1)), dtype=np.int64)
+    mask = np.arange(codes.shape[1]) < lengths[:, None]
+    codes[mask] = np.frombuffer(
+        "".join(words).encode("utf-32-le", "surrogatepass"), dtype="<u4"
+    )
+    return codes
@@ -0,0 +1,255 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Benchmark suite which does not need Java: load time and memory of the
+# bundled tables, per-word latency percentiles and batch throughput on a
+# corpus of words from sjp.pl drawn with Zipf-distributed frequencies, like
+# words of natural text. Run with
+#
+#   python -m tests.benchmark -o results.json
+#
+# and pass --compare with results of another version to see regressions.
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import time
+from itertools import accumulate
+
+from pystempel import Stemmer
+from pystempel.diskcache import library_version
+from tests import base
+from tests.base import get_test_data_path
+
+TABLES = ("default", "polimorf")
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Relative slowdown reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.1
+
+
+def zipf_corpus(words, size, exponent=1.0, seed=0):
+    """
+    Draw a corpus of words whose frequencies follow Zipf's law: the word of
+    rank r occurs with probability proportional to 1 / r ** exponent. Ranks
+    are assigned to words at random.
+    :param words: vocabulary
+    :param size: number of words of the corpus
+    :param exponent: exponent of the distribution
+    :param seed: seed making the corpus reproducible
+    :return: list of words
+    """
+    rnd = random.Random(seed)
+    vocabulary = list(words)
+    rnd.shuffle(vocabulary)
+    cum_weights = list(
+        accumulate(1 / r**exponent for r in range(1, len(vocabulary) + 1))
+    )
+    return rnd.choices(vocabulary, cum_weights=cum_weights, k=size)
+
+
+def _peak_rss():
+    """
+    Return the peak resident set size of this process in bytes.
+    """
+    try:
+        # Unlike ru_maxrss, the high water mark is not inherited from the
+        # parent of a spawned process.
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _load_in_child(table, trace):
+    import tracemalloc
+
+    rss_before = _peak_rss()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    getattr(Stemmer, table)()
+    seconds = time.perf_counter() - start
+    result = {"seconds": seconds}
+    if trace:
+        result["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    else:
+        result["peak_rss_bytes"] = _peak_rss()
+        result["rss_increase_bytes"] = result["peak_rss_bytes"] - rss_before
+    return result
+
+
+def measure_load(table, repeat):
+    """
+    Measure loading a bundled table in fresh processes, so that neither
+    modules nor tables loaded before affect the results.
+    :return: best load time, peak RSS of the process and its increase while
+             loading, and peak memory allocated by Python while loading
+    """
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        with ctx.Pool(1) as pool:
+            runs.append(pool.apply(_load_in_child, (table, False)))
+    with ctx.Pool(1) as pool:
+        traced = pool.apply(_load_in_child, (table, True))
+    return {
+        "load_seconds": min(run["seconds"] for run in runs),
+        "load_peak_rss_bytes": min(run["peak_rss_bytes"] for run in runs),
+        "load_rss_increase_bytes": min(run["rss_increase_bytes"] for run in runs),
+        "load_tracemalloc_peak_bytes": traced["tracemalloc_peak_bytes"],
+    }
+
+
+def measure_latency(stemmer, corpus):
+    """
+    Measure latencies of single calls.
+    :return: latency percentiles in microseconds
+    """
+    clock = time.perf_counter_ns
+    latencies = []
+    for word in corpus:
+        start = clock()
+        stemmer(word)
+        latencies.append(clock() - start)
+    latencies.sort()
+    return {
+        "latency_p{}_us".format(p): latencies[
+            min(len(latencies) - 1, int(len(latencies) * p / 100))
+        ]
+        / 1000
+        for p in PERCENTILES
+    }
+
+
+def measure_throughput(name, stem, corpus, repeat):
+    """
+    Measure words stemmed per second, best of repeated runs.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stem(corpus)
+        best = min(best, time.perf_counter() - start)
+    return {"{}_words_per_second".format(name): len(corpus) / best}
+
+
+def _stem_each(stemmer):
+    return lambda words: [stemmer(word) for word in words]
+
+
+def run(tables=TABLES, corpus_size=200000, latency_size=50000, repeat=3):
+    """
+    Run the benchmark suite.
+    :return: dictionary of results, serializable as JSON
+    """
+    vocabulary = list(base.load_words(get_test_data_path("sjp_dict.txt")))
+    corpus = zipf_corpus(vocabulary, corpus_size)
+    results = {
+        "version": library_version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "corpus": {"size": len(corpus), "distinct": len(set(corpus))},
+        "benchmarks": {},
+    }
+    for table in tables:
+        benchmarks = measure_load(table, repeat)
+        stemmer = getattr(Stemmer, table)()
+        start = time.perf_counter()
+        compiled = stemmer.compile()
+        benchmarks["compile_seconds"] = time.perf_counter() - start
+        benchmarks.update(measure_latency(compiled, corpus[:latency_size]))
+        benchmarks.update(
+            measure_throughput("call", _stem_each(stemmer), corpus, repeat)
+        )
+        benchmarks.update(
+            measure_throughput("compiled_call", _stem_each(compiled), corpus, repeat)
+        )
+        benchmarks.update(
+            measure_throughput("compiled_stem_many", compiled.stem_many, corpus, repeat)
+        )
+        results["benchmarks"][table] = benchmarks
+    return results
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare results with results of a baseline run.
+    :return: lines of a report, and the number of regressions
+    """
+    lines = []
+    regressions = 0
+    for table, benchmarks in results["benchmarks"].items():
+        for name, value in benchmarks.items():
+            old = baseline.get("benchmarks", {}).get(table, {}).get(name)
+            if not old:
+                continue
+            # Throughput should grow, everything else should shrink.
+            if name.endswith("_per_second"):
+                change = value / old
+            else:
+                # E.g. no RSS increase when a table is memory-mapped.
+                change = old / value if value else float("inf")
+            regressed = change < 1 - threshold
+            regressions += regressed
+            lines.append(
+                "{:<9} {:<32} {:>14.4g} {:>14.4g} {:>7.2f}x{}".format(
+                    table, name, old, value, change, "  REGRESSION" if regressed else ""
+                )
+            )
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pystempel.")
+    parser.add_argument("-o", "--output", help="JSON file to save results to")
+    parser.add_argument("--compare", help="JSON file with results to compare with")
+    parser.add_argument("--tables", nargs="+", default=TABLES, choices=TABLES)
+    parser.add_argument("--corpus-size", type=int, default=200000)
+    parser.add_argument("--latency-size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = run(args.tables, args.corpus_size, args.latency_size, args.repeat)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(results, baseline)
+        print("\n".join(lines))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Throughput of a frozen stemmer shared by a pool of threads, by number of
+# threads. Run with python -m tests.benchmark_threads, on both a regular and
+# a free-threaded build to compare.
+
+import os
+import sys
+import time
+
+from pystempel import Stemmer
+from pystempel.parallel import ThreadedStemmer
+from tests import base
+from tests.base import get_test_data_path
+
+
+def main():
+    # Loading words in memory to exclude I/O times from benchmark
+    words = list(base.load_words(get_test_data_path("sjp_dict.txt")))
+    stemmer = Stemmer.polimorf().freeze()
+
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(
+        "Python {} (GIL {})".format(
+            sys.version.split()[0], "on" if gil_enabled else "off"
+        )
+    )
+    print("Words: {}, CPUs: {}".format(len(words), os.cpu_count()))
+
+    baseline = None
+    threads = 1
+    while threads <= max(8, os.cpu_count() or 1):
+        with ThreadedStemmer(stemmer, workers=threads, chunksize=2000) as pool:
+            start = time.perf_counter()
+            pool.map(words)
+            seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(
+            "{:3d} threads: {:.3f} s ({:.0f} words/s, speedup {:.2f})".format(
+                threads, seconds, len(words) / seconds, baseline / seconds
+            )
+        )
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
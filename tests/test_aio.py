@@ -0,0 +1,95 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import asyncio
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.aio import AsyncStemmer
+
+WORDS = ["jabłkami", "książka", "aloe", "książkami", "książkowymi", "zielonego"]
+
+
+class CountingStemmer(Stemmer):
+    def __init__(self, stemmer):
+        super().__init__(stemmer.stemmer_trie)
+        self.batches = []
+
+    def stem_many(self, words, mask=False):
+        self.batches.append(list(words))
+        return super().stem_many(words)
+
+
+def test_deduplicated_batches():
+    stemmer = CountingStemmer(Stemmer.default())
+
+    async def main():
+        async with AsyncStemmer(stemmer, max_latency=0.01) as aio:
+            stems = await asyncio.gather(*(aio.stem(word) for word in WORDS * 3))
+        return stems, aio.queue_info()
+
+    stems, info = asyncio.run(main())
+    assert stems == [stemmer(word) for word in WORDS * 3]
+    assert stemmer.batches == [WORDS]
+    assert info.requests == 18
+    assert info.batches == 1
+    assert info.stemmed == len(WORDS)
+    assert info.deadline_flushes == 1
+    assert info.pending == 0
+    assert 0 < info.max_wait
+    assert info.max_wait * 18 >= info.total_wait
+
+
+def test_size_flush():
+    stemmer = CountingStemmer(Stemmer.default())
+
+    async def main():
+        aio = AsyncStemmer(stemmer, max_batch_size=4, max_latency=10)
+        stems = await aio.stem_many(WORDS[:4])
+        more = asyncio.ensure_future(aio.stem_many(WORDS[4:]))
+        await asyncio.sleep(0)
+        assert aio.queue_info().pending == 2
+        await aio.flush()
+        return stems + await more, aio.queue_info()
+
+    stems, info = asyncio.run(main())
+    assert stems == [stemmer(word) for word in WORDS]
+    assert stemmer.batches == [WORDS[:4], WORDS[4:]]
+    assert info.size_flushes == 1
+    assert info.deadline_flushes == 0
+
+
+def test_errors():
+    class FailingStemmer(Stemmer):
+        def stem_many(self, words, mask=False):
+            raise RuntimeError("failed")
+
+    async def main():
+        aio = AsyncStemmer(FailingStemmer(None), max_latency=0)
+        await aio.stem("książka")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        AsyncStemmer(Stemmer.default(), max_batch_size=0)
+    with pytest.raises(ValueError):
+        AsyncStemmer(Stemmer.default(), max_latency=-1)
@@ -0,0 +1,52 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+from collections import Counter
+
+from tests.benchmark import compare, zipf_corpus
+
+WORDS = ["w{}".format(i) for i in range(1000)]
+
+
+def test_zipf_corpus():
+    corpus = zipf_corpus(WORDS, 20000)
+    assert corpus == zipf_corpus(WORDS, 20000)
+    assert set(corpus) <= set(WORDS)
+    counts = [count for _, count in Counter(corpus).most_common()]
+    # The most frequent word occurs about twice as often as the second one.
+    assert 1.5 < counts[0] / counts[1] < 2.5
+    assert counts[0] > 100 * counts[-1]
+
+
+def test_compare():
+    baseline = {"benchmarks": {"default": {"a_per_second": 100, "b_seconds": 1.0}}}
+    results = {
+        "benchmarks": {"default": {"a_per_second": 80, "b_seconds": 0.5, "c": 1}}
+    }
+    lines, regressions = compare(results, baseline)
+    assert regressions == 1
+    assert len(lines) == 2
+    assert "REGRESSION" in lines[0] and "REGRESSION" not in lines[1]
+
+
+def test_compare_zero():
+    baseline = {"benchmarks": {"default": {"load_rss_increase_bytes": 4096}}}
+    results = {"benchmarks": {"default": {"load_rss_increase_bytes": 0}}}
+    lines, regressions = compare(results, baseline)
+    assert regressions == 0
+    assert "inf" in lines[0]
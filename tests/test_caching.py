@@ -0,0 +1,111 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import threading
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.caching import CachedStemmer, FrequencySketch
+
+WORDS = ["jabłkami", "książka", "książkami", "książkowymi", "zielonego"]
+
+
+@pytest.fixture(scope="module")
+def stemmer():
+    return Stemmer.default()
+
+
+def test_lru(stemmer):
+    cached = stemmer.cached(maxsize=2)
+    assert isinstance(cached, CachedStemmer)
+    assert cached("książkami") == stemmer("książkami")
+    assert cached("książkami") == stemmer("książkami")
+    cached("książka")
+    cached("zielonego")
+    info = cached.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (1, 3, 1, 2)
+    cached("książkami")
+    assert cached.cache_info().misses == 4
+
+
+def test_tinylfu_keeps_frequent_words(stemmer):
+    cached = stemmer.cached(maxsize=2, policy="tinylfu")
+    for _ in range(5):
+        cached("książka")
+        cached("książkami")
+    for word in ["zielonego", "jabłkami", "książkowymi"]:
+        assert cached(word) == stemmer(word)
+    info = cached.cache_info()
+    assert info.rejections == 3
+    assert info.evictions == 0
+    cached("książka")
+    cached("książkami")
+    assert cached.cache_info().hits == 10
+
+
+def test_warm(stemmer):
+    cached = stemmer.cached(maxsize=3)
+    cached.warm({"książka": 10, "zielonego": 1, "jabłkami": 5, "książkami": 2})
+    assert cached.cache_info().currsize == 3
+    for word in ["książka", "jabłkami", "książkami"]:
+        assert cached(word) == stemmer(word)
+    info = cached.cache_info()
+    assert (info.hits, info.misses) == (3, 0)
+
+
+def test_threads(stemmer):
+    cached = stemmer.cached(maxsize=3, policy="tinylfu")
+
+    def work():
+        for _ in range(200):
+            for word in WORDS:
+                assert cached(word) == stemmer(word)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    info = cached.cache_info()
+    assert info.hits + info.misses == 4 * 200 * len(WORDS)
+    assert info.currsize <= 3
+
+
+def test_sketch_ages():
+    sketch = FrequencySketch(4)
+    sketch.increment("a", 15)
+    assert sketch.frequency("a") == 15
+    for _ in range(40):
+        sketch.increment("b")
+    assert sketch.frequency("a") < 15
+
+
+def test_invalid_policy(stemmer):
+    with pytest.raises(ValueError):
+        stemmer.cached(policy="fifo")
+
+
+def test_stem_many(stemmer):
+    cached = stemmer.cached(maxsize=3)
+    words = WORDS + WORDS[:2]
+    assert cached.stem_many(words) == [stemmer(word) for word in words]
+    info = cached.cache_info()
+    assert (info.hits, info.misses, info.evictions) == (0, 5, 2)
+    assert cached.stem_many(WORDS[-2:]) == [stemmer(word) for word in WORDS[-2:]]
+    assert cached.cache_info().hits == 2
@@ -0,0 +1,88 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import gzip
+import json
+
+import pytest
+
+from pystempel import Stemmer, cli
+from pystempel.cli import format_lines, main, split_ranges
+
+WORDS = ["jabłkami", "książka", "aloe", "", "książkami", "książkowymi", "zielonego"]
+
+
+@pytest.fixture(scope="module")
+def stemmer():
+    return Stemmer.default().compile()
+
+
+def test_split_ranges():
+    data = b"ab\ncd\n\nefgh\ni"
+    for chunk_bytes in range(1, len(data) + 2):
+        ranges = list(split_ranges(data, chunk_bytes))
+        assert b"".join(data[start:end] for start, end in ranges) == data
+        assert all(data[end - 1 : end] == b"\n" for _, end in ranges[:-1])
+
+
+def test_format_words(stemmer):
+    stems = [stemmer(word) for word in WORDS]
+    output = format_lines(stemmer, WORDS)
+    assert output.split("\n")[:-1] == [s or w for w, s in zip(WORDS, stems)]
+    output = format_lines(stemmer, WORDS, fmt="tsv")
+    assert output.split("\n")[1] == "książka\t{}".format(stems[1])
+    output = format_lines(stemmer, WORDS, fmt="jsonl")
+    records = [json.loads(line) for line in output.splitlines()]
+    assert records[2] == {"word": "aloe", "stem": None}
+
+
+def test_format_text(stemmer):
+    lines = ["Zielone jabłka,", "", "aloe 12 książkami"]
+    output = format_lines(stemmer, lines, text=True)
+    assert output.split("\n")[:-1] == [
+        "{} {}".format(stemmer("zielone"), stemmer("jabłka")),
+        "",
+        "aloe {}".format(stemmer("książkami")),
+    ]
+    output = format_lines(stemmer, lines, text=True, fmt="jsonl")
+    records = [json.loads(line) for line in output.splitlines()]
+    assert records[2] == {"token": "aloe", "stem": None, "start": 0, "end": 4}
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+@pytest.mark.parametrize("compressed", [False, True])
+def test_main(stemmer, tmp_path, monkeypatch, workers, compressed):
+    opened = []
+
+    def _open(fpath):
+        stream = open_stream(fpath)
+        opened.append(stream)
+        return stream
+
+    open_stream = cli._open
+    monkeypatch.setattr(cli, "_open", _open)
+    words = WORDS * 40
+    data = "".join(word + "\n" for word in words).encode("utf-8")
+    src = tmp_path / "words.txt"
+    src.write_bytes(gzip.compress(data) if compressed else data)
+    dst = tmp_path / "stems.tsv"
+    args = ["-f", "tsv", "-j", workers, "-t", "default", "--chunk-bytes", "50"]
+    main([str(src), str(src), "-o", str(dst)] + args)
+    expected = format_lines(stemmer, words * 2, fmt="tsv")
+    assert dst.read_text(encoding="utf-8") == expected
+    assert all(stream.closed for stream in opened)
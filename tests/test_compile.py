@@ -0,0 +1,157 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import io
+from collections import defaultdict
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.compile import (
+    build_trie,
+    compile_file,
+    compile_rules,
+    diff,
+    main,
+    parse_algorithm,
+    read_rules,
+    reduce_trie,
+    store_table,
+)
+from pystempel.egothor import apply_patch
+from tests.base import get_test_data_path, load_words
+
+PARADIGMS = [
+    "książka książki książce książkę książką książko książek książkom książkami",
+    "kot kota kotu kotem kocie koty kotów kotom kotami kotach",
+    "pies psa psu psem psie psy psów psom psami psach",
+    "iść idę idziesz idzie idziemy idziecie idą szedł szła szli",
+    "dobry dobrego dobremu dobrym dobra dobrej dobrą dobre lepszy najlepszy",
+]
+
+
+@pytest.fixture(scope="module")
+def rules():
+    stemmer = Stemmer.default().compile()
+    words = [w for w in load_words(get_test_data_path("sjp_dict.txt")) if w.islower()]
+    words = words[::15]
+    forms = defaultdict(list)
+    for word, stem in zip(words, stemmer.stem_many(words)):
+        if stem:
+            forms[stem].append(word)
+    return list(read_rules(PARADIGMS)) + list(forms.items())
+
+
+def stored(trie, algorithm):
+    out = io.BytesIO()
+    store_table(trie, algorithm, out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize(
+    "word, stem, patch",
+    [
+        ("kotami", "kot", "Dc"),
+        ("psa", "pies", "Da-aIeIi"),
+        ("ab", "abb", "-aIb"),
+        ("lepszy", "dobry", "-aDaRrRbRoRd"),
+        ("idę", "iść", "RćRś"),
+        ("kot", "kot", ""),
+    ],
+)
+def test_diff(word, stem, patch):
+    assert diff(word, stem) == patch
+    destination = list(word)
+    apply_patch(destination, patch)
+    assert "".join(destination) == stem
+
+
+def test_diff_inverts_apply_patch(rules):
+    for stem, forms in rules:
+        for form in forms:
+            destination = list(form)
+            apply_patch(destination, diff(form, stem))
+            assert "".join(destination) == stem
+
+
+def test_parse_algorithm():
+    assert parse_algorithm("-0ME2") == (False, True, True, "E2")
+    # Flags are read by position, as in Egothor.
+    assert parse_algorithm("-M0E2") == (False, False, True, "E2")
+    assert parse_algorithm("0-E") == (True, True, False, "E")
+    assert parse_algorithm("g1") == (True, False, False, "G1")
+    assert parse_algorithm("-0MX2") == (False, True, True, "2")
+    with pytest.raises(ValueError):
+        parse_algorithm("-0E2M")
+
+
+def test_read_rules():
+    lines = ["Kot kota  kotu\n", "\n", "pies\n"]
+    assert list(read_rules(lines)) == [("kot", ["kota", "kotu"]), ("pies", [])]
+
+
+@pytest.mark.parametrize("algorithm", ["-0ME2", "-0EL1", "-ML2", "0EG2"])
+def test_lifted_build_matches_build_trie(rules, algorithm):
+    expected = reduce_trie(build_trie(rules, algorithm), algorithm)
+    assert stored(compile_rules(rules, algorithm), algorithm) == stored(
+        expected, algorithm
+    )
+
+
+@pytest.mark.parametrize("algorithm", ["-0ME2", "-0E2", "-0M2"])
+def test_compiled_table_stems_training_words(rules, algorithm):
+    data = stored(compile_rules(rules, algorithm), algorithm)
+    stemmers = [Stemmer.from_bytes(data), Stemmer.from_bytes(data, lazy=True)]
+    stems = defaultdict(set)
+    for stem, forms in rules:
+        for form in forms + [stem]:
+            stems[form].add(stem)
+    for stemmer in stemmers:
+        # Words of several stems can only be stemmed to one of them.
+        correct = sum(stemmer(word) in stems[word] for word in stems)
+        assert correct >= 0.99 * len(stems)
+
+
+def test_compile_file(tmp_path):
+    rules_fpath = tmp_path / "rules.txt"
+    rules_fpath.write_text("\n".join(PARADIGMS), encoding="utf-8")
+
+    table_fpath = compile_file(rules_fpath)
+    assert table_fpath == tmp_path / "rules.txt.out"
+    stemmer = Stemmer.from_file(table_fpath)
+    assert stemmer("książkami") == "książka"
+    assert stemmer("psami") == "pies"
+
+    # A single trie reduced with Optimizer2 stems all training words.
+    table_fpath = tmp_path / "rules.tbl.gz"
+    main([str(rules_fpath), "-o", str(table_fpath), "--algorithm=-0E2", "-q"])
+    stemmer = Stemmer.from_file(table_fpath)
+    for stem, forms in read_rules(PARADIGMS):
+        assert [stemmer(form) for form in forms] == [stem] * len(forms)
+
+
+def test_main_ignores_unknown_letters(tmp_path, capsys):
+    rules_fpath = tmp_path / "rules.txt"
+    rules_fpath.write_text("\n".join(PARADIGMS), encoding="utf-8")
+    main([str(rules_fpath), "--algorithm=-0MQE2", "-q"])
+    assert "ignoring 'Q'" in capsys.readouterr().err
+    stemmer = Stemmer.from_file(tmp_path / "rules.txt.out")
+    assert stemmer("książkami") == "książka"
+    # A table stored with a misplaced M would be loaded as a MultiTrie2.
+    with pytest.raises(SystemExit):
+        main([str(rules_fpath), "--algorithm=-0E2M", "-q"])
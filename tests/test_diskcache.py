@@ -0,0 +1,56 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+from pystempel import Stemmer
+from pystempel.diskcache import TableCache
+from tests.base import get_library_data_path
+
+table_fpath = get_library_data_path("original", "stemmer_20000.tbl.gz")
+
+
+def test_snapshot_reused(tmp_path):
+    cache = TableCache(tmp_path)
+    first = Stemmer.from_file(table_fpath, cache=cache)
+    assert len(cache.entries()) == 1
+
+    second = Stemmer.from_file(table_fpath, cache=cache)
+    assert len(cache.entries()) == 1
+    assert second("książkami") == first("książkami") == "książek"
+
+
+def test_invalid_snapshot_discarded(tmp_path):
+    cache = TableCache(tmp_path)
+    with open(table_fpath, "rb") as f:
+        key = cache.key(f.read())
+    cache.path(key).write_bytes(b"garbage")
+
+    assert cache.load(key) is None
+    assert not cache.path(key).exists()
+    assert Stemmer.from_file(table_fpath, cache=cache)("książkami") == "książek"
+
+
+def test_size_limit_and_clear(tmp_path):
+    cache = TableCache(tmp_path, max_size=1)
+    for name in ["a", "b"]:
+        (tmp_path / (name * 64 + ".mtbl")).write_bytes(b"x" * 10)
+    Stemmer.from_file(table_fpath, cache=cache)
+    # Only the snapshot just written is kept.
+    assert len(cache.entries()) == 1
+
+    cache.clear()
+    assert cache.entries() == []
@@ -53,7 +53,11 @@
    created by Leo Galambos (Leo.G@seznam.cz).
 """
 
+import io
+import itertools
+
 import pytest
+from sortedcontainers import SortedDict
 
 from pystempel.egothor import (
     Trie,
@@ -63,7 +67,13 @@ from pystempel.egothor import (
     Optimizer2,
     Gener,
     Lift,
+    Reduce,
+    Cell,
+    Row,
+    apply_patch,
+    compile_patch,
 )
+from pystempel.streams import DataInputBuffer, DataOutputStream
 
 
 def test_trie_forward():
@@ -117,6 +127,65 @@ def test_multitrie2(forward):
     assert_trie_content(trie, keys, vals)
 
 
+@pytest.mark.parametrize("optimizer", [Optimizer(), Optimizer2()])
+def test_optimizer_merges_rows(optimizer):
+    trie = Trie(forward=True)
+    keys = ["ab", "cd", "ce"]
+    vals = ["1", "2", "3"]
+    for key, val in zip(keys, vals):
+        trie.add(key, val)
+
+    # No two rows have cells for the same character, so all are merged.
+    reduced = trie.reduce(optimizer)
+    assert 1 == len(reduced.rows)
+    assert_trie_content(reduced, keys, vals)
+
+
+def test_reduce_removes_unreachable_rows():
+    trie = Trie(forward=True)
+    trie.add("ab", "1")
+    trie.rows.append(Row())
+
+    reduced = trie.reduce(Reduce())
+    assert 2 == len(reduced.rows)
+    assert "1" == reduced.get_last_on_path("ab")
+
+
+def test_row_uniform_cmd():
+    row = Row()
+    row.set_cmd("a", 1)
+    row.set_cmd("b", 1)
+    assert 1 == row.uniform_cmd(eq_skip=True)
+    assert 2 == row.uniform_cnt
+    row.set_cmd("c", 2)
+    assert -1 == row.uniform_cmd(eq_skip=True)
+
+
+def test_row_memory_usage():
+    row = Row(SortedDict({"a": Cell(cmd=0), "b": Cell(ref=1)}))
+    size = row.memory_usage()
+    assert size > Row(dict(row.cells)).memory_usage()
+    # Without the private fields of SortedList the estimate is coarser.
+    del row.cells._list
+    assert 0 < row.memory_usage() <= size
+
+
+@pytest.mark.parametrize("trie_class", [Trie, MultiTrie2])
+def test_store(trie_class):
+    trie = trie_class(forward=False)
+    keys = ["a", "ba", "bb", "ćb"]
+    vals = ["Da", "-aIx", "RćDa", "Ia"]
+    for key, val in zip(keys, vals):
+        trie.add(key, val)
+    trie = trie.reduce(Lift(change_skip=False)).reduce(Gener())
+
+    out = io.BytesIO()
+    trie.store(DataOutputStream(out))
+    loaded = trie_class.from_stream(DataInputBuffer(out.getvalue()))
+    for key in keys:
+        assert trie.get_last_on_path(key) == loaded.get_last_on_path(key)
+
+
 def assert_trie_content(trie, keys, vals):
     tries = [
         trie,
@@ -130,3 +199,36 @@ def assert_trie_content(trie, keys, vals):
         for key, val in zip(keys, vals):
             assert val == trie.get_fully(key)
             assert val == trie.get_last_on_path(key)
+
+
+@pytest.mark.parametrize(
+    "patch",
+    [
+        "",
+        "Db",
+        "Da",
+        "Ix",
+        "Rx",
+        "-bRy",
+        "-aDa",
+        "Da-bIy",
+        "RyIz-aDc",
+        "IxIy",
+        "-zRx",
+        "DzIx",
+        "-A",
+        "-ARx",
+        "DA",
+        "Rx-",
+        "Q",
+    ],
+)
+def test_compile_patch(patch):
+    program = compile_patch(patch)
+    words = ["abcdefghij"[:n] for n in range(11)]
+    for n in range(7):
+        words.extend(map("".join, itertools.product("ab", repeat=n)))
+    for word in words:
+        buffer = list(word)
+        apply_patch(buffer, patch)
+        assert program(word) == "".join(buffer)
@@ -0,0 +1,139 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import io
+
+import pytest
+
+from pystempel import Stemmer, flat
+from pystempel.egothor import MultiTrie2, Trie
+from tests.base import get_library_data_path
+
+WORDS = ["jabłkami", "książka", "książkami", "książkowymi", "zielonego"]
+
+
+@pytest.mark.parametrize("forward", [True, False])
+def test_round_trip(forward):
+    trie = MultiTrie2(forward=forward)
+    keys = ["a", "ba", "bb", "c"]
+    vals = ["1111", "2222", "2223", "4444"]
+    for key, val in zip(keys, vals):
+        trie.add(key, val)
+
+    out = io.BytesIO()
+    flat.dump(trie, out)
+    loaded = flat.loads(out.getvalue())
+
+    assert isinstance(loaded, MultiTrie2)
+    for key, val in zip(keys, vals):
+        assert val == loaded.get_last_on_path(key)
+
+
+def test_plain_trie():
+    trie = Trie(forward=False)
+    trie.add("ab", "Da")
+    out = io.BytesIO()
+    flat.dump(trie, out)
+    loaded = flat.loads(out.getvalue())
+    assert isinstance(loaded, flat.FlatTrie)
+    assert loaded.get_last_on_path("ab") == "Da"
+    assert loaded.get_last_on_path("xb") is None
+
+
+def test_convert(tmp_path):
+    src = get_library_data_path("original", "stemmer_20000.tbl.gz")
+    dst = tmp_path / "stemmer.mtbl"
+    flat.convert(src, dst)
+
+    expected = Stemmer.from_file(src)
+    converted = Stemmer.from_file(dst)
+    with open(dst, "rb") as f:
+        from_bytes = Stemmer.from_bytes(f.read())
+    for word in WORDS:
+        assert converted(word) == expected(word)
+        assert from_bytes(word) == expected(word)
+
+
+def test_not_flat():
+    with pytest.raises(ValueError):
+        flat.loads(b"NOTATBL!" + bytes(32))
+
+
+def test_from_stream_matches_rows():
+    import gzip
+
+    from pystempel.streams import DataInputBuffer
+
+    fpath = get_library_data_path("original", "stemmer_20000.tbl.gz")
+    with gzip.open(fpath, "rb") as f:
+        data = f.read()
+    tries = []
+    for loader in [flat.FlatTrie.from_stream, Trie.from_stream]:
+        stream = DataInputBuffer(data)
+        stream.read_utf()
+        tries.append(MultiTrie2.from_stream(stream, loader))
+
+    decoded, rows = tries
+    assert len(decoded.tries) == len(rows.tries)
+    for t, expected in zip(decoded.tries, rows.tries):
+        expected = flat.FlatTrie.from_trie(expected)
+        assert t.cmds == expected.cmds
+        assert t.root == expected.root
+        for column in ["offsets", "chars", "cmd_ids", "refs", "cnts", "skips"]:
+            assert list(getattr(t, column)) == list(getattr(expected, column))
+
+
+def test_default_tables_keep_trie_api():
+    import gzip
+
+    from pystempel.egothor import Optimizer
+    from pystempel.streams import DataInputBuffer, DataOutputStream
+
+    fpath = get_library_data_path("original", "stemmer_20000.tbl.gz")
+    with gzip.open(fpath, "rb") as f:
+        data = f.read()
+    stream = DataInputBuffer(data)
+    stream.read_utf()
+    rows = MultiTrie2.from_stream(stream, Trie.from_stream)
+    trie = Stemmer.default().stemmer_trie
+
+    assert all(isinstance(t, flat.FlatTrie) for t in trie.tries)
+    for word in WORDS + ["kotami", "ma", "się", "nie", "xyz"]:
+        assert trie.get_fully(word) == rows.get_fully(word)
+        assert trie.get_last_on_path(word) == rows.get_last_on_path(word)
+    for t, expected in zip(trie.tries, rows.tries):
+        assert t.get_cells() == expected.get_cells()
+        assert t.get_cells_pnt() == expected.get_cells_pnt()
+        assert t.get_cells_val() == expected.get_cells_val()
+
+    reduced = trie.reduce(Optimizer())
+    expected = rows.reduce(Optimizer())
+    assert [len(t.rows) for t in reduced.tries] == [len(t.rows) for t in expected.tries]
+    with pytest.raises(TypeError):
+        trie.tries[0].add("ab", "Da")
+
+    # Tries decoded from Egothor tables keep cnt and skip, so they are stored
+    # as they were read.
+    stream = DataInputBuffer(data)
+    algorithm = stream.read_utf()
+    decoded = MultiTrie2.from_stream(stream, flat.FlatTrie.from_stream)
+    out = io.BytesIO()
+    stream = DataOutputStream(out)
+    stream.write_utf(algorithm)
+    decoded.store(stream)
+    assert out.getvalue() == data
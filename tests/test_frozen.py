@@ -0,0 +1,61 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.frozen import FrozenStemmer
+from tests.base import get_test_data_path, load_words
+
+WORDS = list(load_words(get_test_data_path("sjp_dict.txt")))[::50]
+
+
+@pytest.mark.parametrize("table", ["default", "polimorf"])
+def test_same_stems(table):
+    stemmer = getattr(Stemmer, table)()
+    frozen = stemmer.freeze()
+    assert isinstance(frozen, FrozenStemmer)
+    expected = [stemmer(word) for word in WORDS]
+    assert [frozen(word) for word in WORDS] == expected
+    assert frozen.stem_many(WORDS) == expected
+    assert stemmer.compile().freeze().stem_many(WORDS) == expected
+    # Methods of Stemmer which FrozenStemmer does not override work as well.
+    assert [Stemmer.__call__(frozen, word) for word in WORDS] == expected
+    assert Stemmer._stem_distinct(frozen, WORDS) == expected
+
+
+def test_immutable():
+    frozen = Stemmer.default().freeze()
+    assert frozen.freeze() is frozen
+    with pytest.raises(AttributeError):
+        frozen.stemmer_trie = None
+    with pytest.raises(AttributeError):
+        del frozen.programs
+    with pytest.raises(TypeError):
+        frozen.programs["x"] = None
+
+
+def test_threads():
+    stemmer = Stemmer.polimorf()
+    frozen = stemmer.freeze()
+    expected = [stemmer(word) for word in WORDS]
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: [frozen(w) for w in WORDS], range(4)))
+    assert results == [expected] * 4
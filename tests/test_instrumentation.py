@@ -0,0 +1,99 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.egothor import MultiTrie2, Trie
+from pystempel.instrumentation import Histogram, InstrumentedStemmer
+
+WORDS = ["jabłkami", "książka", "aloe", "książkami", "książkowymi", "zielonego"]
+
+
+def test_histogram():
+    histogram = Histogram([1, 2, 4])
+    for value in [0, 1, 1.5, 3, 5, 100]:
+        histogram.observe(value)
+    assert histogram.snapshot() == {
+        "buckets": {1: 2, 2: 3, 4: 4, float("inf"): 6},
+        "sum": 110.5,
+        "count": 6,
+    }
+
+
+@pytest.mark.parametrize("compile", [False, True])
+def test_counters(compile):
+    stemmer = Stemmer.default()
+    if compile:
+        stemmer = stemmer.compile()
+    instrumented = stemmer.instrumented()
+    assert [instrumented(word) for word in WORDS] == [stemmer(w) for w in WORDS]
+    assert instrumented.stem_many(WORDS * 2) == stemmer.stem_many(WORDS * 2)
+    snapshot = instrumented.snapshot()
+    assert snapshot["calls"] == len(WORDS)
+    assert snapshot["batch_calls"] == 1
+    assert snapshot["batch_words"] == 2 * len(WORDS)
+    assert snapshot["none_results"] == 3
+    assert snapshot["call_latency_seconds"]["count"] == len(WORDS)
+    assert snapshot["batch_latency_seconds"]["count"] == 1
+    assert snapshot["subtries_visited"]["count"] == 3 * len(WORDS)
+    assert snapshot["depth_walked"]["buckets"][0] == 0
+
+    instrumented.reset()
+    assert instrumented.snapshot()["calls"] == 0
+
+
+def test_trace():
+    trie = MultiTrie2(forward=False)
+    trie.add("ab", "-aIx")
+    instrumented = InstrumentedStemmer(Stemmer(trie))
+    instrumented("ab")
+    instrumented("zz")
+    subtries = instrumented.snapshot()["subtries_visited"]
+    depth = instrumented.snapshot()["depth_walked"]
+    assert subtries["count"] == 2
+    assert depth["count"] == 2
+    # "zz" is not in the first trie.
+    assert subtries["buckets"][1] == 1
+    assert depth["buckets"][0] == 1
+
+
+def test_trace_every():
+    trie = Trie(forward=True)
+    trie.add("abc", "Da")
+    instrumented = Stemmer(trie).instrumented(trace_every=3)
+    instrumented.stem_many(["abc"] * 4)
+    instrumented.stem_many(["abc"] * 4)
+    snapshot = instrumented.snapshot()
+    assert snapshot["subtries_visited"]["count"] == 3
+    assert snapshot["depth_walked"]["sum"] == 9
+    assert instrumented.stemmer.stemmer_trie.get_last_on_path("abc") == "Da"
+    assert Stemmer(trie).instrumented(trace_every=0).stem_many(["abc"]) == ["ab"]
+
+
+def test_prometheus():
+    instrumented = Stemmer.default().instrumented()
+    instrumented("książka")
+    text = instrumented.prometheus(prefix="stem")
+    lines = text.splitlines()
+    assert "# TYPE stem_calls_total counter" in lines
+    assert "stem_calls_total 1" in lines
+    assert "# TYPE stem_call_latency_seconds histogram" in lines
+    assert 'stem_call_latency_seconds_bucket{le="+Inf"} 1' in lines
+    assert "stem_call_latency_seconds_count 1" in lines
+    assert 'stem_subtries_visited_bucket{le="0.0"} 0' in lines
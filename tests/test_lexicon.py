@@ -0,0 +1,87 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import io
+
+import pytest
+
+from pystempel import Stemmer, lexicon
+from tests.base import get_test_data_path, load_words
+
+WORDS = ["jabłkami", "książka", "książkami", "książkowymi", "zielonego"]
+
+
+@pytest.fixture(scope="module")
+def stemmer():
+    return Stemmer.default()
+
+
+def test_build(stemmer):
+    words = list(load_words(get_test_data_path("sjp_dict.txt")))[:5000] + WORDS
+    lex = lexicon.Lexicon.build(stemmer, words + words[:10])
+    assert len(lex) == len(set(words))
+    for word in words:
+        assert lex.get(word, "missing") == stemmer(word)
+    assert "qwertyuiop" not in lex
+    assert lex.get("qwertyuiop") is None
+
+
+def test_lone_surrogates(stemmer):
+    words = ["kot\udc80ami", "\ud800ami"]
+    lex = lexicon.Lexicon.build(stemmer, words[:1])
+    assert lex.get(words[0], "missing") == stemmer(words[0])
+    assert lex.get(words[1], "missing") == "missing"
+    with_lexicon = stemmer.with_lexicon(lex)
+    assert with_lexicon.stem_many(words) == [stemmer(word) for word in words]
+
+
+def test_round_trip(stemmer, tmp_path):
+    fpath = tmp_path / "words.lex"
+    lexicon.build(stemmer, WORDS, fpath)
+    loaded = lexicon.load(fpath)
+    with open(fpath, "rb") as f:
+        from_bytes = lexicon.loads(f.read())
+    for word in WORDS:
+        assert loaded.get(word) == stemmer(word)
+        assert from_bytes.get(word) == stemmer(word)
+
+
+def test_lexicon_stemmer(stemmer):
+    lex = lexicon.Lexicon.build(stemmer, WORDS[:2])
+    out = io.BytesIO()
+    lexicon.dump(lex, out)
+    with_lexicon = stemmer.with_lexicon(lexicon.loads(out.getvalue()))
+    for word in WORDS:
+        assert with_lexicon(word) == stemmer(word)
+
+
+def test_empty(stemmer):
+    lex = lexicon.Lexicon.build(stemmer, [])
+    out = io.BytesIO()
+    lexicon.dump(lex, out)
+    assert lexicon.loads(out.getvalue()).get("książka") is None
+
+
+def test_not_lexicon():
+    with pytest.raises(ValueError):
+        lexicon.loads(b"NOTALEX!" + bytes(32))
+
+
+def test_stem_many(stemmer):
+    with_lexicon = stemmer.with_lexicon(lexicon.Lexicon.build(stemmer, WORDS[:2]))
+    assert with_lexicon.stem_many(WORDS) == [stemmer(word) for word in WORDS]
@@ -0,0 +1,67 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import itertools
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.egothor import MultiTrie2, Trie
+from pystempel.lookup import HashMultiTrie2, HashTrie, compile_trie
+from tests.base import get_test_data_path, load_words
+
+PATCHES = {
+    "abc": "Da",
+    "abd": "-aRx",
+    "bcd": "-bDa",
+    "cab": "Rz-aIy",
+    "dab": "-aDa-aRq",
+    "bb": "Ic",
+}
+
+
+@pytest.mark.parametrize("forward", [True, False])
+def test_compiled_trie(forward):
+    trie = Trie(forward=forward)
+    for key, patch in PATCHES.items():
+        trie.add(key, patch)
+    compiled = compile_trie(trie)
+    assert isinstance(compiled, HashTrie)
+    for n in range(1, 5):
+        for key in map("".join, itertools.product("abcdx", repeat=n)):
+            assert compiled.get_last_on_path(key) == trie.get_last_on_path(key)
+
+
+@pytest.mark.parametrize("forward", [True, False])
+def test_compiled_multi_trie(forward):
+    trie = MultiTrie2(forward=forward)
+    for key, patch in PATCHES.items():
+        trie.add(key, patch)
+    compiled = compile_trie(trie)
+    assert isinstance(compiled, HashMultiTrie2)
+    for n in range(1, 5):
+        for key in map("".join, itertools.product("abcdx", repeat=n)):
+            assert compiled.get_last_on_path(key) == trie.get_last_on_path(key)
+
+
+@pytest.mark.parametrize("name", ["default", "polimorf"])
+def test_compiled_stemmer(name):
+    stemmer = getattr(Stemmer, name)()
+    compiled = stemmer.compile()
+    for word in load_words(get_test_data_path("sjp_dict.txt")):
+        assert compiled(word) == stemmer(word)
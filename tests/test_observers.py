@@ -0,0 +1,87 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import gzip
+
+import pytest
+
+from pystempel import Stemmer, observers
+from pystempel.observers import LoadObserver, TimingObserver, TqdmObserver
+from tests.base import get_library_data_path
+
+
+class RecordingObserver(LoadObserver):
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, total_bytes):
+        self.events.append(("start", total_bytes))
+
+    def on_progress(self, position, rows):
+        self.events.append(("progress", position))
+
+    def on_end(self, seconds):
+        self.events.append(("end",))
+
+
+@pytest.mark.parametrize("fname", ["stemmer_20000.tbl", "stemmer_20000.tbl.gz"])
+@pytest.mark.parametrize("lazy", [False, True])
+def test_progress(fname, lazy):
+    fpath = get_library_data_path("original", fname)
+    observer = RecordingObserver()
+    Stemmer.from_file(fpath, lazy=lazy, observer=observer)
+
+    total = len(gzip.open(fpath).read()) if fname.endswith(".gz") else None
+    start, *progress, end = observer.events
+    assert start[0] == "start"
+    assert total is None or start[1] == total
+    assert end == ("end",)
+    positions = [position for _, position in progress]
+    assert positions == sorted(positions)
+    assert positions[-1] == start[1]
+
+
+def test_timings():
+    observer = TimingObserver()
+    stemmer = Stemmer.from_file(
+        get_library_data_path("original", "stemmer_20000.tbl.gz"), observer=observer
+    )
+    phases = {(trie, phase) for trie, phase, _ in observer.phases}
+    for i in range(len(stemmer.stemmer_trie.tries)):
+        assert (i, observers.PARSE_CMDS) in phases
+        assert (i, observers.PARSE_ROWS) in phases
+        assert (i, observers.TRIE) in phases
+    assert (None, observers.DECOMPRESS) in phases
+    assert observer.total > 0
+
+
+def test_tqdm():
+    pytest.importorskip("tqdm")
+    with open(get_library_data_path("original", "stemmer_20000.tbl"), "rb") as f:
+        stemmer = Stemmer.from_bytes(f.read(), observer=TqdmObserver(disable=True))
+    assert stemmer("książkami") == "książek"
+
+
+def test_pipelined_timings():
+    observer = TimingObserver()
+    Stemmer.from_file(
+        get_library_data_path("original", "stemmer_20000.tbl.gz"),
+        observer=observer,
+        pipelined=True,
+    )
+    assert (None, observers.DECOMPRESS) in {(t, p) for t, p, _ in observer.phases}
@@ -0,0 +1,73 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import itertools
+import multiprocessing
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.parallel import ParallelStemmer, ThreadedStemmer
+
+WORDS = ["jabłkami", "książka", "aloe", "książkami", "książkowymi", "zielonego"]
+
+
+@pytest.mark.parametrize("compile", [None, True])
+def test_order_preserved(compile):
+    stemmer = Stemmer.default()
+    words = WORDS * 50
+    ctx = multiprocessing.get_context("spawn")
+    with ParallelStemmer(
+        stemmer, workers=2, chunksize=7, compile=compile, mp_context=ctx
+    ) as pool:
+        assert pool.map(words) == [stemmer(word) for word in words]
+
+
+def test_unbounded_input():
+    stemmer = Stemmer.default()
+    ctx = multiprocessing.get_context("spawn")
+    with ParallelStemmer(
+        loader=Stemmer.default, workers=2, chunksize=5, mp_context=ctx
+    ) as pool:
+        stems = list(itertools.islice(pool.imap(itertools.cycle(WORDS)), 100))
+    expected = [stemmer(word) for word in itertools.islice(itertools.cycle(WORDS), 100)]
+    assert stems == expected
+
+
+def test_stem_parallel():
+    stemmer = Stemmer.default()
+    assert list(stemmer.stem_parallel(WORDS, workers=1)) == [
+        stemmer(word) for word in WORDS
+    ]
+
+
+def test_stemmer_or_loader():
+    with pytest.raises(ValueError):
+        ParallelStemmer()
+    with pytest.raises(ValueError):
+        ParallelStemmer(Stemmer.default(), loader=Stemmer.default)
+
+
+def test_threaded():
+    stemmer = Stemmer.default()
+    words = WORDS * 50
+    with ThreadedStemmer(stemmer, workers=3, chunksize=7) as pool:
+        assert pool.map(words) == [stemmer(word) for word in words]
+    assert list(stemmer.stem_threaded(iter(words), workers=2)) == [
+        stemmer(word) for word in words
+    ]
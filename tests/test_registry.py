@@ -0,0 +1,76 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import threading
+
+import pytest
+
+from pystempel import Stemmer, get_stemmer
+from pystempel.registry import StemmerRegistry
+from tests.base import get_library_data_path
+
+
+def test_loads_once():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return Stemmer.default()
+
+    registry = StemmerRegistry()
+    registry.register("counted", loader)
+    stemmers = []
+    threads = [
+        threading.Thread(target=lambda: stemmers.append(registry.get("counted")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(s is stemmers[0] for s in stemmers)
+
+
+def test_builtin_tables():
+    assert get_stemmer("polimorf") is get_stemmer("polimorf")
+    assert get_stemmer("polimorf")("jabłkami") == "jabłko"
+
+
+def test_unknown_table():
+    with pytest.raises(KeyError):
+        StemmerRegistry().get("missing")
+
+
+def test_memory_budget():
+    fpath = get_library_data_path("original", "stemmer_20000.tbl.gz")
+    registry = StemmerRegistry()
+    registry.register_file("a", fpath)
+    registry.register_file("b", fpath)
+
+    registry.get("a")
+    size = registry.memory_usage()["a"]
+    assert size > 0
+
+    registry.memory_budget = int(size * 1.5)
+    registry.get("b")
+    assert registry.loaded() == ["b"]
+
+    registry.get("a")
+    assert registry.loaded() == ["a"]
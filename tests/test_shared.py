@@ -0,0 +1,95 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pystempel import Stemmer, shared
+
+WORDS = ["jabłkami", "książka", "książkami", "książkowymi", "zielonego"]
+
+
+def stem_in_worker(name):
+    stemmer = shared.attach(name)
+    return [stemmer(word) for word in WORDS]
+
+
+def test_attach_from_other_process():
+    stemmer = Stemmer.default()
+    with shared.publish(stemmer) as table:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(2) as pool:
+            results = pool.map(stem_in_worker, [table.name] * 2)
+        expected = [stemmer(word) for word in WORDS]
+        assert results == [expected, expected]
+        assert [table.stemmer(word) for word in WORDS] == expected
+
+
+def test_attached_table_is_read_only():
+    with shared.publish(Stemmer.default()) as table:
+        attached = shared.SharedTable.attach(table.name)
+        assert attached.stemmer("książkami") == "książek"
+        assert attached.stemmer.stemmer_trie.tries[0].refs.readonly
+        attached.close()
+
+
+# Publishes a table, stems with forked workers, lets an independent process
+# attach and exit, and unlinks the table; the resource tracker of the
+# publishing process reports any registration undone by another process.
+PUBLISH_AND_ATTACH = """
+import subprocess
+import sys
+from multiprocessing import shared_memory
+
+from pystempel import Stemmer, shared
+
+stemmer = Stemmer.default()
+with shared.publish(stemmer) as table:
+    print(list(stemmer.stem_parallel(["książkami"], workers=2)))
+    subprocess.run(
+        [sys.executable, "-c", "from pystempel import shared; "
+         "print(shared.attach({!r})('książkami'))".format(table.name)],
+        check=True,
+    )
+    shared_memory.SharedMemory(name=table.name).close()
+"""
+
+
+def test_attaching_processes_leave_the_block():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run(
+        [sys.executable, "-c", PUBLISH_AND_ATTACH],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert result.stdout.split("\n")[:2] == ["['książek']", "książek"]
+    assert result.stderr == ""
+
+
+def test_close_releases_views():
+    with shared.publish(Stemmer.default()) as table:
+        attached = shared.SharedTable.attach(table.name)
+        trie = attached.stemmer.stemmer_trie
+        attached.close()
+        with pytest.raises(ValueError):
+            trie.tries[0].refs[0]
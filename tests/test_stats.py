@@ -0,0 +1,90 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import gzip
+
+from pystempel import Stemmer
+from pystempel.egothor import MultiTrie2, Trie
+from pystempel.flat import FlatTrie
+from pystempel.lookup import HashTrie
+from pystempel.streams import DataInputBuffer
+from tests.base import get_library_data_path
+
+STRUCTURE = ["forward", "rows", "cells", "cmd_cells", "ptr_cells", "cmds"]
+
+
+def small_trie():
+    trie = Trie(forward=True)
+    for key, val in zip(["a", "ba", "bb", "bbc", "c"], ["1", "2", "3", "4", "1"]):
+        trie.add(key, val)
+    return trie
+
+
+def test_trie_stats():
+    trie = small_trie()
+    stats = trie.stats()
+    assert stats.rows == len(trie.rows)
+    assert stats.cells == trie.get_cells()
+    assert stats.cmd_cells == trie.get_cells_val()
+    assert stats.ptr_cells == trie.get_cells_pnt()
+    assert stats.cmds == 4
+    assert stats.depths == {0: 1, 1: 1, 2: 1}
+    assert stats.fanout == {1: 1, 2: 1, 3: 1}
+    assert sum(stats.memory.values()) == trie.memory_usage()
+
+
+def test_representations_agree():
+    trie = small_trie()
+    expected = trie.stats()
+    for other in [FlatTrie.from_trie(trie), HashTrie.from_trie(trie)]:
+        stats = other.stats()
+        for field in STRUCTURE + ["depths", "fanout"]:
+            assert getattr(stats, field) == getattr(expected, field)
+
+
+def test_table_stats():
+    fpath = get_library_data_path("original", "stemmer_20000.tbl.gz")
+    with gzip.open(fpath, "rb") as f:
+        stream = DataInputBuffer(f.read())
+    stream.read_utf()
+    rows = MultiTrie2.from_stream(stream, Trie.from_stream)
+    expected = rows.stats()
+
+    stemmer = Stemmer.default()
+    assert len(stemmer.stats()) == len(rows.tries)
+    for stats in [stemmer.stats(), stemmer.compile().stats()]:
+        for s, e in zip(stats, expected):
+            assert s[: len(STRUCTURE) + 2] == e[: len(STRUCTURE) + 2]
+    for s in stemmer.stats():
+        assert sum(s.depths.values()) == s.rows
+        assert sum(s.fanout.values()) == s.rows
+        assert sum(n * rows for n, rows in s.fanout.items()) == s.cells
+
+
+def test_print_info(capsys):
+    trie = small_trie()
+    trie.print_info("trie ")
+    assert (
+        capsys.readouterr().out == "trie nds 3 cmds 4 cells 6 valcells 5 pntcells 2\n"
+    )
+
+    multi = MultiTrie2(forward=True)
+    multi.add("ab", "-a")
+    multi.print_info("multi")
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("multi [1] nds ")
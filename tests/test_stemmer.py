@@ -15,6 +15,8 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import pytest
+
 from pystempel import Stemmer
 from tests.base import get_library_data_path
 
@@ -27,3 +29,51 @@ def test_polimorf_from_resource():
 def test_default_from_resource():
     stemmer = Stemmer.default()
     assert stemmer("jabłkami") == "jabłkami"
+
+
+def test_from_bytes():
+    import gzip
+
+    fpath = get_library_data_path("original", "stemmer_20000.tbl.gz")
+    with gzip.open(fpath, "rb") as f:
+        stemmer = Stemmer.from_bytes(f.read())
+    assert stemmer("jabłkami") == "jabłkami"
+    assert stemmer("książkami") == "książek"
+
+
+def test_lazy_from_file():
+    words = ["jabłkami", "książka", "książkami", "książkowymi", "zielonego"]
+    for fname in ["stemmer_20000.tbl", "stemmer_20000.tbl.gz"]:
+        fpath = get_library_data_path("original", fname)
+        eager = Stemmer.from_file(fpath)
+        lazy = Stemmer.from_file(fpath, lazy=True)
+        for word in words:
+            assert lazy(word) == eager(word)
+
+
+def test_compile():
+    words = ["jabłkami", "książka", "książkami", "książkowymi", "zielonego", ""]
+    stemmer = Stemmer.default()
+    lazy = Stemmer.from_file(
+        get_library_data_path("original", "stemmer_20000.tbl"), lazy=True
+    )
+    for compiled in [stemmer.compile(), lazy.compile()]:
+        for word in words[:-1]:
+            assert compiled(word) == stemmer(word)
+        assert compiled("") is None
+
+
+def test_stem_many():
+    words = ["książkami", "jabłkami", "aloe", "książkami", "zielonego", "książka"]
+    stemmer = Stemmer.default()
+    expected = [stemmer(word) for word in words]
+    assert expected[2] is None
+    for s in [stemmer, stemmer.compile(), stemmer.cached(maxsize=2)]:
+        assert s.stem_many(words) == expected
+        assert s.stem_many(iter(words)) == expected
+        stems, missing = s.stem_many(tuple(words), mask=True)
+        assert stems == [s or w for s, w in zip(expected, words)]
+        assert missing == [s is None for s in expected]
+    assert stemmer.stem_many([]) == []
+    with pytest.raises(TypeError):
+        stemmer.stem_many("książkami")
@@ -0,0 +1,93 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import gzip
+import io
+import struct
+import threading
+import zlib
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.streams import DataInputBuffer, InflatingBuffer
+from tests.base import get_library_data_path
+
+RECORDS = [(i, -i, i * 2, i * 3, 0) for i in range(1000)]
+
+
+def serialize():
+    data = struct.pack(">i", len(RECORDS))
+    data += b"".join(struct.pack(">Hiiii", *r) for r in RECORDS)
+    word = "żółw".encode("utf-8")
+    return data + struct.pack(">H", len(word)) + word
+
+
+def read_all(stream):
+    count = stream.read_int()
+    records = list(stream.read_records(">Hiiii", count))
+    return records, stream.read_utf()
+
+
+def test_buffer():
+    assert read_all(DataInputBuffer(serialize())) == (RECORDS, "żółw")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_inflating_buffer(chunk_size):
+    data = serialize()
+    compressed = gzip.compress(data[:1000]) + gzip.compress(data[1000:])
+    with InflatingBuffer(io.BytesIO(compressed), chunk_size=chunk_size) as stream:
+        assert read_all(stream) == (RECORDS, "żółw")
+        with pytest.raises(EOFError):
+            stream.read_int()
+
+
+def test_inflating_buffer_corrupted():
+    with InflatingBuffer(io.BytesIO(b"not gzipped")) as stream:
+        with pytest.raises(zlib.error):
+            stream.read_int()
+        # Later reads fail too instead of waiting for the stopped producer.
+        with pytest.raises(zlib.error):
+            stream.read_int()
+
+
+def test_stemmer_from_file_object():
+    fpath = get_library_data_path("original", "stemmer_20000.tbl.gz")
+    with gzip.open(fpath, "rb") as f:
+        stemmer = Stemmer.from_stream(f)
+    assert stemmer("książkami") == "książek"
+
+
+@pytest.mark.parametrize("fname", ["stemmer_20000.tbl.gz", "stemmer_20000.tbl"])
+def test_stemmer_pipelined(fname):
+    fpath = get_library_data_path("original", fname)
+    expected = Stemmer.from_file(fpath)
+    pipelined = Stemmer.from_file(fpath, pipelined=True)
+    for word in ["książkami", "zielonego", "biegając"]:
+        assert pipelined(word) == expected(word)
+
+
+def test_stemmer_pipelined_from_stream():
+    fpath = get_library_data_path("original", "stemmer_20000.tbl.gz")
+    threads = threading.active_count()
+    with open(fpath, "rb") as f:
+        stemmer = Stemmer.from_stream(f, pipelined=True)
+    assert stemmer("książkami") == "książek"
+    # The inflating thread is stopped once the table is loaded.
+    assert threading.active_count() == threads
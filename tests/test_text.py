@@ -0,0 +1,87 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import io
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.text import stem_stream, stem_text, tokenize
+
+TEXT = "Książki leżą na półce_nr 12, obok ZIELONEGO jabłka... Aloe!\nKsiążkami"
+
+
+@pytest.fixture(scope="module")
+def stemmer():
+    return Stemmer.default()
+
+
+def expected(stemmer, text):
+    return [
+        (token.lower(), stemmer(token.lower()), start, end)
+        for token, start, end in tokenize(text)
+    ]
+
+
+def test_tokenize():
+    tokens = list(tokenize(TEXT))
+    assert [token for token, _, _ in tokens] == [
+        "Książki",
+        "leżą",
+        "na",
+        "półce",
+        "nr",
+        "obok",
+        "ZIELONEGO",
+        "jabłka",
+        "Aloe",
+        "Książkami",
+    ]
+    assert all(TEXT[start:end] == token for token, start, end in tokens)
+
+
+def test_stem_text(stemmer):
+    result = list(stem_text(stemmer, TEXT, batch_size=3))
+    assert result == expected(stemmer, TEXT)
+    assert result[0] == ("książki", "książek", 0, 7)
+    assert ("aloe", None, 54, 58) in result
+    assert list(stemmer.stem_text(TEXT, cache=100)) == result
+
+
+def test_stem_text_case(stemmer):
+    result = list(stemmer.stem_text("ZIELONEGO", lowercase=False))
+    assert result == [("ZIELONEGO", stemmer("ZIELONEGO"), 0, 9)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 1000])
+def test_stem_stream(stemmer, chunk_size):
+    result = list(stem_stream(stemmer, io.StringIO(TEXT), chunk_size=chunk_size))
+    assert result == expected(stemmer, TEXT)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000])
+def test_stem_binary_stream(stemmer, chunk_size):
+    data = io.BytesIO(TEXT.encode("utf-8"))
+    result = list(stem_stream(stemmer, data, chunk_size=chunk_size))
+    assert result == expected(stemmer, TEXT)
+    assert list(stemmer.stem_stream(io.BytesIO(TEXT.encode("utf-8")))) == result
+
+
+def test_empty(stemmer):
+    assert list(stemmer.stem_text("")) == []
+    assert list(stemmer.stem_stream(io.StringIO(" 12 "))) == []
@@ -0,0 +1,64 @@
+"""
+Licensed to the Apache Software Foundation (ASF) under one or more
+contributor license agreements.  See the NOTICE file distributed with
+this work for additional information regarding copyright ownership.
+The ASF licenses this file to You under the Apache License, Version 2.0
+(the "License"); you may not use this file except in compliance with
+the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import itertools
+
+import pytest
+
+from pystempel import Stemmer
+from pystempel.egothor import MultiTrie2, Trie
+from tests.base import get_test_data_path, load_words
+
+np = pytest.importorskip("numpy")
+
+PATCHES = {
+    "abc": "Da",
+    "abd": "-aRx",
+    "bcd": "-bDa",
+    "cab": "Rz-aIy",
+    "dab": "-aDa-aRq",
+    "bb": "Ic",
+}
+
+
+@pytest.mark.parametrize("multi", [True, False])
+@pytest.mark.parametrize("forward", [True, False])
+def test_small_tables(multi, forward):
+    trie = MultiTrie2(forward=forward) if multi else Trie(forward=forward)
+    for key, patch in PATCHES.items():
+        trie.add(key, patch)
+    stemmer = Stemmer(trie)
+    words = [""]
+    for n in range(1, 5):
+        words.extend(map("".join, itertools.product("abcdx", repeat=n)))
+    vectorized = stemmer.vectorize(batch_size=100)
+    assert vectorized.stem_many(words) == [stemmer(w) if w else None for w in words]
+
+
+@pytest.mark.parametrize("name", ["default", "polimorf"])
+def test_shipped_tables(name):
+    stemmer = getattr(Stemmer, name)()
+    words = list(load_words(get_test_data_path("sjp_dict.txt")))[::5]
+    assert stemmer.vectorize().stem_many(words) == stemmer.stem_many(words)
+
+
+def test_overlong_words():
+    stemmer = Stemmer.default()
+    words = ["książkami", "ab" * 5000 + "ami", "zielonego", "x" * 65]
+    vectorized = stemmer.vectorize(batch_size=2, max_length=64)
+    assert vectorized.stem_many(words) == [stemmer(word) for word in words]